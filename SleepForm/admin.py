@@ -1,3 +1,247 @@
+"""
+Admin for the questionnaire table, built to stay fast with millions of rows.
+
+- The listing shows the stored score columns, falling back to the in-database
+  PSQI annotations (``with_psqi``) for rows stored before the columns were
+  filled in. Nothing is scored in Python per row.
+- Counts are estimates: PostgreSQL's planner statistics or the
+  DailySubmissionCount totals for the whole table, and a count capped at
+  ``COUNT_LIMIT`` when filters are applied.
+- In the default order (newest first) pages are fetched by keyset on
+  ``(created_at, id)``, so the hundredth page costs as much as the first.
+  Sorting by a column falls back to numbered pages.
+- The date hierarchy and the score filter run on indexed columns, and the
+  search box finds a respondent's questionnaires by code or pseudonym.
+- Listing pages read from the read replica when one is configured.
+- Questionnaires are read-only here: ScoreSummary and DailySubmissionCount
+  are only kept up to date on insert (see models.record_submissions).
+"""
+from datetime import datetime
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections, router
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+
+from .instruments import PSQI
+from .models import COMPONENTS, DailySubmissionCount, ScoreSummary, SleepQuestionnaire
+from .respondents import clinics, pseudonym
+from .routers import replica_reads
+
+# Query string parameter holding the keyset cursor, "<created_at>_<id>"
+CURSOR_VAR = 'cursor'
+
+# Filtered listings count at most this many rows
+COUNT_LIMIT = 10000
+
+KEYSET_ORDERING = ('-created_at', '-id')
+
+
+def estimated_questionnaire_count():
+    """Approximate number of stored questionnaires, without counting rows"""
+    connection = connections[router.db_for_read(SleepQuestionnaire)]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [SleepQuestionnaire._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # -1 (or 0 on older servers) until the table is first analyzed
+        if row and row[0] > 0:
+            return int(row[0])
+    return DailySubmissionCount.objects.aggregate(total=Sum('count'))['total'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator whose count never scans the table: an estimate when the
+    listing is unfiltered, and at most COUNT_LIMIT otherwise.
+    """
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            return estimated_questionnaire_count()
+        return self.object_list.order_by().values('pk')[:COUNT_LIMIT].count()
+
+
+class KeysetChangeList(ChangeList):
+    """
+    The changelist paged by keyset in the default order: each page holds the
+    ``list_per_page`` rows that come after the cursor, and links to the next
+    one by the created_at and id of its last row.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = _parse_cursor(request.GET.get(CURSOR_VAR, ''))
+        if CURSOR_VAR in request.GET:
+            # Not a field lookup; keep it away from the filters
+            request.GET = request.GET.copy()
+            del request.GET[CURSOR_VAR]
+        self.keyset = ORDER_VAR not in request.GET
+        super().__init__(request, *args, **kwargs)
+
+    def get_results(self, request):
+        if not self.keyset:
+            return super().get_results(request)
+
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = self.paginator.count
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.can_show_all = False
+
+        queryset = self.queryset
+        if self.cursor:
+            created_at, pk = self.cursor
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+        rows = list(queryset[:self.list_per_page + 1])
+        self.result_list = rows[:self.list_per_page]
+        self.multi_page = self.cursor is not None or len(rows) > self.list_per_page
+
+        self.next_page_url = None
+        if len(rows) > self.list_per_page:
+            last = self.result_list[-1]
+            self.next_page_url = self.get_query_string({CURSOR_VAR: f'{last.created_at.isoformat()}_{last.pk}'})
+        self.first_page_url = self.get_query_string(remove=[CURSOR_VAR]) if self.cursor else None
+
+    def get_ordering(self, request, queryset):
+        if self.keyset:
+            return list(KEYSET_ORDERING)
+        return super().get_ordering(request, queryset)
+
+    @property
+    def result_count_is_estimate(self):
+        return not self.queryset.query.where or self.result_count >= COUNT_LIMIT
+
+
+def _parse_cursor(value):
+    created_at, _, pk = value.rpartition('_')
+    try:
+        return datetime.fromisoformat(created_at), int(pk)
+    except ValueError:
+        return None
+
+
+class TotalScoreFilter(admin.SimpleListFilter):
+    """PSQI total ranges, filtered on the indexed total_score column"""
+    title = "pontuação total (PSQI)"
+    parameter_name = 'total'
+    ranges = {
+        '0-5': (0, 5),
+        '6-10': (6, 10),
+        '11-15': (11, 15),
+        f'16-{PSQI.max_total}': (16, PSQI.max_total),
+    }
+
+    def lookups(self, request, model_admin):
+        return [
+            *((key, f"{low} a {high}") for key, (low, high) in self.ranges.items()),
+            ('none', "Sem pontuação registrada"),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'none':
+            return queryset.filter(total_score__isnull=True)
+        if self.value() in self.ranges:
+            low, high = self.ranges[self.value()]
+            return queryset.filter(total_score__gte=low, total_score__lte=high)
+        return queryset
+
+
+def _score_column(name):
+    field_name = 'total_score' if name == 'total' else f'{name}_score'
+
+    @admin.display(
+        description=SleepQuestionnaire._meta.get_field(field_name).verbose_name,
+        ordering=field_name,
+    )
+    def column(obj):
+        return getattr(obj, f'listed_{name}')
+
+    column.__name__ = f'listed_{name}'
+    return column
+
+
+@admin.register(SleepQuestionnaire)
+class SleepQuestionnaireAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created_at', *(_score_column(name) for name in (*COMPONENTS, 'total')))
+    list_display_links = ('id', 'created_at')
+    list_filter = (TotalScoreFilter,)
+    date_hierarchy = 'created_at'
+    ordering = KEYSET_ORDERING
+    list_per_page = 50
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_fields = ('respondent',)
+    search_help_text = "Código do participante ou pseudônimo"
+    readonly_fields = (
+        'created_at', 'clinic', 'respondent', *(f'{name}_score' for name in COMPONENTS), 'total_score', 'scoring_version',
+    )
+
+    def changelist_view(self, request, extra_context=None):
+        # Listing reads go to the read replica, if any; actions stay on the primary
+        if request.method == 'POST':
+            return super().changelist_view(request, extra_context)
+        with replica_reads():
+            return super().changelist_view(request, extra_context)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_search_results(self, request, queryset, search_term):
+        # Exact matches on the respondent index, never a LIKE scan. A code
+        # may belong to the public form or to any clinic.
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        pseudonyms = [pseudonym(search_term, clinic) for clinic in {None, *clinics()}]
+        return queryset.filter(respondent__in=[*pseudonyms, search_term]), False
+
+    def get_queryset(self, request):
+        # Only the listed rows are annotated; sorting and filtering use the
+        # stored, indexed columns
+        return super().get_queryset(request).with_psqi().annotate(
+            listed_total=Coalesce(F('total_score'), F('psqi_total')),
+            **{
+                f'listed_{name}': Coalesce(F(f'{name}_score'), F(f'psqi_{name}'))
+                for name in COMPONENTS
+            },
+        )
+
+
+@admin.register(ScoreSummary)
+class ScoreSummaryAdmin(admin.ModelAdmin):
+    list_display = ('total_score', 'count')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailySubmissionCount)
+class DailySubmissionCountAdmin(admin.ModelAdmin):
+    list_display = ('day', 'count')
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request):
+        return False
 
-# Register your models here.
+    def has_change_permission(self, request, obj=None):
+        return False
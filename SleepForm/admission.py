@@ -0,0 +1,173 @@
+"""
+Admission control for submissions.
+
+Under a spike, every POST that reaches the database waits for the same
+write lock, and the workers tied up waiting make every page slow.
+``AdmissionControlMiddleware`` guards the POSTs of the questionnaire form
+and leaves everything else (the GET pages, the admin) alone:
+
+- Per client IP, a counter in the Django cache allows
+  ``SUBMISSION_RATE_BURST`` POSTs per window, the time
+  ``SUBMISSION_RATE_PER_MINUTE`` takes to add up to the burst. Past that the
+  client gets a 429 until the window ends. Counters are only changed with
+  ``cache.add()`` and ``cache.incr()``, atomic on Redis and memcached, so
+  concurrent POSTs are all counted; and the cache must be shared by every
+  process (``REDIS_URL``), or each keeps its own count and the real limit is
+  the rate times the number of processes. A system check (checks.py)
+  refuses to start with the rate limit on and a per-process cache. The
+  limit is off by default, and only makes sense once
+  ``SUBMISSION_PROXY_COUNT`` matches the proxies in front: otherwise every
+  client counts as the proxy's address.
+- Per process, at most ``SUBMISSION_MAX_CONCURRENCY`` guarded POSTs run at
+  a time. Others wait up to ``SUBMISSION_ADMISSION_TIMEOUT`` seconds for a
+  slot and then get a 503.
+
+Both refusals carry a ``Retry-After`` header. A limit of 0 disables it.
+"""
+import asyncio
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+from .metrics import observe
+
+GUARDED_VIEWS = ('sleep_questionnaire',)
+
+COUNTER_PREFIX = 'sleepform:rate:'
+
+
+def client_ip(request):
+    """
+    The client's address: REMOTE_ADDR, or with ``SUBMISSION_PROXY_COUNT``
+    proxies in front (e.g. 1 for the Heroku router), the address the
+    outermost of them saw in X-Forwarded-For.
+    """
+    proxies = settings.SUBMISSION_PROXY_COUNT
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[max(len(addresses) - proxies, 0)]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def take_token(key, now=None):
+    """
+    Count a POST of client ``key``. Returns 0 if it is within the limit,
+    otherwise the seconds until the client's window ends.
+    """
+    burst = settings.SUBMISSION_RATE_BURST
+    window = burst * 60 / settings.SUBMISSION_RATE_PER_MINUTE
+    now = time.time() if now is None else now
+    start = now // window * window
+
+    counter = f'{COUNTER_PREFIX}{key}:{start:.0f}'
+    timeout = int(window) + 1
+    if cache.add(counter, 1, timeout=timeout):
+        count = 1
+    else:
+        try:
+            count = cache.incr(counter)
+        except ValueError:
+            # Expired since add() found it: this is the first of a new one
+            cache.add(counter, 1, timeout=timeout)
+            count = 1
+    if count > burst:
+        return start + window - now
+    return 0
+
+
+def _refusal(status, message, retry_after):
+    response = HttpResponse(message, status=status, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(max(1, round(retry_after)))
+    return response
+
+
+def _too_many_requests(wait):
+    return _refusal(429, "Muitos envios em pouco tempo. Tente novamente em instantes.", wait)
+
+
+def _overloaded():
+    return _refusal(
+        503, "O serviço está sobrecarregado. Tente enviar novamente em instantes.",
+        settings.SUBMISSION_RETRY_AFTER,
+    )
+
+
+class AdmissionControlMiddleware:
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slots = threading.BoundedSemaphore(max(settings.SUBMISSION_MAX_CONCURRENCY, 1))
+        self.async_slots = None
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def guarded(self, request):
+        if request.method != 'POST':
+            return False
+        try:
+            return resolve(request.path_info).url_name in GUARDED_VIEWS
+        except Resolver404:
+            return False
+
+    def rate_limited(self, request):
+        """A 429 response if the client has no token left, else None"""
+        if not settings.SUBMISSION_RATE_PER_MINUTE:
+            return None
+        wait = take_token(client_ip(request))
+        return _too_many_requests(wait) if wait else None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.guarded(request):
+            return self.get_response(request)
+
+        refused = self.rate_limited(request)
+        if refused:
+            return refused
+        if not settings.SUBMISSION_MAX_CONCURRENCY:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        admitted = self.slots.acquire(timeout=settings.SUBMISSION_ADMISSION_TIMEOUT)
+        observe('sleepform_phase_duration_seconds', ('admission_wait',), time.perf_counter() - started)
+        if not admitted:
+            return _overloaded()
+        try:
+            return self.get_response(request)
+        finally:
+            self.slots.release()
+
+    async def __acall__(self, request):
+        if not self.guarded(request):
+            return await self.get_response(request)
+
+        refused = await sync_to_async(self.rate_limited)(request)
+        if refused:
+            return refused
+        if not settings.SUBMISSION_MAX_CONCURRENCY:
+            return await self.get_response(request)
+
+        if self.async_slots is None:
+            # Created here so it belongs to the running event loop
+            self.async_slots = asyncio.Semaphore(settings.SUBMISSION_MAX_CONCURRENCY)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.async_slots.acquire(), settings.SUBMISSION_ADMISSION_TIMEOUT)
+        except asyncio.TimeoutError:
+            return _overloaded()
+        finally:
+            observe('sleepform_phase_duration_seconds', ('admission_wait',), time.perf_counter() - started)
+        try:
+            return await self.get_response(request)
+        finally:
+            self.async_slots.release()
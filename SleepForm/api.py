@@ -0,0 +1,142 @@
+"""
+JSON bulk submission for partner clinics.
+
+Clinics collect questionnaires offline and sync them in batches: a POST to
+``/api/questionnaires/`` with a JSON array of questionnaires, each an object
+keyed by model field name like the rows of ``import_questionnaires``. Each
+should carry its ``created_at``, the ISO 8601 time it was answered on the
+tablet; without it the questionnaire is dated at sync time. The body may be
+gzip-compressed (``Content-Encoding: gzip``), and requests authenticate with
+``Authorization: Bearer <key>`` using one of ``settings.CLINIC_API_KEYS``,
+which also names the clinic the questionnaires are recorded for.
+
+Items are validated with ``ingest.clean_row`` (the model fields' own
+``clean()``, no ModelForm per item). The valid ones are inserted with a single
+``bulk_create`` in one transaction, even if others were rejected. The response
+lists each item by its position in the array, with its id and scores or with
+its errors, and the respondent's pseudonym if the item had a
+``respondent_code`` (see respondents.py); pseudonyms are the clinic's own.
+
+``GET /api/respondents/history/?respondent=<pseudonym>`` (repeatable, same
+keys) returns each respondent's questionnaires, oldest first, with the change
+in total score since the previous (``delta``) and the first (``change``).
+Only questionnaires the calling clinic sent are returned.
+"""
+import json
+import zlib
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+
+from . import metrics
+from .ingest import bulk_insert, clean_row
+from .models import COMPONENTS
+from .respondents import series
+
+
+class BadPayload(Exception):
+    """A request body that cannot be read as a list of questionnaires"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def clinic(request):
+    """The clinic whose API key the request carries, or None"""
+    authorization = request.headers.get('Authorization', '')
+    for key, name in settings.CLINIC_API_KEYS.items():
+        if constant_time_compare(authorization, f'Bearer {key}'):
+            return name
+    return None
+
+
+def read_items(request):
+    """The JSON array in the request body, decompressed if need be"""
+    body = request.body
+    encoding = request.headers.get('Content-Encoding', 'identity').strip().lower()
+    if encoding == 'gzip':
+        body = _gunzip(body, settings.API_MAX_BODY_SIZE)
+    elif encoding != 'identity':
+        raise BadPayload(f"Content-Encoding não suportado: {encoding}", status=415)
+
+    try:
+        items = json.loads(body)
+    except ValueError:
+        raise BadPayload("O corpo da requisição não é um JSON válido.")
+    if not isinstance(items, list):
+        raise BadPayload("Esperada uma lista de questionários.")
+    if len(items) > settings.API_MAX_ITEMS:
+        raise BadPayload(f"No máximo {settings.API_MAX_ITEMS} questionários por requisição.", status=413)
+    return items
+
+
+def submit(items, clinic):
+    """Validate and insert the ``items`` sent by ``clinic``; returns the response payload"""
+    results = []
+    valid = []
+    with metrics.timed('api_validate'):
+        for index, item in enumerate(items):
+            if isinstance(item, dict):
+                instance, errors = clean_row(item, clinic)
+            else:
+                errors = {'__all__': ["Esperado um objeto com as respostas."]}
+            if errors:
+                results.append({'index': index, 'errors': errors})
+            else:
+                valid.append((index, instance))
+
+    if valid:
+        with metrics.timed('api_insert'):
+            created = bulk_insert([instance for _, instance in valid])
+        for (index, _), instance in zip(valid, created):
+            results.append({
+                'index': index,
+                'id': instance.pk,
+                'scores': {name: getattr(instance, f'{name}_score') for name in COMPONENTS},
+                'total': instance.total_score,
+                'created_at': instance.created_at,
+                'respondent': instance.respondent,
+            })
+    results.sort(key=lambda result: result['index'])
+
+    return {
+        'created': len(valid),
+        'rejected': len(items) - len(valid),
+        'results': results,
+    }
+
+
+def read_respondents(request):
+    """The pseudonyms asked for in the query string"""
+    respondents = list(dict.fromkeys(request.GET.getlist('respondent')))
+    if not respondents:
+        raise BadPayload("Informe ao menos um respondente (?respondent=<pseudônimo>).")
+    if len(respondents) > settings.API_MAX_ITEMS:
+        raise BadPayload(f"No máximo {settings.API_MAX_ITEMS} respondentes por requisição.", status=413)
+    return respondents
+
+
+def history(respondents, clinic):
+    """The history response payload"""
+    with metrics.timed('api_history'):
+        return {
+            'respondents': [
+                {'respondent': respondent, 'questionnaires': questionnaires}
+                for respondent, questionnaires in series(respondents, clinic).items()
+            ],
+        }
+
+
+def _gunzip(data, max_size):
+    """Decompress a gzip body, refusing to inflate it beyond ``max_size`` bytes"""
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    try:
+        body = decompressor.decompress(data, max_size)
+    except zlib.error:
+        raise BadPayload("O corpo gzip está corrompido.")
+    if decompressor.unconsumed_tail:
+        raise BadPayload(f"O corpo descompactado excede {max_size} bytes.", status=413)
+    if not decompressor.eof:
+        raise BadPayload("O corpo gzip está incompleto.")
+    return body
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db.backends.signals import connection_created
 
 
 class SleepformConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'SleepForm'
+
+    def ready(self):
+        from .checks import check_rate_limit_cache
+        checks.register(check_rate_limit_cache, checks.Tags.caches)
+        from .metrics import install_query_timer
+        connection_created.connect(install_query_timer, dispatch_uid='sleepform_query_timer')
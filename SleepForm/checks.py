@@ -0,0 +1,40 @@
+"""
+System checks for settings that only break in production.
+"""
+from django.conf import settings
+from django.core import checks
+
+# Caches each process keeps to itself
+PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+# Shared, but incr() is a read and a write rather than one atomic step
+NON_ATOMIC_CACHES = (
+    'django.core.cache.backends.db.DatabaseCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+)
+
+
+def check_rate_limit_cache(app_configs, **kwargs):
+    """The per-IP rate limit (admission.py) needs a shared cache with atomic increments"""
+    if not settings.SUBMISSION_RATE_PER_MINUTE:
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PROCESS_CACHES:
+        return [checks.Error(
+            "SUBMISSION_RATE_PER_MINUTE is set but the default cache is per process, "
+            "so every worker would allow the full rate.",
+            hint="Set REDIS_URL for a shared cache, or unset SUBMISSION_RATE_PER_MINUTE.",
+            obj=backend,
+            id='SleepForm.E001',
+        )]
+    if backend in NON_ATOMIC_CACHES:
+        return [checks.Warning(
+            "The default cache does not increment atomically: concurrent submissions "
+            "may be undercounted by the rate limit.",
+            hint="Use Redis or memcached for the default cache.",
+            obj=backend,
+            id='SleepForm.W001',
+        )]
+    return []
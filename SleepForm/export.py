@@ -0,0 +1,133 @@
+"""
+Streaming export of questionnaires for researchers.
+
+Rows are read with ``QuerySet.iterator()`` (a server-side cursor on
+PostgreSQL) and encoded chunk by chunk, so an export never holds the whole
+table in memory.
+"""
+import csv
+from itertools import islice
+
+from .models import SleepQuestionnaire
+from .scoring import COMPONENTS
+
+# Internal bookkeeping, of no use to researchers (see idempotency.py)
+EXCLUDED_FIELDS = {'submission_key'}
+
+# Raw answers first, then the stored scores
+EXPORT_FIELDS = [
+    field.name for field in SleepQuestionnaire._meta.concrete_fields
+    if not field.name.endswith('_score') and field.name not in EXCLUDED_FIELDS
+] + [f'{name}_score' for name in COMPONENTS] + ['total_score']
+
+# Django field type -> name of the pyarrow type factory for its column
+ARROW_TYPES = {
+    'AutoField': 'int64',
+    'BigAutoField': 'int64',
+    'IntegerField': 'int64',
+    'BigIntegerField': 'int64',
+    'SmallIntegerField': 'int64',
+    'PositiveIntegerField': 'int64',
+    'PositiveSmallIntegerField': 'int64',
+    'FloatField': 'float64',
+    'CharField': 'string',
+    'TextField': 'string',
+}
+
+CHUNK_SIZE = 2000
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Yield one tuple of ``EXPORT_FIELDS`` values per questionnaire"""
+    return queryset.order_by('pk').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object whose write() just hands back what it was given"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset):
+    """Yield the export as CSV text, one line at a time"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in export_rows(queryset):
+        yield writer.writerow(row)
+
+
+class _ChunkSink:
+    """Write-only file object that collects bytes until they are taken"""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_parquet(queryset, chunk_size=CHUNK_SIZE):
+    """
+    The export as a Parquet file, yielded one row group per chunk of rows.
+    Needs the optional ``pyarrow`` package. The schema is built before
+    anything is yielded, so a column that cannot be exported fails here
+    rather than halfway through a streamed response.
+    """
+    import pyarrow as pa
+
+    schema = pa.schema([_arrow_field(pa, SleepQuestionnaire._meta.get_field(name)) for name in EXPORT_FIELDS])
+    return _parquet_chunks(queryset, schema, chunk_size)
+
+
+def _parquet_chunks(queryset, schema, chunk_size):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    rows = export_rows(queryset, chunk_size)
+
+    with pq.ParquetWriter(sink, schema) as writer:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            columns = zip(*chunk)
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            yield sink.take()
+    yield sink.take()
+
+
+def _arrow_field(pa, field):
+    internal_type = field.get_internal_type()
+    if internal_type == 'DateTimeField':
+        arrow_type = pa.timestamp('us', tz='UTC')
+    elif internal_type == 'TimeField':
+        arrow_type = pa.time64('us')
+    elif internal_type in ARROW_TYPES:
+        arrow_type = getattr(pa, ARROW_TYPES[internal_type])()
+    else:
+        raise TypeError(f"No Parquet column type for {field.name} ({internal_type})")
+    return pa.field(field.name, arrow_type, nullable=field.null)
@@ -1,8 +1,22 @@
 
+import uuid
+
 from django import forms
 from .models import SleepQuestionnaire
+from .respondents import CODE_MAX_LENGTH, pseudonym
 
 class SleepQuestionnaireForm(forms.ModelForm):
+    # Issued with the page, see idempotency.py. A CharField so a mangled key
+    # never blocks a submission: it is just ignored.
+    submission_key = forms.CharField(required=False, widget=forms.HiddenInput)
+    # Only on a clinic's page of the form, and only its pseudonym is stored,
+    # see respondents.py
+    respondent_code = forms.CharField(
+        required=False, max_length=CODE_MAX_LENGTH,
+        label="Código do participante (opcional)",
+        help_text="Informe o código recebido da clínica para acompanhar sua evolução.",
+    )
+
     class Meta:
         model = SleepQuestionnaire
         fields = '__all__'
@@ -15,10 +29,50 @@ class SleepQuestionnaireForm(forms.ModelForm):
             'partner_other_issues': forms.Textarea(attrs={'rows': 3}),
         }
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, clinic=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.clinic = clinic
+        if clinic is None:
+            del self.fields['respondent_code']
         # Make partner-related fields optional initially
         for field in ['partner_snoring', 'partner_breathing_pauses', 
                      'partner_leg_movements', 'partner_confusion',
                      'partner_other_issues', 'partner_other_frequency']:
-            self.fields[field].required = False
\ No newline at end of file
+            self.fields[field].required = False
+
+    def clean_submission_key(self):
+        try:
+            return uuid.UUID(self.cleaned_data['submission_key'])
+        except ValueError:
+            return None
+
+    def save(self, commit=True):
+        instance = super().save(commit=False)
+        instance.submission_key = self.cleaned_data['submission_key']
+        instance.clinic = self.clinic
+        instance.respondent = pseudonym(self.cleaned_data.get('respondent_code'), self.clinic)
+        if commit:
+            instance.save()
+            self._save_m2m()
+        return instance
+
+    def sleep_difficulty_fields(self):
+        """Q5a-Q5i, listed under "Dificuldades para Dormir" on the page"""
+        return [
+            self[name] for name in SleepQuestionnaire.DIFFICULTY_FIELDS
+            if name != 'other_reason_frequency'
+        ]
+
+class ExportForm(forms.Form):
+    FORMAT_CHOICES = [('csv', 'CSV'), ('parquet', 'Parquet')]
+
+    start = forms.DateField(required=False, label="Enviados a partir de")
+    end = forms.DateField(required=False, label="Enviados até")
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and start > end:
+            raise forms.ValidationError("A data inicial deve ser anterior à data final.")
+        return cleaned_data
@@ -0,0 +1,104 @@
+"""
+Duplicate POST suppression for the questionnaire form.
+
+Every full GET of the questionnaire page carries a fresh ``submission_key``
+(a UUID) in a hidden input, outside the cached field markup. The POST stores
+it in the row's unique ``submission_key`` column. When a double tap or a
+proxy retry sends the same page again, with the same key and answers, the
+view answers with the original redirect instead of inserting another row.
+
+Keys are looked up in the Django cache first, where each submission is
+remembered for ``RESULT_TOKEN_MAX_AGE`` seconds, then in the table through
+its unique index, so a retry served by another worker is still recognized.
+Either way only submissions from the last ``RESULT_TOKEN_MAX_AGE`` seconds
+count: a page kept longer than that (revalidated with a 304, it keeps its
+key) sends a new questionnaire even with the same answers.
+A browser revalidating the page (ETag, see page_cache) may keep an old key
+and send it again with new answers; that is a new questionnaire, and it is
+saved under a new key.
+
+With the write-behind queue on, rows reach the table only when the queue is
+flushed, but they keep their key. Until then the cache catches repeated
+POSTs; at insert, the flusher checks each key against the table and the
+rest of its batch (submission_queue._skip_inserted). The same key with the
+same answers is dropped. With other answers it gets a new key.
+"""
+import hashlib
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .ingest import ANSWER_FIELDS
+from .models import SleepQuestionnaire
+from .results import make_result, success_url
+from .stats import percentile_rank
+
+CACHE_PREFIX = 'sleepform:submission:'
+
+
+def new_key():
+    return uuid.uuid4()
+
+
+def answers_digest(instance):
+    """Fingerprint of a questionnaire's answers, saved or not"""
+    values = [field.value_to_string(instance) for field in ANSWER_FIELDS]
+    return hashlib.sha256(json.dumps(values).encode()).hexdigest()
+
+
+def replayed_url(instance):
+    """
+    The success URL of an earlier submission with the same key and answers
+    as the unsaved ``instance``, or None if this is a new submission.
+    """
+    key = instance.submission_key
+    if key is None:
+        return None
+    digest = answers_digest(instance)
+
+    remembered = cache.get(f'{CACHE_PREFIX}{key}')
+    if remembered is not None:
+        remembered_digest, url = remembered
+        return url if remembered_digest == digest else None
+
+    since = timezone.now() - timedelta(seconds=settings.RESULT_TOKEN_MAX_AGE)
+    original = SleepQuestionnaire.objects.filter(submission_key=key, created_at__gte=since).first()
+    if original is None or answers_digest(original) != digest:
+        return None
+    url = success_url(make_result(original, percentile_rank(original.total_score)))
+    remember(original, url)
+    return url
+
+
+def remember(instance, url):
+    """Record where the submission of ``instance`` was redirected"""
+    if instance.submission_key is not None:
+        cache.set(
+            f'{CACHE_PREFIX}{instance.submission_key}',
+            (answers_digest(instance), url),
+            timeout=settings.RESULT_TOKEN_MAX_AGE,
+        )
+
+
+def save_once(instance):
+    """
+    Insert a new submission. If a concurrent request took its key first,
+    returns that submission's success URL when the answers are the same;
+    otherwise the instance gets a new key and is saved anyway.
+    """
+    try:
+        instance.save()
+    except IntegrityError:
+        if instance.submission_key is None:
+            raise
+        replayed = replayed_url(instance)
+        if replayed is not None:
+            return replayed
+        instance.submission_key = new_key()
+        instance.save()
+    return None
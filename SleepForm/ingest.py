@@ -0,0 +1,140 @@
+"""
+Bulk loading of questionnaires that do not come through the HTML form.
+
+Rows are plain dicts keyed by model field name. Answers may be given either
+as their integer value or as the Portuguese choice label shown on the form
+(e.g. ``'1 ou 2 vezes/semana'``). Each row is checked with the model fields'
+own ``clean()`` rather than a ``ModelForm``, scored in batches with
+``scoring.score_rows`` and written with ``bulk_create``. An optional
+``respondent_code`` is stored as its pseudonym within the clinic the rows
+come from (see respondents.py), and an
+optional ``created_at`` (ISO 8601; without an offset, in local time) dates
+the questionnaire when it was collected rather than when it was loaded.
+"""
+from datetime import datetime, time, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .instruments import PSQI
+from .models import SleepQuestionnaire, record_submissions
+from .respondents import clean_respondent
+from .scoring import COMPONENTS, SCORE_FIELDS, score_rows
+
+CHOICE_ENUMS = (
+    SleepQuestionnaire.Frequency,
+    SleepQuestionnaire.Quality,
+    SleepQuestionnaire.Difficulty,
+    SleepQuestionnaire.Partner,
+)
+
+# The answer fields a row may set: the same fields SleepQuestionnaireForm edits
+ANSWER_FIELDS = [
+    field for field in SleepQuestionnaire._meta.concrete_fields
+    if field.editable and not field.primary_key and not field.auto_created
+]
+
+# Choice enum used by each multiple choice field, for label lookups
+FIELD_CHOICES = {
+    field.name: enum
+    for field in ANSWER_FIELDS
+    for enum in CHOICE_ENUMS
+    if field.choices and list(field.choices) == enum.choices
+}
+
+
+# How far ahead of the server clock a collection time may be, for devices
+# whose clocks run a little fast
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+def clean_created_at(value):
+    """The collection time given in a row as an aware datetime, or None if blank"""
+    if isinstance(value, str):
+        value = value.strip()
+    if value in ('', None):
+        return None
+    try:
+        created_at = parse_datetime(str(value))
+        if created_at is None and parse_date(str(value)):
+            created_at = datetime.combine(parse_date(str(value)), time.min)
+    except ValueError:
+        created_at = None
+    if created_at is None:
+        raise ValidationError(f"Data de coleta inválida: {value!r}. Use o formato ISO 8601.")
+    if timezone.is_naive(created_at):
+        created_at = timezone.make_aware(created_at)
+    if created_at > timezone.now() + CLOCK_SKEW:
+        raise ValidationError("A data de coleta está no futuro.")
+    return created_at
+
+
+def clean_row(row, clinic=None):
+    """
+    Validate one row and build an unsaved ``SleepQuestionnaire`` from it,
+    sent by ``clinic`` (None for the public form).
+
+    Returns ``(instance, errors)``; ``errors`` maps field names to messages
+    and ``instance`` is ``None`` when there are any.
+    """
+    instance = SleepQuestionnaire()
+    errors = {}
+    for field in ANSWER_FIELDS:
+        value = row.get(field.name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in ('', None):
+            value = None
+        elif field.name in FIELD_CHOICES and isinstance(value, str) and not value.isdigit():
+            value = FIELD_CHOICES[field.name].get_value(value)
+            if value is None:
+                errors[field.name] = [f"Opção desconhecida: {row.get(field.name)!r}"]
+                continue
+
+        try:
+            setattr(instance, field.attname, field.clean(value, instance))
+        except ValidationError as e:
+            errors[field.name] = e.messages
+    instance.clinic = clinic
+    try:
+        instance.respondent = clean_respondent(row, clinic)
+    except ValidationError as e:
+        errors['respondent_code'] = e.messages
+    try:
+        created_at = clean_created_at(row.get('created_at'))
+    except ValidationError as e:
+        errors['created_at'] = e.messages
+    else:
+        if created_at:
+            instance.created_at = created_at
+
+    if errors:
+        return None, errors
+    return instance, {}
+
+
+def set_scores(instances):
+    """Fill in the stored score columns of unsaved instances in one batch"""
+    if not instances:
+        return
+    scores = score_rows([getattr(instance, field) for field in SCORE_FIELDS] for instance in instances)
+    for i, instance in enumerate(instances):
+        for name in COMPONENTS:
+            setattr(instance, f'{name}_score', int(scores[name][i]))
+        instance.total_score = int(scores['total'][i])
+        instance.scoring_version = PSQI.version
+
+
+def bulk_insert(instances, batch_size=None):
+    """
+    Score and insert validated instances in a single transaction, updating
+    the dashboard counters with them. Returns the created instances, with
+    primary keys on backends that report them.
+    """
+    set_scores(instances)
+    with transaction.atomic():
+        created = SleepQuestionnaire.objects.bulk_create(instances, batch_size=batch_size)
+        record_submissions(created)
+    return created
@@ -0,0 +1,124 @@
+"""
+Scoring rules of the sleep instruments, written with the nodes in ``rules``.
+
+PSQI is the questionnaire stored in ``SleepQuestionnaire``; its rules follow
+the scoring sheet as this project has always applied it (see the notes
+below). ESS and ISI are ready to score answers given as a dict keyed by the
+item names listed here, for when those questionnaires get a form.
+"""
+from .rules import Answer, Bands, HoursBetween, Instrument, Lookup, Ratio, Score, Sum
+
+# Q5a-Q5j, summed for the sleep disturbance component
+PSQI_DIFFICULTY_FIELDS = (
+    'difficulty_falling_asleep',
+    'difficulty_staying_asleep',
+    'bathroom_visits',
+    'breathing_difficulty',
+    'coughing_snoring',
+    'felt_cold',
+    'felt_hot',
+    'bad_dreams',
+    'pain',
+    'other_reason_frequency',
+)
+
+# Q8 + Q9, summed for the daytime dysfunction component
+PSQI_DAYTIME_FIELDS = (
+    'daytime_sleepiness',
+    'enthusiasm_difficulty',
+)
+
+# Pittsburgh Sleep Quality Index. Notes on how it departs from the sheet:
+# - Q2new: falling asleep in 0 minutes scores 3, like more than an hour.
+# - DISTB sums Q5a-Q5j, Q5a included.
+# - SLPQUAL is Q6 as answered (1-4), so totals run from 1 to 22.
+# - Time in bed is the difference between Q1 and Q3 within the same day.
+# Raise ``version`` with any change to these rules, then run
+# ``manage.py rescore`` to recompute the stored scores.
+PSQI = Instrument(
+    'PSQI',
+    version=1,
+    scores={
+        # Q2new, used by LATEN
+        'new_latency': Bands(
+            Answer('time_to_sleep'),
+            [('<=', 0, 3), ('<', 15, 0), ('<', 30, 1), ('<', 60, 2)],
+            default=3,
+        ),
+        # DURAT
+        'duration': Bands(Answer('sleep_hours'), [('>=', 7, 0), ('>', 6, 1), ('>', 5, 2)], default=3),
+        # DISTB
+        'disturbance': Bands(
+            Sum.of(PSQI_DIFFICULTY_FIELDS),
+            [('==', 0, 0), ('<', 9, 1), ('<', 18, 2)],
+            default=3,
+        ),
+        # LATEN
+        'latency': Lookup(
+            Sum(Answer('difficulty_falling_asleep'), Score('new_latency')),
+            {0: 0, 1: 1, 2: 1, 3: 2, 4: 2},
+            default=3,
+        ),
+        # DAYDYS
+        'daytime': Lookup(Sum.of(PSQI_DAYTIME_FIELDS), {0: 0, 1: 1, 2: 1, 3: 2, 4: 2}, default=3),
+        # HSE
+        'efficiency': Bands(
+            Ratio(Answer('sleep_hours'), HoursBetween('bedtime', 'wakeup_time'), scale=100),
+            [('>=', 85, 0), ('>=', 75, 1), ('>=', 65, 2)],
+            default=3,
+        ),
+        # SLPQUAL
+        'quality': Answer('sleep_quality', highest=4),
+        # MEDS
+        'meds': Answer('medication_use', highest=3),
+    },
+    components=('duration', 'disturbance', 'latency', 'daytime', 'efficiency', 'quality', 'meds'),
+)
+
+# Epworth Sleepiness Scale: chance of dozing, 0 (never) to 3 (high), in eight situations
+ESS_ITEMS = (
+    'sitting_reading',
+    'watching_tv',
+    'sitting_inactive_in_public',
+    'car_passenger_for_an_hour',
+    'lying_down_in_the_afternoon',
+    'sitting_talking',
+    'sitting_after_lunch',
+    'driving_stopped_in_traffic',
+)
+
+ESS = Instrument(
+    'ESS',
+    scores={item: Answer(item, highest=3) for item in ESS_ITEMS},
+    components=ESS_ITEMS,
+    categories=(
+        (5, 'Sonolência diurna normal baixa'),
+        (10, 'Sonolência diurna normal alta'),
+        (12, 'Sonolência diurna excessiva leve'),
+        (15, 'Sonolência diurna excessiva moderada'),
+        (24, 'Sonolência diurna excessiva grave'),
+    ),
+)
+
+# Insomnia Severity Index: seven items answered 0 to 4
+ISI_ITEMS = (
+    'difficulty_falling_asleep',
+    'difficulty_staying_asleep',
+    'waking_up_too_early',
+    'dissatisfaction',
+    'noticeable_to_others',
+    'worry',
+    'interference',
+)
+
+ISI = Instrument(
+    'ISI',
+    scores={item: Answer(item, highest=4) for item in ISI_ITEMS},
+    components=ISI_ITEMS,
+    categories=(
+        (7, 'Ausência de insônia clinicamente significativa'),
+        (14, 'Insônia subclínica'),
+        (21, 'Insônia clínica moderada'),
+        (28, 'Insônia clínica grave'),
+    ),
+)
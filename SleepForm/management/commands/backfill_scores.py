@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from SleepForm.models import SleepQuestionnaire
+from SleepForm.scoring import save_scores, score_queryset
+from SleepForm.stats import rebuild_score_summary
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill in the stored PSQI score columns for questionnaires saved before "
+        "they existed. Works in primary key order, one transaction per chunk, "
+        "so an interrupted run can simply be started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help="Rows scored and written per transaction (default: 2000).",
+        )
+        parser.add_argument(
+            '--start-after', type=int, default=0,
+            help="Skip rows with a primary key up to and including this one.",
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Recompute every row, not only rows without a stored total.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_pk = options['start_after']
+
+        queryset = SleepQuestionnaire.objects.order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(total_score__isnull=True)
+
+        updated = 0
+        while True:
+            chunk = queryset.filter(pk__gt=last_pk)[:chunk_size]
+            scores = score_queryset(chunk)
+            if not len(scores['id']):
+                break
+
+            with transaction.atomic():
+                updated += save_scores(scores)
+
+            last_pk = int(scores['id'][-1])
+            self.stdout.write(f"{updated} rows scored (last id {last_pk})")
+
+        if updated:
+            rebuild_score_summary()
+            self.stdout.write("Dashboard counters rebuilt.")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {updated} rows scored."))
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from SleepForm import submission_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert the questionnaires waiting in the write-behind queue "
+        "(settings.SUBMISSION_QUEUE_DIR). With --loop, keep draining it every "
+        "SUBMISSION_QUEUE_FLUSH_INTERVAL seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep running and drain the queue periodically.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help="Rows per INSERT (default: settings.SUBMISSION_QUEUE_BATCH_SIZE).",
+        )
+
+    def handle(self, *args, **options):
+        if not submission_queue.is_enabled():
+            raise CommandError("SUBMISSION_QUEUE_DIR is not set, there is no queue to drain.")
+
+        while True:
+            inserted = submission_queue.drain(batch_size=options['batch_size'])
+            if inserted or not options['loop']:
+                self.stdout.write(f"{inserted} queued questionnaires inserted.")
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(settings.SUBMISSION_QUEUE_FLUSH_INTERVAL)
@@ -0,0 +1,108 @@
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from SleepForm.ingest import bulk_insert, clean_row
+
+
+class Command(BaseCommand):
+    help = (
+        "Import historical questionnaires from a CSV (with a header row of "
+        "field names) or JSON Lines file. An optional created_at column (ISO "
+        "8601) keeps the date each questionnaire was collected, and respondent "
+        "codes are recorded for the clinic given with --clinic. The file is "
+        "streamed, validated and inserted in chunks, so memory use does not "
+        "grow with its size. Rows that fail validation are written to a "
+        "rejects report instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL file to import.")
+        parser.add_argument(
+            '--format', choices=['csv', 'jsonl'],
+            help="File format; guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Rows validated and inserted per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            '--rejects', default=None,
+            help="Where to write rejected rows (default: <path>.rejects.csv).",
+        )
+        parser.add_argument(
+            '--clinic', default=None,
+            help="Clinic the rows come from, as named in CLINIC_API_KEYS "
+                 "(default: none, as for the public form).",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Validate the file and write the rejects report without inserting anything.",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist.")
+
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError("Could not guess the file format, use --format csv or --format jsonl.")
+
+        rejects_path = Path(options['rejects'] or f"{path}.rejects.csv")
+        imported = rejected = 0
+
+        with path.open(newline='', encoding='utf-8-sig') as source, \
+                rejects_path.open('w', newline='', encoding='utf-8') as rejects_file:
+            rejects = csv.writer(rejects_file)
+            rejects.writerow(['line', 'errors', 'row'])
+
+            rows = self._read_csv(source) if file_format == 'csv' else self._read_jsonl(source)
+            while True:
+                chunk = list(islice(rows, options['chunk_size']))
+                if not chunk:
+                    break
+
+                instances = []
+                for line, row, errors in chunk:
+                    if not errors:
+                        instance, errors = clean_row(row, options['clinic'])
+                    if errors:
+                        rejects.writerow([line, json.dumps(errors, ensure_ascii=False), json.dumps(row, ensure_ascii=False)])
+                        rejected += 1
+                    else:
+                        instances.append(instance)
+
+                if instances and not options['dry_run']:
+                    bulk_insert(instances)
+                imported += len(instances)
+                self.stdout.write(f"{imported} rows imported, {rejected} rejected")
+
+        verb = "validated" if options['dry_run'] else "imported"
+        self.stdout.write(self.style.SUCCESS(f"Done: {imported} rows {verb}, {rejected} rejected."))
+        if rejected:
+            self.stdout.write(f"Rejected rows written to {rejects_path}")
+
+    def _read_csv(self, source):
+        """Yield ``(line, row, errors)`` for each CSV record"""
+        reader = csv.DictReader(source)
+        for row in reader:
+            yield reader.line_num, row, {}
+
+    def _read_jsonl(self, source):
+        """Yield ``(line, row, errors)`` for each non-blank JSON line"""
+        for line, text in enumerate(source, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except json.JSONDecodeError as e:
+                yield line, text.strip(), {'__all__': [f"JSON inválido: {e}"]}
+                continue
+            if not isinstance(row, dict):
+                yield line, row, {'__all__': ["Cada linha deve ser um objeto JSON."]}
+                continue
+            yield line, row, {}
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from SleepForm.models import DailySubmissionCount, ScoreSummary
+from SleepForm.stats import rebuild_score_summary
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the dashboard counter tables (ScoreSummary and "
+        "DailySubmissionCount) from the stored questionnaires. Run it after "
+        "backfilling or rescoring, preferably while no submissions come in."
+    )
+
+    def handle(self, *args, **options):
+        rebuild_score_summary()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {ScoreSummary.objects.count()} score rows "
+            f"and {DailySubmissionCount.objects.count()} daily rows."
+        ))
@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Max, Min
+
+from SleepForm.instruments import PSQI
+from SleepForm.scoring import outdated_scores, save_scores, score_id_range
+from SleepForm.stats import rebuild_score_summary
+
+
+def _setup_worker():
+    # Spawned workers (the default outside Linux) start without Django
+    if not apps.ready:
+        django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored PSQI scores of every questionnaire scored with "
+        "rules older than the current PSQI.version (or never scored). The id "
+        "range is split into slices that worker processes read and score; "
+        "this process writes each slice back in its own transaction, so "
+        "SQLite only ever sees one writer, rewriting only the scores that "
+        "changed. Only outdated rows are touched, so an interrupted run can "
+        "simply be started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Worker processes; 1 scores in this process (default: one per CPU).",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help="Ids per slice handed to a worker (default: 5000).",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        bounds = outdated_scores().aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            self.stdout.write(self.style.SUCCESS(f"Nothing to do: every row is at version {PSQI.version}."))
+            return
+
+        ranges = [
+            (start, start + chunk_size)
+            for start in range(bounds['first'], bounds['last'] + 1, chunk_size)
+        ]
+        self.stdout.write(
+            f"Rescoring ids {bounds['first']}-{bounds['last']} to version {PSQI.version} "
+            f"in {len(ranges)} slices"
+        )
+
+        updated = changed = 0
+        for (start, stop), scores in zip(ranges, self._score(ranges, options['workers'])):
+            with transaction.atomic():
+                if len(scores['id']):
+                    changed += save_scores(scores)
+                # save_scores() already set the version of the rows it wrote
+                updated += len(scores['id']) + outdated_scores().filter(pk__gte=start, pk__lt=stop).update(
+                    scoring_version=PSQI.version,
+                )
+            self.stdout.write(f"{updated} rows rescored, {changed} changed (ids {start}-{stop - 1})")
+
+        if changed:
+            rebuild_score_summary()
+            self.stdout.write("Dashboard counters rebuilt.")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {updated} rows rescored, {changed} with new scores."))
+
+    def _score(self, ranges, workers):
+        """Yield the changed scores of each range, in order"""
+        if workers <= 1:
+            for start, stop in ranges:
+                yield score_id_range(start, stop)
+            return
+
+        # Forked workers must not share this process's database connection
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as executor:
+            yield from executor.map(score_id_range, *zip(*ranges))
@@ -0,0 +1,109 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter, so nothing is imported or cached beforehand.
+# Prints the seconds each boot phase took as JSON.
+BOOT_SCRIPT = '''
+import json, os, time
+timings = {}
+started = time.perf_counter()
+def phase(name):
+    global started
+    now = time.perf_counter()
+    timings[name] = now - started
+    started = now
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SleepScale.settings')
+from django.conf import settings
+settings.INSTALLED_APPS
+phase('settings')
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+phase('django_setup')
+from SleepForm.warmup import warm_up
+if %(warm_up)r:
+    warm_up()
+phase('warm_up')
+from django.test import Client
+client = Client()
+client.get('/')
+phase('first_request')
+client.get('/')
+phase('second_request')
+print(json.dumps(timings))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot the app in a fresh Python process and report how long it takes "
+        "until the first request is answered: settings (with .env), Django "
+        "setup (apps, admin autodiscovery, middleware), the warm-up done by "
+        "the gunicorn master, the first and a second request, and the "
+        "slowest imports (python -X importtime)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=15,
+            help="How many of the slowest outermost imports to list (default: 15).",
+        )
+        parser.add_argument(
+            '--no-warm-up', action='store_true',
+            help="Skip the warm-up, to see what it saves the first request.",
+        )
+        parser.add_argument(
+            '--json', action='store_true',
+            help="Print the report as JSON, e.g. to track it in CI.",
+        )
+
+    def handle(self, *args, **options):
+        script = BOOT_SCRIPT % {'warm_up': not options['no_warm_up']}
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'SleepScale.settings')}
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if process.returncode:
+            raise CommandError(f"The app failed to boot:\n{process.stderr[-2000:]}")
+
+        phases = json.loads(process.stdout.strip().splitlines()[-1])
+        imports = parse_importtime(process.stderr)
+        report = {
+            'phases': phases,
+            'total': sum(phases[name] for name in ('settings', 'django_setup', 'warm_up', 'first_request')),
+            'imports': sorted(imports, key=lambda item: item[1], reverse=True)[:options['top']],
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        for name, seconds in phases.items():
+            self.stdout.write(f"{name:<16}{seconds * 1000:9.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"{'to first request':<16}{report['total'] * 1000:9.1f} ms"))
+        self.stdout.write("\nSlowest outermost imports (cumulative):")
+        for module, seconds in report['imports']:
+            self.stdout.write(f"{seconds * 1000:9.1f} ms  {module}")
+
+
+def parse_importtime(output):
+    """
+    ``(module, cumulative seconds)`` for the outermost imports in the
+    stderr of ``python -X importtime``: the ones no other module's import
+    triggered, each including everything it imported in turn.
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit() or name.startswith('  '):
+            continue
+        imports.append((name.strip(), int(cumulative) / 1_000_000))
+    return imports
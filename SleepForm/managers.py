@@ -0,0 +1,35 @@
+"""
+In-database PSQI scoring.
+
+``SleepQuestionnaire.objects.with_psqi()`` annotates every row with the seven
+component scores and the total, as SQL expressions compiled from the same
+rules as the model's scoring (``instruments.PSQI``). The annotations can be
+filtered, ordered and aggregated in the same query on SQLite and PostgreSQL,
+e.g.::
+
+    SleepQuestionnaire.objects.with_psqi().filter(psqi_total__gt=5)
+
+A zero time in bed is scored like ``scoring.score_columns`` does, 0 when any
+sleep was reported and 3 otherwise, instead of dividing by zero.
+"""
+from django.db import models
+from django.db.models import F
+
+from .instruments import PSQI
+
+# Annotation names added by with_psqi(), one per component plus the total.
+# They are prefixed so they never clash with the stored ``*_score`` columns.
+PSQI_ANNOTATIONS = tuple(f'psqi_{name}' for name in PSQI.components)
+
+
+class SleepQuestionnaireQuerySet(models.QuerySet):
+
+    def with_psqi(self):
+        """
+        Annotate each row with ``psqi_duration``, ``psqi_disturbance``,
+        ``psqi_latency``, ``psqi_daytime``, ``psqi_efficiency``,
+        ``psqi_quality``, ``psqi_meds`` and ``psqi_total``.
+        """
+        return self.annotate(**PSQI.annotations('psqi_')).annotate(
+            psqi_total=sum((F(name) for name in PSQI_ANNOTATIONS[1:]), F(PSQI_ANNOTATIONS[0])),
+        )
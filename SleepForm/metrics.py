@@ -0,0 +1,269 @@
+"""
+Request-level performance metrics in Prometheus text format.
+
+Recorded as histograms:
+
+* ``sleepform_request_duration_seconds``: per view, method and status, timed
+  by ``MetricsMiddleware`` (for streaming responses, until the headers)
+* ``sleepform_request_db_queries`` and ``sleepform_request_db_seconds``: the
+  number of SQL queries a request ran and the time spent in them, per view
+* ``sleepform_template_render_seconds``: per top-level template, through the
+  ``TimedDjangoTemplates`` backend
+* ``sleepform_phase_duration_seconds``: sections of a view wrapped in
+  ``timed()``, e.g. form validation or the save of a submission
+
+Each process aggregates into its own in-memory registry, so recording a
+value costs a lock and a few additions. Gunicorn runs several worker
+processes and a scrape only reaches one of them: when ``settings.METRICS_DIR``
+is set, every process also writes its registry to a JSON file in that
+directory every ``METRICS_FLUSH_INTERVAL`` seconds, and the metrics view adds
+all the files up. The files of exited workers are kept so counts never go
+backwards; gunicorn.conf.py empties the directory when the server starts.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+# name: (help, label names, bucket upper bounds)
+HISTOGRAMS = {
+    'sleepform_request_duration_seconds': (
+        "Time to produce a response.", ('view', 'method', 'status'), SECONDS,
+    ),
+    'sleepform_request_db_queries': (
+        "SQL queries run while handling a request.", ('view',), QUERIES,
+    ),
+    'sleepform_request_db_seconds': (
+        "Time spent in SQL queries while handling a request.", ('view',), SECONDS,
+    ),
+    'sleepform_template_render_seconds': (
+        "Time to render a template.", ('template',), SECONDS,
+    ),
+    'sleepform_phase_duration_seconds': (
+        "Time spent in a named section of a view.", ('phase',), SECONDS,
+    ),
+}
+
+# {name: {label values: [count per bucket, then +Inf, then the sum]}}
+_registry = {name: {} for name in HISTOGRAMS}
+_lock = threading.Lock()
+_last_written = time.monotonic()
+_snapshot_name = f'{os.getpid()}-{time.time_ns()}.json'
+
+# Query counters of the request being handled, see MetricsMiddleware
+_request = ContextVar('sleepform_metrics_request', default=None)
+
+
+def observe(name, labels, value):
+    """Record ``value`` in histogram ``name`` under the label values ``labels``"""
+    buckets = HISTOGRAMS[name][2]
+    with _lock:
+        series = _registry[name].get(labels)
+        if series is None:
+            series = _registry[name][labels] = [0] * (len(buckets) + 2)
+        series[bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+
+@contextmanager
+def timed(phase):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('sleepform_phase_duration_seconds', (phase,), time.perf_counter() - started)
+
+
+def snapshot():
+    """This process's registry as JSON-compatible data"""
+    with _lock:
+        return {
+            name: [[list(labels), list(series)] for labels, series in series_by_labels.items()]
+            for name, series_by_labels in _registry.items()
+        }
+
+
+def collect():
+    """Every process's registry added up: this one, plus the files in METRICS_DIR"""
+    snapshots = [snapshot()]
+    if settings.METRICS_DIR:
+        for path in Path(settings.METRICS_DIR).glob('*.json'):
+            if path.name == _snapshot_name:
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # Removed or being replaced meanwhile
+
+    totals = {name: {} for name in HISTOGRAMS}
+    for data in snapshots:
+        for name, series_list in data.items():
+            if name not in totals:
+                continue
+            for labels, series in series_list:
+                total = totals[name].setdefault(tuple(labels), [0] * len(series))
+                for i, value in enumerate(series):
+                    total[i] += value
+    return totals
+
+
+def render(totals):
+    """Prometheus text exposition of ``collect()``'s result"""
+    lines = []
+    for name, (help_text, label_names, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, series in sorted(totals[name].items()):
+            pairs = [f'{label}="{_escape(value)}"' for label, value in zip(label_names, labels)]
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), series):
+                cumulative += count
+                bucket_labels = ','.join([*pairs, f'le="{bound}"'])
+                lines.append(f'{name}_bucket{{{bucket_labels}}} {cumulative}')
+            label_text = '{' + ','.join(pairs) + '}' if pairs else ''
+            lines.append(f'{name}_sum{label_text} {series[-1]}')
+            lines.append(f'{name}_count{label_text} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def write_snapshot():
+    """Replace this process's file in METRICS_DIR with its current registry"""
+    global _last_written
+    _last_written = time.monotonic()
+    directory = Path(settings.METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    temporary = directory / f'.{_snapshot_name}.tmp'
+    temporary.write_text(json.dumps(snapshot()))
+    os.replace(temporary, directory / _snapshot_name)
+
+
+def _write_snapshot_on_exit():
+    if settings.METRICS_DIR:
+        write_snapshot()
+
+
+atexit.register(_write_snapshot_on_exit)
+
+
+def reset():
+    """
+    Start this process's registry afresh, under a new file name. Runs in
+    every forked child: with gunicorn's preload_app the workers are forks of
+    the master, and must neither share its file nor count what it recorded.
+    """
+    global _lock, _snapshot_name
+    _lock = threading.Lock()
+    _snapshot_name = f'{os.getpid()}-{time.time_ns()}.json'
+    for series_by_labels in _registry.values():
+        series_by_labels.clear()
+
+
+os.register_at_fork(after_in_child=reset)
+
+
+class _RequestQueries:
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+def time_queries(execute, sql, params, many, context):
+    """Database execute wrapper counting the current request's queries"""
+    queries = _request.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.count += 1
+        queries.seconds += time.perf_counter() - started
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """``connection_created`` receiver adding ``time_queries`` to new connections"""
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_queries)
+
+
+class MetricsMiddleware:
+    """Times each request and counts its SQL queries, labelled by URL name"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        queries = _RequestQueries()
+        token = _request.set(queries)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        self.record(request, response, queries, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        queries = _RequestQueries()
+        token = _request.set(queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request.reset(token)
+        self.record(request, response, queries, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, queries, seconds):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        observe('sleepform_request_duration_seconds', (view, request.method, str(response.status_code)), seconds)
+        observe('sleepform_request_db_queries', (view,), queries.count)
+        observe('sleepform_request_db_seconds', (view,), queries.seconds)
+        if settings.METRICS_DIR and time.monotonic() - _last_written >= settings.METRICS_FLUSH_INTERVAL:
+            write_snapshot()
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            observe('sleepform_template_render_seconds', (self.template.name or '<string>',), time.perf_counter() - started)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, recording how long each render takes"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SleepForm', '0003_alter_sleepquestionnaire_bad_dreams_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sleepquestionnaire',
+            name='daytime_score',
+            field=models.PositiveSmallIntegerField(db_index=True, editable=False, null=True, verbose_name='Disfunção diurna'),
+        ),
+        migrations.AddField(
+            model_name='sleepquestionnaire',
+            name='disturbance_score',
+            field=models.PositiveSmallIntegerField(db_index=True, editable=False, null=True, verbose_name='Distúrbios do sono'),
+        ),
+        migrations.AddField(
+            model_name='sleepquestionnaire',
+            name='duration_score',
+            field=models.PositiveSmallIntegerField(db_index=True, editable=False, null=True, verbose_name='Duração do sono'),
+        ),
+        migrations.AddField(
+            model_name='sleepquestionnaire',
+            name='efficiency_score',
+            field=models.PositiveSmallIntegerField(db_index=True, editable=False, null=True, verbose_name='Eficiência do sono'),
+        ),
+        migrations.AddField(
+            model_name='sleepquestionnaire',
+            name='latency_score',
+            field=models.PositiveSmallIntegerField(db_index=True, editable=False, null=True, verbose_name='Latência do sono'),
+        ),
+        migrations.AddField(
+            model_name='sleepquestionnaire',
+            name='meds_score',
+            field=models.PositiveSmallIntegerField(db_index=True, editable=False, null=True, verbose_name='Uso de medicação para dormir'),
+        ),
+        migrations.AddField(
+            model_name='sleepquestionnaire',
+            name='quality_score',
+            field=models.PositiveSmallIntegerField(db_index=True, editable=False, null=True, verbose_name='Qualidade subjetiva do sono'),
+        ),
+        migrations.AddField(
+            model_name='sleepquestionnaire',
+            name='total_score',
+            field=models.PositiveSmallIntegerField(db_index=True, editable=False, null=True, verbose_name='Pontuação total (PSQI)'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SleepForm', '0004_sleepquestionnaire_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySubmissionCount',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScoreSummary',
+            fields=[
+                ('total_score', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('duration_sum', models.PositiveIntegerField(default=0)),
+                ('disturbance_sum', models.PositiveIntegerField(default=0)),
+                ('latency_sum', models.PositiveIntegerField(default=0)),
+                ('daytime_sum', models.PositiveIntegerField(default=0)),
+                ('efficiency_sum', models.PositiveIntegerField(default=0)),
+                ('quality_sum', models.PositiveIntegerField(default=0)),
+                ('meds_sum', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,240 @@
+# Generated by Django 5.2 on 2026-10-18 18:22
+
+from django.db import migrations, models
+
+
+class RemakeTableOnce(migrations.operations.base.Operation):
+    """
+    Run ``operations`` on one model. SQLite rebuilds the whole table for each
+    AlterField and AddConstraint; there the table is rebuilt once, straight
+    into its final definition. Other databases run the operations one by one.
+    """
+
+    def __init__(self, model_name, operations):
+        self.model_name = model_name
+        self.operations = operations
+
+    def deconstruct(self):
+        return self.__class__.__name__, [self.model_name, self.operations], {}
+
+    def state_forwards(self, app_label, state):
+        for operation in self.operations:
+            operation.state_forwards(app_label, state)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            schema_editor._remake_table(to_state.apps.get_model(app_label, self.model_name))
+            return
+        for operation in self.operations:
+            state = from_state.clone()
+            operation.state_forwards(app_label, state)
+            operation.database_forwards(app_label, schema_editor, from_state, state)
+            from_state = state
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            schema_editor._remake_table(to_state.apps.get_model(app_label, self.model_name))
+            return
+        states = [to_state]
+        for operation in self.operations[:-1]:
+            state = states[-1].clone()
+            operation.state_forwards(app_label, state)
+            states.append(state)
+        for operation, state in zip(reversed(self.operations), reversed(states)):
+            operation.database_backwards(app_label, schema_editor, from_state, state)
+            from_state = state
+
+    def describe(self):
+        return f"Alter fields and constraints of {self.model_name} ({len(self.operations)} operations)"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SleepForm', '0005_score_summary'),
+    ]
+
+    operations = [
+        RemakeTableOnce('sleepquestionnaire', [
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='bad_dreams',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], verbose_name='Teve sonhos ruins'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='bathroom_visits',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], verbose_name='Precisou levantar para ir ao banheiro'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='breathing_difficulty',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], verbose_name='Não conseguiu respirar confortavelmente'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='coughing_snoring',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], verbose_name='Tossiu ou roncou forte'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='daytime_sleepiness',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], verbose_name='Dificuldade de ficar acordado durante atividades'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='difficulty_falling_asleep',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], verbose_name='Não conseguiu adormecer em até 30 minutos'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='difficulty_staying_asleep',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], verbose_name='Acordou no meio da noite ou de manhã cedo'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='enthusiasm_difficulty',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Nenhuma dificuldade'), (1, 'Um problema leve'), (2, 'Um problema razoável'), (3, 'Um grande problema')], verbose_name='Dificuldade em manter entusiasmo'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='felt_cold',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], verbose_name='Sentiu muito frio'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='felt_hot',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], verbose_name='Sentiu muito calor'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='has_partner',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Não'), (1, 'Parceiro ou colega, mas em outro quarto'), (2, 'Parceiro no mesmo quarto, mas não na mesma cama'), (3, 'Parceiro na mesma cama')], verbose_name='Tem parceiro/colega de quarto?'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='medication_use',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], verbose_name='Uso de medicamento para dormir'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='other_reason_frequency',
+                field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], null=True, verbose_name='Frequência da outra razão'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='pain',
+                field=models.PositiveSmallIntegerField(choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], verbose_name='Teve dor'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='partner_breathing_pauses',
+                field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], null=True, verbose_name='Longas paradas na respiração (observado por parceiro)'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='partner_confusion',
+                field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], null=True, verbose_name='Episódios de desorientação (observado por parceiro)'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='partner_leg_movements',
+                field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], null=True, verbose_name='Contrações/puxões nas pernas (observado por parceiro)'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='partner_other_frequency',
+                field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], null=True, verbose_name='Frequência das outras alterações'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='partner_snoring',
+                field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Nenhuma no último mês'), (1, 'Menos de 1 vez/semana'), (2, '1 ou 2 vezes/semana'), (3, '3 ou mais vezes/semana')], null=True, verbose_name='Ronco forte (observado por parceiro)'),
+            ),
+            migrations.AlterField(
+                model_name='sleepquestionnaire',
+                name='sleep_quality',
+                field=models.PositiveSmallIntegerField(choices=[(4, 'Muito boa'), (3, 'Boa'), (2, 'Ruim'), (1, 'Muito ruim')], verbose_name='Qualidade geral do sono'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('difficulty_falling_asleep__gte', 0), ('difficulty_falling_asleep__lte', 3)), name='sleepform_difficulty_falling_asleep_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('difficulty_staying_asleep__gte', 0), ('difficulty_staying_asleep__lte', 3)), name='sleepform_difficulty_staying_asleep_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('bathroom_visits__gte', 0), ('bathroom_visits__lte', 3)), name='sleepform_bathroom_visits_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('breathing_difficulty__gte', 0), ('breathing_difficulty__lte', 3)), name='sleepform_breathing_difficulty_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('coughing_snoring__gte', 0), ('coughing_snoring__lte', 3)), name='sleepform_coughing_snoring_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('felt_cold__gte', 0), ('felt_cold__lte', 3)), name='sleepform_felt_cold_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('felt_hot__gte', 0), ('felt_hot__lte', 3)), name='sleepform_felt_hot_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('bad_dreams__gte', 0), ('bad_dreams__lte', 3)), name='sleepform_bad_dreams_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('pain__gte', 0), ('pain__lte', 3)), name='sleepform_pain_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('other_reason_frequency__gte', 0), ('other_reason_frequency__lte', 3)), name='sleepform_other_reason_frequency_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('daytime_sleepiness__gte', 0), ('daytime_sleepiness__lte', 3)), name='sleepform_daytime_sleepiness_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('enthusiasm_difficulty__gte', 0), ('enthusiasm_difficulty__lte', 3)), name='sleepform_enthusiasm_difficulty_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('medication_use__gte', 0), ('medication_use__lte', 3)), name='sleepform_medication_use_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('has_partner__gte', 0), ('has_partner__lte', 3)), name='sleepform_has_partner_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('partner_snoring__gte', 0), ('partner_snoring__lte', 3)), name='sleepform_partner_snoring_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('partner_breathing_pauses__gte', 0), ('partner_breathing_pauses__lte', 3)), name='sleepform_partner_breathing_pauses_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('partner_leg_movements__gte', 0), ('partner_leg_movements__lte', 3)), name='sleepform_partner_leg_movements_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('partner_confusion__gte', 0), ('partner_confusion__lte', 3)), name='sleepform_partner_confusion_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('partner_other_frequency__gte', 0), ('partner_other_frequency__lte', 3)), name='sleepform_partner_other_frequency_range'),
+            ),
+            migrations.AddConstraint(
+                model_name='sleepquestionnaire',
+                constraint=models.CheckConstraint(condition=models.Q(('sleep_quality__gte', 1), ('sleep_quality__lte', 4)), name='sleepform_sleep_quality_range'),
+            ),
+        ]),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SleepForm', '0006_compact_answers'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sleepquestionnaire',
+            index=models.Index(fields=['created_at', 'id'], name='sleepform_created_id_idx'),
+        ),
+    ]
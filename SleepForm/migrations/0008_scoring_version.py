@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SleepForm', '0007_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sleepquestionnaire',
+            name='scoring_version',
+            field=models.PositiveSmallIntegerField(db_index=True, editable=False, null=True, verbose_name='Versão das regras de pontuação'),
+        ),
+    ]
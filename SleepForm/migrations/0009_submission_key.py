@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 18:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SleepForm', '0008_scoring_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sleepquestionnaire',
+            name='submission_key',
+            field=models.UUIDField(editable=False, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-18 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SleepForm', '0009_submission_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sleepquestionnaire',
+            name='respondent',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, verbose_name='Respondente (pseudônimo)'),
+        ),
+        migrations.AddIndex(
+            model_name='sleepquestionnaire',
+            index=models.Index(condition=models.Q(('respondent__isnull', False)), fields=['respondent', 'created_at'], name='sleepform_respondent_idx'),
+        ),
+    ]
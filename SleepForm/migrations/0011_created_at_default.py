@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-18 19:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SleepForm', '0010_respondent'),
+    ]
+
+    # auto_now_add -> default=timezone.now: both are filled in by Django, so
+    # the column is unchanged. State only, or SQLite would rebuild the table.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='sleepquestionnaire',
+                    name='created_at',
+                    field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+                ),
+            ],
+        ),
+    ]
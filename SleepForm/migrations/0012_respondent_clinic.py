@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SleepForm', '0011_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sleepquestionnaire',
+            name='clinic',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, verbose_name='Clínica'),
+        ),
+    ]
@@ -1,6 +1,41 @@
-from datetime import datetime
+from functools import cache
 from time import time
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .instruments import PSQI, PSQI_DAYTIME_FIELDS, PSQI_DIFFICULTY_FIELDS
+from .managers import SleepQuestionnaireQuerySet
+
+# The seven PSQI components, in the order they are added up
+COMPONENTS = PSQI.components
+
+
+# Multiple choice answers whose choices run from 0 to 3 (Frequency, Difficulty
+# and Partner); sleep_quality (Quality) runs from 1 to 4
+ZERO_TO_THREE_ANSWERS = PSQI_DIFFICULTY_FIELDS + PSQI_DAYTIME_FIELDS + (
+    'medication_use',
+    'has_partner',
+    'partner_snoring',
+    'partner_breathing_pauses',
+    'partner_leg_movements',
+    'partner_confusion',
+    'partner_other_frequency',
+)
+
+
+def _answer_range(field, lowest, highest):
+    """Database check that a multiple choice answer is within its choices"""
+    return models.CheckConstraint(
+        condition=models.Q(**{f'{field}__gte': lowest, f'{field}__lte': highest}),
+        name=f'sleepform_{field}_range',
+    )
+
+
+@cache
+def _values_by_label(choices):
+    """Label -> value lookup for an IntegerChoices enum, built once per enum"""
+    return {name: value for value, name in choices.choices}
 
 
 class SleepQuestionnaire(models.Model):
@@ -12,10 +47,7 @@ class SleepQuestionnaire(models.Model):
 
         @classmethod
         def get_value(cls, label):
-            for value, name in cls.choices:
-                if name == label:
-                    return value
-            return None
+            return _values_by_label(cls).get(label)
 
     class Quality(models.IntegerChoices):
         VERY_GOOD = 4, 'Muito boa'
@@ -25,10 +57,7 @@ class SleepQuestionnaire(models.Model):
 
         @classmethod
         def get_value(cls, label):
-            for value, name in cls.choices:
-                if name == label:
-                    return value
-            return None
+            return _values_by_label(cls).get(label)
     
     class Frequency(models.IntegerChoices): 
         NONE = 0, 'Nenhuma no último mês'
@@ -38,10 +67,7 @@ class SleepQuestionnaire(models.Model):
 
         @classmethod
         def get_value(cls, label):
-            for value, name in cls.choices:
-                if name == label:
-                    return value
-            return None
+            return _values_by_label(cls).get(label)
 
     class Partner(models.IntegerChoices):
         NO = 0, 'Não'
@@ -51,10 +77,7 @@ class SleepQuestionnaire(models.Model):
 
         @classmethod
         def get_value(cls, label):
-            for value, name in cls.choices:
-                if name == label:
-                    return value
-            return None
+            return _values_by_label(cls).get(label)
 
     # Basic sleep information
     bedtime = models.TimeField(verbose_name="Hora usual de deitar") # Q1
@@ -63,290 +86,329 @@ class SleepQuestionnaire(models.Model):
     sleep_hours = models.FloatField(verbose_name="Horas de sono por noite") # Q4
     
     # Sleep difficulties = Q5
-    difficulty_falling_asleep = models.IntegerField(
-        max_length=1, choices=Frequency.choices,
+    difficulty_falling_asleep = models.PositiveSmallIntegerField(
+        choices=Frequency.choices,
         verbose_name="Não conseguiu adormecer em até 30 minutos"
     )
-    difficulty_staying_asleep = models.IntegerField(
-        max_length=1, choices=Frequency.choices,
+    difficulty_staying_asleep = models.PositiveSmallIntegerField(
+        choices=Frequency.choices,
         verbose_name="Acordou no meio da noite ou de manhã cedo"
     )
-    bathroom_visits = models.IntegerField(
-        max_length=1, choices=Frequency.choices,
+    bathroom_visits = models.PositiveSmallIntegerField(
+        choices=Frequency.choices,
         verbose_name="Precisou levantar para ir ao banheiro"
     )
-    breathing_difficulty = models.IntegerField(
-        max_length=1, choices=Frequency.choices,
+    breathing_difficulty = models.PositiveSmallIntegerField(
+        choices=Frequency.choices,
         verbose_name="Não conseguiu respirar confortavelmente"
     )
-    coughing_snoring = models.IntegerField(
-        max_length=1, choices=Frequency.choices,
+    coughing_snoring = models.PositiveSmallIntegerField(
+        choices=Frequency.choices,
         verbose_name="Tossiu ou roncou forte"
     )
-    felt_cold = models.IntegerField(
-        max_length=1, choices=Frequency.choices,
+    felt_cold = models.PositiveSmallIntegerField(
+        choices=Frequency.choices,
         verbose_name="Sentiu muito frio"
     )
-    felt_hot = models.IntegerField(
-        max_length=1, choices=Frequency.choices,
+    felt_hot = models.PositiveSmallIntegerField(
+        choices=Frequency.choices,
         verbose_name="Sentiu muito calor"
     )
-    bad_dreams = models.IntegerField(
-        max_length=1, choices=Frequency.choices,
+    bad_dreams = models.PositiveSmallIntegerField(
+        choices=Frequency.choices,
         verbose_name="Teve sonhos ruins"
     )
-    pain = models.IntegerField(
-        max_length=1, choices=Frequency.choices,
+    pain = models.PositiveSmallIntegerField(
+        choices=Frequency.choices,
         verbose_name="Teve dor"
     )
     other_reason = models.TextField(
         blank=True, null=True,
         verbose_name="Outra(s) razão(ões), por favor descreva"
     )
-    other_reason_frequency = models.IntegerField(
-        max_length=1, choices=Frequency.choices, blank=True, null=True,
+    other_reason_frequency = models.PositiveSmallIntegerField(
+        choices=Frequency.choices, blank=True, null=True,
         verbose_name="Frequência da outra razão"
     )
     
     # General sleep evaluation = Q6, Q7, Q8, Q9
-    sleep_quality = models.IntegerField(
-        max_length=1, choices=Quality.choices,
+    sleep_quality = models.PositiveSmallIntegerField(
+        choices=Quality.choices,
         verbose_name="Qualidade geral do sono"
     )
-    medication_use = models.IntegerField(
-        max_length=1, choices=Frequency.choices,
+    medication_use = models.PositiveSmallIntegerField(
+        choices=Frequency.choices,
         verbose_name="Uso de medicamento para dormir"
     )
-    daytime_sleepiness = models.IntegerField(
-        max_length=1, choices=Frequency.choices,
+    daytime_sleepiness = models.PositiveSmallIntegerField(
+        choices=Frequency.choices,
         verbose_name="Dificuldade de ficar acordado durante atividades"
     )
-    enthusiasm_difficulty = models.IntegerField(
-        max_length=1, choices=Difficulty.choices,
+    enthusiasm_difficulty = models.PositiveSmallIntegerField(
+        choices=Difficulty.choices,
         verbose_name="Dificuldade em manter entusiasmo"
     )
     
     # Partner information
-    has_partner = models.IntegerField(
-        max_length=1, choices=Partner.choices,
+    has_partner = models.PositiveSmallIntegerField(
+        choices=Partner.choices,
         verbose_name="Tem parceiro/colega de quarto?"
     )
-    partner_snoring = models.IntegerField(
-        max_length=1, choices=Frequency.choices, blank=True, null=True,
+    partner_snoring = models.PositiveSmallIntegerField(
+        choices=Frequency.choices, blank=True, null=True,
         verbose_name="Ronco forte (observado por parceiro)"
     )
-    partner_breathing_pauses = models.IntegerField(
-        max_length=1, choices=Frequency.choices, blank=True, null=True,
+    partner_breathing_pauses = models.PositiveSmallIntegerField(
+        choices=Frequency.choices, blank=True, null=True,
         verbose_name="Longas paradas na respiração (observado por parceiro)"
     )
-    partner_leg_movements = models.IntegerField(
-        max_length=1, choices=Frequency.choices, blank=True, null=True,
+    partner_leg_movements = models.PositiveSmallIntegerField(
+        choices=Frequency.choices, blank=True, null=True,
         verbose_name="Contrações/puxões nas pernas (observado por parceiro)"
     )
-    partner_confusion = models.IntegerField(
-        max_length=1, choices=Frequency.choices, blank=True, null=True,
+    partner_confusion = models.PositiveSmallIntegerField(
+        choices=Frequency.choices, blank=True, null=True,
         verbose_name="Episódios de desorientação (observado por parceiro)"
     )
     partner_other_issues = models.TextField(
         blank=True, null=True,
         verbose_name="Outras alterações observadas (descreva)"
     )
-    partner_other_frequency = models.IntegerField(
-        max_length=1, choices=Frequency.choices, blank=True, null=True,
+    partner_other_frequency = models.PositiveSmallIntegerField(
+        choices=Frequency.choices, blank=True, null=True,
         verbose_name="Frequência das outras alterações"
     )
     
-    created_at = models.DateTimeField(auto_now_add=True) 
+    # When the answers were collected: now, or the time given with an
+    # imported or synced questionnaire (see ingest.clean_row)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    # Key of the form page the answers were sent from, so a repeated POST of
+    # the same page is not stored twice (see SleepForm/idempotency.py)
+    submission_key = models.UUIDField(null=True, unique=True, editable=False)
+
+    # Pseudonym of the respondent, when the questionnaire was sent with their
+    # code, linking the questionnaires of one person (see SleepForm/respondents.py)
+    respondent = models.CharField(
+        max_length=64, null=True, blank=True, editable=False,
+        verbose_name="Respondente (pseudônimo)"
+    )
+    # Clinic that sent the questionnaire through the API or an import, NULL
+    # for the public form. Respondents are scoped to it (see respondents.py).
+    clinic = models.CharField(
+        max_length=100, null=True, blank=True, editable=False,
+        verbose_name="Clínica"
+    )
+
+    # Stored PSQI scores, filled in by save() from the answers above
+    duration_score = models.PositiveSmallIntegerField(
+        null=True, editable=False, db_index=True,
+        verbose_name="Duração do sono"
+    )
+    disturbance_score = models.PositiveSmallIntegerField(
+        null=True, editable=False, db_index=True,
+        verbose_name="Distúrbios do sono"
+    )
+    latency_score = models.PositiveSmallIntegerField(
+        null=True, editable=False, db_index=True,
+        verbose_name="Latência do sono"
+    )
+    daytime_score = models.PositiveSmallIntegerField(
+        null=True, editable=False, db_index=True,
+        verbose_name="Disfunção diurna"
+    )
+    efficiency_score = models.PositiveSmallIntegerField(
+        null=True, editable=False, db_index=True,
+        verbose_name="Eficiência do sono"
+    )
+    quality_score = models.PositiveSmallIntegerField(
+        null=True, editable=False, db_index=True,
+        verbose_name="Qualidade subjetiva do sono"
+    )
+    meds_score = models.PositiveSmallIntegerField(
+        null=True, editable=False, db_index=True,
+        verbose_name="Uso de medicação para dormir"
+    )
+    total_score = models.PositiveSmallIntegerField(
+        null=True, editable=False, db_index=True,
+        verbose_name="Pontuação total (PSQI)"
+    )
+    # PSQI.version the scores above were computed with; NULL before versions
+    # were recorded. ``manage.py rescore`` recomputes rows behind the current one.
+    scoring_version = models.PositiveSmallIntegerField(
+        null=True, editable=False, db_index=True,
+        verbose_name="Versão das regras de pontuação"
+    )
+
+    objects = SleepQuestionnaireQuerySet.as_manager()
+
+    # Q5a-Q5j, summed for the sleep disturbance component
+    DIFFICULTY_FIELDS = PSQI_DIFFICULTY_FIELDS
+
+    # Q8 + Q9, summed for the daytime dysfunction component
+    DAYTIME_FIELDS = PSQI_DAYTIME_FIELDS
+
+    class Meta:
+        # Answers are stored as small integers, and the database only accepts
+        # values that are one of the choices (NULL passes for optional ones)
+        constraints = [
+            *(_answer_range(field, 0, 3) for field in ZERO_TO_THREE_ANSWERS),
+            _answer_range('sleep_quality', 1, 4),
+        ]
+        # Newest-first listings (the admin pages by keyset on this pair)
+        # and date ranges on created_at
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='sleepform_created_id_idx'),
+            # Each respondent's history, in order. Partial: most rows have
+            # no respondent and stay out of it.
+            models.Index(
+                fields=['respondent', 'created_at'], name='sleepform_respondent_idx',
+                condition=models.Q(respondent__isnull=False),
+            ),
+        ]
     
     def __str__(self):
         return f"Questionário de sono de {self.created_at.date()}"
+
+    def save(self, *args, **kwargs):
+        self.update_scores()
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                record_submissions([self])
+
+    def get_constraints(self):
+        """
+        The constraints full_clean() validates, without the answer ranges:
+        clean_fields() already checks the answers against their choices, and
+        validating the ranges again would build a query per constraint on
+        every form submission. The database still enforces them.
+        """
+        ranges = {f'sleepform_{field}_range' for field in (*ZERO_TO_THREE_ANSWERS, 'sleep_quality')}
+        return [
+            (model, [constraint for constraint in constraints if constraint.name not in ranges])
+            for model, constraints in super().get_constraints()
+        ]
+
+    def update_scores(self):
+        """Store the component scores and the total in their score columns"""
+        components = self.calculate_component_scores()
+        for name, score in components.items():
+            setattr(self, f"{name}_score", score)
+        self.total_score = sum(components.values())
+        self.scoring_version = PSQI.version
+
+    def calculate_component_scores(self):
+        """
+        The seven PSQI components, keyed by name:
+        DURAT, DISTB, LATEN, DAYDYS, HSE, SLPQUAL, MEDS
+        The rules are in instruments.PSQI.
+        """
+        return PSQI.score(self)
             
     def calculate_total_score(self):
         """
         DURAT + DISTB + LATEN + DAYDYS + HSE + SLPQUAL + MEDS Minimum
         Score = 0 (better); Maximum Score = 21 (worse) 
         """
-        duration_score = self._get_duration_score()
-        difficulty_score = self._get_difficulty_score()
-        latent_score = self._get_latent_score()
-        daytime_score = self._get_daytime_score()
-        sleep_efficiency_score = self._get_sleep_efficiency_score()
-        sleep_quality_score = int(getattr(self, "sleep_quality"))
-        medication_use_score = int(getattr(self, "medication_use"))
-
-        total = duration_score + difficulty_score + latent_score + daytime_score + sleep_efficiency_score + sleep_quality_score + medication_use_score
-
-        return total
+        return sum(self.calculate_component_scores().values())
     
     def _get_duration_score(self):
-        """
-        IF Q4 > 7, THEN set value to 0
-        IF Q4 < 7 and > 6, THEN set value to 1
-        IF Q4 < 6 and > 5, THEN set value to 2
-        IF Q4 < 5, THEN set value to 3
-        Minimum Score = 0 (better); Maximum Score = 3 (worse) 
-        """
-        if float(self.sleep_hours) >= 7:
-            return 0
-        elif 6 < float(self.sleep_hours) < 7:
-            return 1
-        elif 5 < float(self.sleep_hours) <= 6:
-            return 2
-        else:
-            return 3
+        """DURAT, from Q4"""
+        return PSQI.score_one('duration', self)
     
     def _get_difficulty_score(self):
-        """
-        IF Q5COM = 0, THEN set value to 0
-        IF Q5COM > 1 and < 9, THEN set value to 1
-        IF Q5COM > 9 and < 18, THEN set value to 2
-        IF Q5COM > 18, THEN set value to 3
-        Minimum Score = 0 (better); Maximum Score = 3 (worse)
-        """
-        difficulty_score = self._sum_difficulty_scores()
-        
-        if difficulty_score == 0:
-            return 0
-        elif 0 < difficulty_score < 9:
-            return 1
-        elif 9 <= difficulty_score < 18:
-            return 2
-        else:
-            return 3
+        """DISTB, from the sum of Q5a-Q5j"""
+        return PSQI.score_one('disturbance', self)
 
     def _get_new_latent_score(self):
-        """
-        First, recode Q2 into Q2new thusly:
-        IF Q2 > 0 and < 15, THEN set value of Q2new to 0
-        IF Q2 > 15 and < 30, THEN set value of Q2new to 1
-        IF Q2 > 30 and < 60, THEN set value of Q2new to 2
-        IF Q2 > 60, THEN set value of Q2new to 3 
-        """
-        if self.time_to_sleep is None:
-            return None
-        
-        if 0 < self.time_to_sleep < 15:
-            return 0
-        elif 15 <= self.time_to_sleep < 30:
-            return 1
-        elif 30 <= self.time_to_sleep < 60:
-            return 2
-        else:
-            return 3
+        """Q2new, Q2 recoded for LATEN"""
+        return PSQI.score_one('new_latency', self)
         
     def _get_latent_score(self):
-        """
-        Next
-        IF Q5a + Q2new = 0, THEN set value to 0
-        IF Q5a + Q2new >= 1 and <= 2, THEN set value to 1
-        IF Q5a + Q2new >= 3 and <= 4, THEN set value to 2
-        IF Q5a + Q2new >= 5 and <= 6, THEN set value to 3
-        Minimum Score = 0 (better); Maximum Score = 3 (worse) 
-        """
-        if int(getattr(self, "difficulty_falling_asleep")) + self._get_new_latent_score() == 0:
-            return 0
-        elif 1 <= (int(getattr(self, "difficulty_falling_asleep")) + self._get_new_latent_score()) <= 2:
-            return 1
-        elif 3 <= (int(getattr(self, "difficulty_falling_asleep")) + self._get_new_latent_score()) <= 4:
-            return 2
-        else:
-            return 3
+        """LATEN, from Q5a + Q2new"""
+        return PSQI.score_one('latency', self)
 
     def _get_daytime_score(self):
-        """
-        IF Q8 + Q9 = 0, THEN set value to 0
-        IF Q8 + Q9 > 1 and < 2, THEN set value to 1
-        IF Q8 + Q9 > 3 and < 4, THEN set value to 2
-        IF Q8 + Q9 > 5 and < 6, THEN set value to 3
-        Minimum Score = 0 (better); Maximum Score = 3 (worse)
-        """
-        daytime_score = self._sum_daytime_scores()
-        
-        if daytime_score == 0:
-            return 0
-        elif 1 <= daytime_score <= 2:
-            return 1
-        elif 3 <= daytime_score <= 4:
-            return 2
-        else:
-            return 3
+        """DAYDYS, from Q8 + Q9"""
+        return PSQI.score_one('daytime', self)
 
     def _get_sleep_efficiency_score(self):
-        """
-        Diffsec = Diffsec = Difference in seconds between times for Bed Time (Q1) and
-        Getting Up Time (Q3).
-        Diffhour = Absolute value of diffsec / 3600
-        newtib =IF diffhour > 24, then newtib = diffhour – 24
-        IF diffhour < 24, THEN newtib = diffhour
-        (NOTE, THE ABOVE JUST CALCULATES THE HOURS BETWEEN BED
-        TIME (Q1) AND GETTING UP TIME (Q3)
-        tmphse = (Q4 / newtib) * 100
-        IF tmphse > 85, THEN set value to 0
-        IF tmphse < 85 and > 75, THEN set value to 1
-        IF tmphse < 75 and > 65, THEN set value to 2
-        IF tmphse < 65, THEN set value to 3
-        Minimum Score = 0 (better); Maximum Score = 3 (worse) 
-        """
-        if self.bedtime is None or self.wakeup_time is None:
-            return None
-        
-        # Calculate the difference in seconds between bedtime and wakeup time
-        diffsec = (datetime.combine(datetime.today(), self.wakeup_time) - 
-                   datetime.combine(datetime.today(), self.bedtime)).total_seconds()
-        
-        # Calculate the absolute value of diffsec in hours
-        diffhour = abs(diffsec) / 3600
+        """HSE, Q4 as a percentage of the time between Q1 and Q3"""
+        return PSQI.score_one('efficiency', self)
 
-        # Adjust for overnight sleep
-        newtib = diffhour - 24 if diffhour > 24 else diffhour
-        
-        # Calculate sleep efficiency
-        tmphse = (self.sleep_hours / newtib) * 100
-        
-        if tmphse >= 85:
-            return 0
-        elif 75 <= tmphse < 85:
-            return 1
-        elif 65 <= tmphse < 75:
-            return 2
-        else:
-            return 3
-
-    def _sum_difficulty_scores(self):
-        """Helper method to sum all sleep difficulty scores"""
-        difficulty_fields = [
-            'difficulty_falling_asleep',
-            'difficulty_staying_asleep',
-            'bathroom_visits',
-            'breathing_difficulty',
-            'coughing_snoring',
-            'felt_cold',
-            'felt_hot',
-            'bad_dreams',
-            'pain',
-            'other_reason_frequency'
-        ]
-        return sum(
-            int(getattr(self, field)) 
-            for field in difficulty_fields 
-            if getattr(self, field) is not None
-        )
-    
     def _get_quality_score(self):
         """Helper method for sleep quality component"""
         if self.sleep_quality is None:
             return None
         return (4 - int(self.sleep_quality) + 1)  # Inverted scoring
-    
-    def _sum_daytime_scores(self):
-        """Helper method for daytime impact component"""
-        daytime_fields = [
-            'daytime_sleepiness',
-            'enthusiasm_difficulty'
-        ]
-        return sum(
-            int(getattr(self, field))
-            for field in daytime_fields
-            if getattr(self, field) is not None
+
+
+
+class ScoreSummary(models.Model):
+    """
+    Running totals for every questionnaire with a given PSQI total, updated
+    in the same transaction as each insert (see record_submissions). The
+    dashboard reads these few rows instead of scanning SleepQuestionnaire.
+    """
+    total_score = models.PositiveSmallIntegerField(primary_key=True)
+    count = models.PositiveIntegerField(default=0)
+    duration_sum = models.PositiveIntegerField(default=0)
+    disturbance_sum = models.PositiveIntegerField(default=0)
+    latency_sum = models.PositiveIntegerField(default=0)
+    daytime_sum = models.PositiveIntegerField(default=0)
+    efficiency_sum = models.PositiveIntegerField(default=0)
+    quality_sum = models.PositiveIntegerField(default=0)
+    meds_sum = models.PositiveIntegerField(default=0)
+    def __str__(self):
+        return f"Pontuação {self.total_score}: {self.count} questionários"
+
+
+class DailySubmissionCount(models.Model):
+    """Number of questionnaires collected on each (local) day"""
+    day = models.DateField(primary_key=True)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.count} questionários"
+
+
+def record_submissions(questionnaires):
+    """
+    Add newly saved questionnaires to ScoreSummary and DailySubmissionCount.
+    Call it inside the transaction that inserted them.
+    """
+    summaries = {}
+    days = {}
+    for questionnaire in questionnaires:
+        day = timezone.localdate(questionnaire.created_at)
+        days[day] = days.get(day, 0) + 1
+
+        if questionnaire.total_score is None:
+            continue
+        summary = summaries.setdefault(
+            questionnaire.total_score,
+            dict.fromkeys(['count'] + [f'{name}_sum' for name in COMPONENTS], 0),
         )
+        summary['count'] += 1
+        for name in COMPONENTS:
+            summary[f'{name}_sum'] += getattr(questionnaire, f'{name}_score')
+
+    for total_score, increments in summaries.items():
+        _increment(ScoreSummary, total_score, increments)
+    for day, count in days.items():
+        _increment(DailySubmissionCount, day, {'count': count})
+
 
+def _increment(model, pk, increments):
+    """Atomically add ``increments`` to the counters of one row, creating it if needed"""
+    updates = {field: F(field) + value for field, value in increments.items()}
+    if model.objects.filter(pk=pk).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(pk=pk, **increments)
+    except IntegrityError:
+        # Created by a concurrent insert in the meantime
+        model.objects.filter(pk=pk).update(**updates)
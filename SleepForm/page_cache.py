@@ -0,0 +1,76 @@
+"""
+Caching for the questionnaire page.
+
+Apart from the CSRF token, a GET of the questionnaire returns the same page to
+everyone. The unbound form markup is rendered once and kept in the cache, and
+the page gets an ETag and Last-Modified so browsers that already have it get
+a 304 instead of a new copy.
+
+Both validators are derived from the templates' modification time and from
+the visitor's CSRF cookie, so a cached copy is only reused while the CSRF
+token inside it is still valid. Visitors without the cookie always get a
+full response, which sets it.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import cache
+from os.path import getmtime
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+from .forms import SleepQuestionnaireForm
+
+QUESTIONNAIRE_TEMPLATES = (
+    'base.html',
+    'SleepForm/questionnaire.html',
+    'SleepForm/_questionnaire_fields.html',
+)
+
+
+@cache
+def templates_modified():
+    """Last modification time of the templates making up the page"""
+    latest = max(getmtime(get_template(name).origin.name) for name in QUESTIONNAIRE_TEMPLATES)
+    return datetime.fromtimestamp(int(latest), tz=timezone.utc)
+
+
+def unbound_form_markup(clinic=None):
+    """
+    Rendered fields of an empty SleepQuestionnaireForm, from the cache when
+    possible. The clinics' pages share one copy: only the code field differs.
+    """
+    key = f'sleepform:questionnaire-fields:{templates_modified().timestamp():.0f}'
+    if clinic is not None:
+        key += ':clinic'
+    markup = django_cache.get_or_set(
+        key,
+        lambda: render_to_string(
+            'SleepForm/_questionnaire_fields.html', {'form': SleepQuestionnaireForm(clinic=clinic)},
+        ),
+        timeout=None,
+    )
+    return mark_safe(markup)
+
+
+def questionnaire_etag(request, *args, **kwargs):
+    csrf_cookie = _csrf_cookie(request)
+    if csrf_cookie is None:
+        return None
+    digest = hashlib.sha256(csrf_cookie.encode()).hexdigest()[:16]
+    return f'{templates_modified().timestamp():.0f}-{digest}'
+
+
+def questionnaire_last_modified(request, *args, **kwargs):
+    if _csrf_cookie(request) is None:
+        return None
+    return templates_modified()
+
+
+def _csrf_cookie(request):
+    """The visitor's CSRF cookie, only for the GET/HEAD requests that may be answered with a 304"""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    return request.COOKIES.get(settings.CSRF_COOKIE_NAME)
@@ -0,0 +1,112 @@
+"""
+Pseudonymous respondents and their score history.
+
+Clinics re-administer the questionnaire to the same people. A questionnaire
+may be tied to its respondent by a code the clinic gives them (the optional
+"código do participante" on the form, ``respondent_code`` in API and import
+rows). The code itself is never stored. ``pseudonym()`` turns it into an
+HMAC keyed with ``settings.RESPONDENT_SECRET``, kept in the ``respondent``
+column, so the same code always gives the same pseudonym. Without the
+secret, the pseudonym cannot be traced back to the code.
+
+Codes are only unique within a clinic, so each clinic has its own
+pseudonyms: the HMAC is salted with the clinic's name (see
+``settings.CLINIC_API_KEYS``), and questionnaires record the clinic they
+came from (``clinic``). A clinic's history requests only ever read its own
+rows. Respondents answering on the web use the clinic's page of the form,
+``/clinica/<clinic>/``; the public form, which no clinic could read back,
+does not ask for a code.
+
+``history()`` returns the respondents' questionnaires in order, each with
+the change in total score since their previous and their first
+questionnaire. The changes are computed by the database with window
+functions over the ``(respondent, created_at)`` index, so a respondent's
+series costs an index range scan however large the table gets.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Window
+from django.db.models.functions import FirstValue, Lag, RowNumber
+from django.utils.crypto import salted_hmac
+
+from .models import COMPONENTS, SleepQuestionnaire
+
+CODE_MAX_LENGTH = 100
+
+# Each respondent's questionnaires, oldest first; the id breaks ties
+_SERIES = {
+    'partition_by': F('respondent'),
+    'order_by': [F('created_at').asc(), F('id').asc()],
+}
+
+
+def clinics():
+    """Names of the clinics in ``settings.CLINIC_API_KEYS``"""
+    return set(settings.CLINIC_API_KEYS.values())
+
+
+def pseudonym(code, clinic=None):
+    """
+    The stored pseudonym for a respondent code of ``clinic`` (None for the
+    public form), or None for a blank code
+    """
+    code = str(code).strip() if code is not None else ''
+    if not code:
+        return None
+    key_salt = 'SleepForm.respondents' if clinic is None else f'SleepForm.respondents/{clinic}'
+    return salted_hmac(key_salt, code, secret=settings.RESPONDENT_SECRET, algorithm='sha256').hexdigest()
+
+
+def clean_respondent(row, clinic=None):
+    """
+    The pseudonym for the ``respondent_code`` of an import or API row sent by
+    ``clinic``. Raises ValidationError for a code that is too long.
+    """
+    code = row.get('respondent_code')
+    if code not in ('', None) and len(str(code).strip()) > CODE_MAX_LENGTH:
+        raise ValidationError(f"O código do participante tem no máximo {CODE_MAX_LENGTH} caracteres.")
+    return pseudonym(code, clinic)
+
+
+def history(respondents, clinic, using=None):
+    """
+    The questionnaires ``clinic`` (None for the public form) sent for the
+    given pseudonyms, grouped by respondent and oldest first, as dicts with
+    the scores, ``visit`` (1 for the first), ``previous_total``, ``delta``
+    (change since the previous one) and ``change`` (since the first). Deltas
+    are None where a total is missing.
+    """
+    return (
+        SleepQuestionnaire.objects.using(using)
+        .filter(respondent__in=respondents, clinic=clinic)
+        .annotate(
+            visit=Window(RowNumber(), **_SERIES),
+            previous_total=Window(Lag('total_score'), **_SERIES),
+            first_total=Window(FirstValue('total_score'), **_SERIES),
+        )
+        .annotate(
+            delta=F('total_score') - F('previous_total'),
+            change=F('total_score') - F('first_total'),
+        )
+        .order_by('respondent', 'created_at', 'id')
+        .values(
+            'id', 'respondent', 'created_at', *(f'{name}_score' for name in COMPONENTS),
+            'total_score', 'visit', 'previous_total', 'delta', 'change',
+        )
+    )
+
+
+def series(respondents, clinic, using=None):
+    """``{pseudonym: [questionnaire, ...]}`` for every given pseudonym, as JSON-ready data"""
+    by_respondent = {respondent: [] for respondent in respondents}
+    for row in history(respondents, clinic, using=using):
+        by_respondent[row['respondent']].append({
+            'id': row['id'],
+            'created_at': row['created_at'],
+            'visit': row['visit'],
+            'scores': {name: row[f'{name}_score'] for name in COMPONENTS},
+            'total': row['total_score'],
+            'delta': row['delta'],
+            'change': row['change'],
+        })
+    return by_respondent
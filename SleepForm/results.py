@@ -0,0 +1,44 @@
+"""
+Signed result tokens for the success page.
+
+After a submission the view redirects to the success page with a token
+that carries the record id, the component scores, the total and the
+percentile rank, signed with ``django.core.signing`` and valid for
+``settings.RESULT_TOKEN_MAX_AGE`` seconds. The success page renders from the
+token alone: it neither writes nor reads the session and does not fetch the
+questionnaire again.
+"""
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .models import COMPONENTS
+
+SALT = 'SleepForm.results'
+
+
+def make_result(instance, percentile):
+    """The success page data for a scored (saved or queued) questionnaire"""
+    return {
+        'id': instance.pk,
+        'components': {name: getattr(instance, f'{name}_score') for name in COMPONENTS},
+        'total': instance.total_score,
+        'percentile': percentile,
+    }
+
+
+def success_url(result):
+    token = signing.dumps(result, salt=SALT, compress=True)
+    return f"{reverse('questionnaire_success')}?{urlencode({'r': token})}"
+
+
+def read_result(request):
+    """The result carried by the request's token, or None if it is missing, tampered with or expired"""
+    token = request.GET.get('r')
+    if not token:
+        return None
+    try:
+        return signing.loads(token, salt=SALT, max_age=settings.RESULT_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
@@ -0,0 +1,124 @@
+"""
+Read-replica routing for reporting queries.
+
+When ``settings.DATABASES`` has a ``replica`` entry (DATABASE_REPLICA_URL),
+the heavy reads behind the export, the dashboard and the admin listing go
+there instead of competing with submissions on ``default``:
+
+- Views opt in with ``@use_replica`` (or ``with replica_reads():``); inside
+  it, ``ReplicaRouter`` sends reads of this app's models to the replica.
+  Everything else, and every write, stays on ``default``.
+- Read-your-writes: a request that writes anything gets a short-lived
+  cookie from ``ReplicaPinMiddleware``, and while it is present the client's
+  reads all go to ``default``, so nobody reads a replica that has not caught
+  up with their own submission yet.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA = 'replica'
+
+PIN_COOKIE = 'sleepform_primary'
+
+_replica_reads = ContextVar('sleepform_replica_reads', default=False)
+
+# Per request: {'pinned': bool, 'wrote': bool}, set by ReplicaPinMiddleware
+_request = ContextVar('sleepform_replica_request', default=None)
+
+
+def read_database():
+    """
+    Alias for reporting reads right now: the replica if there is one and the
+    current request is not pinned to the primary, otherwise ``default``.
+    """
+    state = _request.get()
+    if REPLICA not in settings.DATABASES or (state and state['pinned']):
+        return DEFAULT_DB_ALIAS
+    return REPLICA
+
+
+@contextmanager
+def replica_reads():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def use_replica(view):
+    """Run a (sync) view with its reads of this app's models on the replica"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and model._meta.app_label == 'SleepForm':
+            return read_database()
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _request.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary
+        return db != REPLICA
+
+
+class ReplicaPinMiddleware:
+    """
+    Pins a client to the primary for ``REPLICA_PIN_SECONDS`` after any
+    request of theirs writes to the database.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = {'pinned': PIN_COOKIE in request.COOKIES, 'wrote': False}
+        token = _request.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        state = {'pinned': PIN_COOKIE in request.COOKIES, 'wrote': False}
+        token = _request.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self.pin(response, state)
+
+    def pin(self, response, state):
+        if state['wrote'] and REPLICA in settings.DATABASES:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,476 @@
+"""
+Declarative scoring rules for questionnaires.
+
+An ``Instrument`` is an ordered set of named scores, each described by a tree
+of the nodes below instead of hand-written if/elif chains::
+
+    Answer('sleep_quality')                 the answer itself
+    Answer('pain', blank=0)                 ... counting a blank answer as 0
+    Answer('sleep_quality', highest=4)      ... whose highest value is 4
+    Sum(a, b, ...) / Sum.of(fields)         sum of nodes / of blank=0 answers
+    HoursBetween('bedtime', 'wakeup_time')  hours between two times of day
+    Ratio(numerator, denominator, scale)    numerator / denominator * scale
+    Score('new_latency')                    another score of the instrument
+    Bands(node, [('>=', 7, 0), ('>', 6, 1)], default=3)
+                                            first matching cut-off wins
+    Lookup(node, {0: 0, 1: 1, 2: 1}, default=3)
+                                            table of exact values
+
+When the instrument is created each node is compiled, once, into
+
+* a closure scoring one questionnaire (``Instrument.score``), with lookup
+  tables as dicts and cut-offs as pre-built tuples of comparison functions;
+* a NumPy function scoring columns of many questionnaires at once
+  (``Instrument.score_columns``);
+* a Django expression, for scoring in the database (``Instrument.annotations``).
+
+The three evaluate the same rules in the same order and with the same
+floating point arithmetic, so they agree answer for answer. That includes
+a division by zero, scored in all three as an infinite ratio (or, for 0/0,
+an undefined one, i.e. the default of the band it falls in).
+"""
+import math
+import operator
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Mapping
+from operator import attrgetter
+
+import numpy as np
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+from django.db.models.functions import Abs, Cast, Coalesce, ExtractHour, ExtractMinute, ExtractSecond, NullIf
+from django.db.models.lookups import Exact, GreaterThan, GreaterThanOrEqual, LessThan, LessThanOrEqual
+
+MICROSECONDS_PER_SECOND = 10 ** 6
+
+# Comparison: (Python/NumPy operator, Django lookup)
+COMPARISONS = {
+    '==': (operator.eq, Exact),
+    '<': (operator.lt, LessThan),
+    '<=': (operator.le, LessThanOrEqual),
+    '>': (operator.gt, GreaterThan),
+    '>=': (operator.ge, GreaterThanOrEqual),
+}
+
+
+class Node(ABC):
+    """
+    A value computed from the answers. Subclasses compile themselves for an
+    instrument into a row function ``(answers, cache) -> value``, where
+    ``answers`` is a tuple in ``Instrument.fields`` order, an array function
+    ``(columns, cache) -> ndarray`` and a Django expression; all three are
+    required, so a node missing one cannot be created at all.
+    """
+
+    def fields(self):
+        """Names of the answers this node reads"""
+        return ()
+
+    def highest(self, instrument):
+        """The highest value this node can give, or None if there is no bound"""
+        return None
+
+    @abstractmethod
+    def row(self, instrument):
+        """Function scoring one questionnaire"""
+
+    @abstractmethod
+    def array(self, instrument):
+        """Function scoring columns of questionnaires"""
+
+    @abstractmethod
+    def sql(self, instrument):
+        """Expression scoring in the database"""
+
+
+class Answer(Node):
+
+    def __init__(self, name, blank=None, highest=None):
+        self.name = name
+        self.blank = blank
+        self._highest = highest
+
+    def fields(self):
+        return (self.name,)
+
+    def highest(self, instrument):
+        return self._highest
+
+    def row(self, instrument):
+        index, blank = instrument.fields.index(self.name), self.blank
+        if blank is None:
+            return lambda answers, cache: answers[index]
+
+        def answer(answers, cache):
+            value = answers[index]
+            return blank if value is None else value
+        return answer
+
+    def array(self, instrument):
+        name, blank = self.name, self.blank
+
+        def answer(columns, cache):
+            # Blank answers (None) become NaN
+            values = np.asarray(columns[name], dtype=np.float64)
+            return values if blank is None else np.nan_to_num(values, nan=blank)
+        return answer
+
+    def sql(self, instrument):
+        if self.blank is None:
+            return F(self.name)
+        return Coalesce(F(self.name), Value(self.blank))
+
+
+class Sum(Node):
+
+    def __init__(self, *terms):
+        self.terms = terms
+
+    @classmethod
+    def of(cls, names):
+        """Sum of answers, blank answers counted as 0"""
+        return cls(*(Answer(name, blank=0) for name in names))
+
+    def fields(self):
+        return tuple(name for term in self.terms for name in term.fields())
+
+    def highest(self, instrument):
+        highest = [term.highest(instrument) for term in self.terms]
+        return None if None in highest else sum(highest)
+
+    def row(self, instrument):
+        if all(isinstance(term, Answer) and term.blank == 0 for term in self.terms):
+            # Sum.of(): add the answers up directly rather than calling a function per answer
+            indexes = tuple(instrument.fields.index(term.name) for term in self.terms)
+
+            def answers_sum(answers, cache):
+                total = 0
+                for index in indexes:
+                    value = answers[index]
+                    if value is not None:
+                        total += value
+                return total
+            return answers_sum
+
+        terms = tuple(term.row(instrument) for term in self.terms)
+
+        def terms_sum(answers, cache):
+            total = 0
+            for term in terms:
+                total += term(answers, cache)
+            return total
+        return terms_sum
+
+    def array(self, instrument):
+        terms = tuple(term.array(instrument) for term in self.terms)
+        return lambda columns, cache: sum(term(columns, cache) for term in terms)
+
+    def sql(self, instrument):
+        terms = [term.sql(instrument) for term in self.terms]
+        return sum(terms[1:], terms[0])
+
+
+class HoursBetween(Node):
+    """Hours from one time of day to another, as an absolute difference within the same day"""
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+    def fields(self):
+        return (self.start, self.end)
+
+    def row(self, instrument):
+        start, end = instrument.fields.index(self.start), instrument.fields.index(self.end)
+
+        def hours(answers, cache):
+            difference = _microseconds(answers[end]) - _microseconds(answers[start])
+            return abs(difference / MICROSECONDS_PER_SECOND) / 3600
+        return hours
+
+    def array(self, instrument):
+        start, end = self.start, self.end
+
+        def hours(columns, cache):
+            difference = _microseconds_column(columns[end]) - _microseconds_column(columns[start])
+            return np.abs(difference / MICROSECONDS_PER_SECOND) / 3600
+        return hours
+
+    def sql(self, instrument):
+        difference = _seconds_since_midnight(self.end) - _seconds_since_midnight(self.start)
+        return Abs(Cast(difference, FloatField())) / Value(3600.0)
+
+
+class Ratio(Node):
+
+    def __init__(self, numerator, denominator, scale=1):
+        self.numerator = numerator
+        self.denominator = denominator
+        self.scale = scale
+
+    def fields(self):
+        return self.numerator.fields() + self.denominator.fields()
+
+    def row(self, instrument):
+        numerator, denominator = self.numerator.row(instrument), self.denominator.row(instrument)
+        scale = self.scale
+        return lambda answers, cache: _divide(numerator(answers, cache), denominator(answers, cache)) * scale
+
+    def array(self, instrument):
+        numerator, denominator = self.numerator.array(instrument), self.denominator.array(instrument)
+        scale = self.scale
+
+        def ratio(columns, cache):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return (numerator(columns, cache) / denominator(columns, cache)) * scale
+        return ratio
+
+    def sql(self, instrument):
+        denominator = NullIf(self.denominator.sql(instrument), Value(0.0))
+        return (self.numerator.sql(instrument) / denominator) * Value(float(self.scale))
+
+    def sql_infinities(self, instrument):
+        """Conditions under which the ratio is +inf and -inf, where SQL gives NULL instead"""
+        numerator, denominator = self.numerator.sql(instrument), self.denominator.sql(instrument)
+        zero = Exact(denominator, 0)
+        return {
+            float('inf'): zero & GreaterThan(numerator, 0),
+            float('-inf'): zero & LessThan(numerator, 0),
+        }
+
+
+def _divide(numerator, denominator):
+    """``numerator / denominator``, with NumPy's results for a zero denominator"""
+    if denominator == 0:
+        return math.copysign(math.inf, numerator) if numerator else math.nan
+    return numerator / denominator
+
+
+class Score(Node):
+    """The value of another, earlier score of the same instrument"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def highest(self, instrument):
+        return instrument.scores[self.name].highest(instrument)
+
+    def row(self, instrument):
+        name, compiled = self.name, instrument.row_functions
+
+        def score(answers, cache):
+            if name not in cache:
+                cache[name] = compiled[name](answers, cache)
+            return cache[name]
+        return score
+
+    def array(self, instrument):
+        name, compiled = self.name, instrument.array_functions
+
+        def score(columns, cache):
+            if name not in cache:
+                cache[name] = compiled[name](columns, cache)
+            return cache[name]
+        return score
+
+    def sql(self, instrument):
+        return instrument.scores[self.name].sql(instrument)
+
+
+class Bands(Node):
+    """
+    Score a value by cut-offs: ``rules`` is a list of ``(comparison, bound,
+    score)`` tried in order, ``default`` is the score when none matches.
+    """
+
+    def __init__(self, source, rules, default):
+        self.source = source
+        self.rules = tuple(rules)
+        self.default = default
+
+    def fields(self):
+        return self.source.fields()
+
+    def highest(self, instrument):
+        return max(self.default, *(score for _, _, score in self.rules))
+
+    def evaluate(self, value):
+        for comparison, bound, score in self.rules:
+            if COMPARISONS[comparison][0](value, bound):
+                return score
+        return self.default
+
+    def row(self, instrument):
+        source, default = self.source.row(instrument), self.default
+        tests = tuple((COMPARISONS[comparison][0], bound, score) for comparison, bound, score in self.rules)
+
+        def band(answers, cache):
+            value = source(answers, cache)
+            for test, bound, score in tests:
+                if test(value, bound):
+                    return score
+            return default
+        return band
+
+    def array(self, instrument):
+        source = self.source.array(instrument)
+        tests = tuple((COMPARISONS[comparison][0], bound) for comparison, bound, _ in self.rules)
+        scores = [score for _, _, score in self.rules]
+        default = self.default
+
+        def bands(columns, cache):
+            values = source(columns, cache)
+            return np.select([test(values, bound) for test, bound in tests], scores, default=default)
+        return bands
+
+    def sql(self, instrument):
+        value = self.source.sql(instrument)
+        whens = []
+        if isinstance(self.source, Ratio):
+            whens = [
+                When(condition, then=Value(self.evaluate(infinity)))
+                for infinity, condition in self.source.sql_infinities(instrument).items()
+            ]
+        whens += [
+            When(COMPARISONS[comparison][1](value, bound), then=Value(score))
+            for comparison, bound, score in self.rules
+        ]
+        return Case(*whens, default=Value(self.default), output_field=IntegerField())
+
+
+class Lookup(Node):
+    """Score exact values through a ``{value: score}`` table"""
+
+    def __init__(self, source, table, default):
+        self.source = source
+        self.table = dict(table)
+        self.default = default
+
+    def fields(self):
+        return self.source.fields()
+
+    def highest(self, instrument):
+        return max(self.default, *self.table.values())
+
+    def row(self, instrument):
+        source, lookup, default = self.source.row(instrument), self.table.get, self.default
+        return lambda answers, cache: lookup(source(answers, cache), default)
+
+    def array(self, instrument):
+        source, table, default = self.source.array(instrument), self.table, self.default
+
+        def lookup(columns, cache):
+            values = source(columns, cache)
+            scores = np.full(values.shape, default, dtype=np.int64)
+            for value, score in table.items():
+                scores[values == value] = score
+            return scores
+        return lookup
+
+    def sql(self, instrument):
+        value = self.source.sql(instrument)
+        return Case(
+            *(When(Exact(value, key), then=Value(score)) for key, score in self.table.items()),
+            default=Value(self.default),
+            output_field=IntegerField(),
+        )
+
+
+class Instrument:
+    """
+    A questionnaire's scoring rules.
+
+    ``scores`` maps score names to nodes; the ones listed in ``components``
+    add up to the total, the others are intermediate values for ``Score``.
+    ``categories`` optionally maps ranges of the total to a label, as
+    ``(highest total, label)`` pairs in increasing order. ``max_total`` is
+    the highest total the rules can give, None if one of the components has
+    no bound. ``version``
+    identifies the rules; raise it whenever a rule changes, so scores stored
+    under the old rules can be told apart and recomputed.
+    """
+
+    def __init__(self, name, scores, components, categories=(), version=1):
+        self.name = name
+        self.version = version
+        self.scores = dict(scores)
+        self.components = tuple(components)
+        self.categories = tuple(categories)
+
+        # Every answer the rules read, in order of first use
+        self.fields = tuple(dict.fromkeys(name for node in self.scores.values() for name in node.fields()))
+        getter = attrgetter(*self.fields)
+        self._attributes = getter if len(self.fields) > 1 else lambda obj: (getter(obj),)
+
+        self.row_functions = {}
+        self.array_functions = {}
+        for score_name, node in self.scores.items():
+            self.row_functions[score_name] = node.row(self)
+            self.array_functions[score_name] = node.array(self)
+        self._components = tuple((name, self.row_functions[name]) for name in self.components)
+
+        highest = [self.scores[name].highest(self) for name in self.components]
+        self.max_total = None if None in highest else sum(highest)
+
+    def __repr__(self):
+        return f'<Instrument {self.name} v{self.version}>'
+
+    def score(self, answers):
+        """
+        Component scores of one questionnaire, in ``components`` order.
+        ``answers`` is a mapping or an object with the answers as attributes,
+        such as a model instance.
+        """
+        values = self._answers(answers)
+        cache = {}
+        return {name: function(values, cache) for name, function in self._components}
+
+    def score_one(self, name, answers):
+        """A single score (component or intermediate) of one questionnaire"""
+        return self.row_functions[name](self._answers(answers), {})
+
+    def _answers(self, answers):
+        """The answers in ``fields`` order; blank or missing ones are None"""
+        if isinstance(answers, Mapping):
+            return tuple(map(answers.get, self.fields))
+        return self._attributes(answers)
+
+    def total(self, answers):
+        return sum(self.score(answers).values())
+
+    def category(self, total):
+        """The label of the ``categories`` range containing ``total``"""
+        highest = [bound for bound, _ in self.categories]
+        index = bisect_left(highest, total)
+        return self.categories[index][1] if index < len(self.categories) else None
+
+    def score_columns(self, columns):
+        """
+        Score many questionnaires: ``columns`` maps every name in ``fields``
+        to a sequence with one answer per questionnaire. Returns a dict with
+        one integer array per component, plus ``total``.
+        """
+        cache = {}
+        scores = {}
+        for name in self.components:
+            values = self.array_functions[name](columns, cache)
+            scores[name] = np.nan_to_num(values, nan=0).astype(np.int64)
+        scores['total'] = sum(scores[name] for name in self.components)
+        return scores
+
+    def annotations(self, prefix):
+        """``{prefix + component: expression}`` for ``QuerySet.annotate``"""
+        return {f'{prefix}{name}': self.scores[name].sql(self) for name in self.components}
+
+
+def _microseconds(value):
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * MICROSECONDS_PER_SECOND + value.microsecond
+
+
+def _microseconds_column(values):
+    """``datetime.time`` values as microseconds since midnight"""
+    return np.fromiter((_microseconds(value) for value in values), dtype=np.int64, count=len(values))
+
+
+def _seconds_since_midnight(field):
+    return ExtractHour(field) * 3600 + ExtractMinute(field) * 60 + ExtractSecond(field)
@@ -0,0 +1,116 @@
+"""
+Batch PSQI scoring.
+
+Scores many questionnaires at once with NumPy array operations instead of
+calling ``SleepQuestionnaire.calculate_total_score()`` row by row. Both use
+the rules in ``instruments.PSQI``, compiled for arrays here and for single
+questionnaires on the model, so they give the same component scores and
+totals.
+"""
+from itertools import islice
+
+import numpy as np
+from django.db.models import Q
+
+from .instruments import PSQI
+from .models import COMPONENTS, SleepQuestionnaire
+
+# Raw answers needed to score a questionnaire, in ``values_list`` order
+SCORE_FIELDS = PSQI.fields
+
+
+def score_queryset(queryset):
+    """
+    Score every row of a ``SleepQuestionnaire`` queryset.
+
+    Returns a dict of NumPy arrays: ``id``, one array per name in
+    ``COMPONENTS`` and ``total``.
+    """
+    rows = queryset.values_list('pk', *SCORE_FIELDS)
+    return _score_rows_with_ids(rows)
+
+
+def iter_queryset_scores(queryset, chunk_size=2000):
+    """
+    Like ``score_queryset`` but streams the queryset from the database and
+    yields one result dict per chunk of ``chunk_size`` rows.
+    """
+    rows = queryset.values_list('pk', *SCORE_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield _score_rows_with_ids(chunk)
+
+
+def save_scores(scores):
+    """
+    Write a result dict from ``score_queryset`` back to the stored score
+    columns with a single ``bulk_update``, marking the rows as scored with
+    the current ``PSQI.version``.
+    """
+    fields = [f'{name}_score' for name in COMPONENTS] + ['total_score']
+    columns = [scores[name].tolist() for name in COMPONENTS] + [scores['total'].tolist()]
+    instances = [
+        SleepQuestionnaire(pk=pk, scoring_version=PSQI.version, **dict(zip(fields, values)))
+        for pk, *values in zip(scores['id'].tolist(), *columns)
+    ]
+    SleepQuestionnaire.objects.bulk_update(instances, fields + ['scoring_version'])
+    return len(instances)
+
+
+def outdated_scores(version=None):
+    """Questionnaires whose stored scores predate ``version`` (by default the current one)"""
+    version = PSQI.version if version is None else version
+    return SleepQuestionnaire.objects.filter(
+        Q(scoring_version__lt=version) | Q(scoring_version__isnull=True)
+    )
+
+
+def score_id_range(start, stop):
+    """
+    Score the outdated questionnaires with ``start <= pk < stop`` and keep
+    the ones whose stored scores are wrong: a result dict like
+    ``score_queryset``'s, for ``save_scores``. Rules usually change for a
+    few cases only, and rows whose scores still hold only need their
+    ``scoring_version`` raised, which one UPDATE does for a whole range.
+    """
+    queryset = outdated_scores().filter(pk__gte=start, pk__lt=stop).order_by('pk')
+    stored_fields = [f'{name}_score' for name in COMPONENTS] + ['total_score']
+    rows = list(queryset.values_list(*stored_fields, 'pk', *SCORE_FIELDS))
+    scores = _score_rows_with_ids([row[len(stored_fields):] for row in rows])
+
+    # NULL (never scored) becomes NaN, which differs from every score
+    stored = np.array([row[:len(stored_fields)] for row in rows], dtype=float).reshape(len(rows), -1)
+    new = np.column_stack([scores[name] for name in (*COMPONENTS, 'total')])
+    wrong = (stored != new).any(axis=1)
+    return {key: values[wrong] for key, values in scores.items()}
+
+
+def score_rows(rows):
+    """
+    Score a row-oriented dump, e.g. ``queryset.values_list(*SCORE_FIELDS)``.
+    Each row must hold the values of ``SCORE_FIELDS`` in that order.
+    """
+    rows = list(rows)
+    columns = zip(*rows) if rows else [()] * len(SCORE_FIELDS)
+    return score_columns(dict(zip(SCORE_FIELDS, columns)))
+
+
+def score_columns(columns):
+    """
+    Score a columnar dump: a mapping of every name in ``SCORE_FIELDS`` to a
+    sequence with one value per questionnaire.
+
+    Returns a dict with one integer array per name in ``COMPONENTS`` plus
+    ``total``. A zero time in bed scores 0 when any sleep was reported and
+    3 otherwise, as it does for a single questionnaire.
+    """
+    return PSQI.score_columns(columns)
+
+
+def _score_rows_with_ids(rows):
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    scores = score_rows(row[1:] for row in rows)
+    scores['id'] = ids
+    return scores
@@ -0,0 +1,110 @@
+"""
+Aggregate statistics for the results dashboard.
+
+Reads come from the ScoreSummary and DailySubmissionCount counter tables,
+which ``record_submissions`` keeps current on every insert, so their cost
+does not depend on how many questionnaires have been stored.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .instruments import PSQI
+from .models import COMPONENTS, DailySubmissionCount, ScoreSummary, SleepQuestionnaire
+
+# Totals above this mark a "poor sleeper"
+POOR_SLEEPER_THRESHOLD = 5
+
+MAX_TOTAL_SCORE = PSQI.max_total
+
+
+def dashboard_summary(days=30):
+    """Everything the dashboard shows, read from the counter tables"""
+    summaries = list(ScoreSummary.objects.all())
+    respondents = sum(summary.count for summary in summaries)
+
+    counts = {summary.total_score: summary.count for summary in summaries}
+    highest = max([MAX_TOTAL_SCORE, *counts])
+    distribution = [(score, counts.get(score, 0)) for score in range(highest + 1)]
+
+    component_means = [
+        (
+            SleepQuestionnaire._meta.get_field(f'{name}_score').verbose_name,
+            sum(getattr(summary, f'{name}_sum') for summary in summaries) / respondents if respondents else None,
+        )
+        for name in COMPONENTS
+    ]
+
+    poor_sleepers = sum(count for score, count in counts.items() if score > POOR_SLEEPER_THRESHOLD)
+
+    today = timezone.localdate()
+    first_day = today - timedelta(days=days - 1)
+    submitted = dict(
+        DailySubmissionCount.objects.filter(day__gte=first_day).values_list('day', 'count')
+    )
+    daily = [(day, submitted.get(day, 0)) for day in (first_day + timedelta(n) for n in range(days))]
+
+    return {
+        'respondents': respondents,
+        'distribution': distribution,
+        'component_means': component_means,
+        'poor_sleepers': poor_sleepers,
+        'poor_sleeper_share': poor_sleepers / respondents if respondents else None,
+        'daily_submissions': daily,
+    }
+
+
+def percentile_rank(total_score):
+    """
+    Percentage of respondents with a lower (better) total than ``total_score``,
+    i.e. "your score is worse than X% of respondents". Reads the per-total
+    counts in ScoreSummary, never the questionnaires themselves.
+    """
+    return _percentile(ScoreSummary.objects.aggregate(**_percentile_aggregates(total_score)))
+
+
+async def apercentile_rank(total_score):
+    """Async version of percentile_rank"""
+    return _percentile(await ScoreSummary.objects.aaggregate(**_percentile_aggregates(total_score)))
+
+
+def _percentile_aggregates(total_score):
+    return {
+        'respondents': Sum('count'),
+        'better': Sum('count', filter=Q(total_score__lt=total_score)),
+    }
+
+
+def _percentile(counts):
+    if not counts['respondents']:
+        return None
+    return 100 * (counts['better'] or 0) / counts['respondents']
+
+
+@transaction.atomic
+def rebuild_score_summary():
+    """
+    Recompute the counter tables from SleepQuestionnaire with two grouped
+    queries. Questionnaires without stored scores are only counted per day.
+    """
+    ScoreSummary.objects.all().delete()
+    DailySubmissionCount.objects.all().delete()
+
+    score_groups = (
+        SleepQuestionnaire.objects.filter(total_score__isnull=False)
+        .order_by()
+        .values('total_score')
+        .annotate(count=Count('pk'), **{f'{name}_sum': Sum(f'{name}_score') for name in COMPONENTS})
+    )
+    ScoreSummary.objects.bulk_create(ScoreSummary(**group) for group in score_groups)
+
+    day_groups = (
+        SleepQuestionnaire.objects.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(count=Count('pk'))
+    )
+    DailySubmissionCount.objects.bulk_create(DailySubmissionCount(**group) for group in day_groups)
@@ -0,0 +1,228 @@
+"""
+Write-behind queue for questionnaire submissions.
+
+When ``settings.SUBMISSION_QUEUE_DIR`` is set, validated submissions are not
+saved by the view. They are appended to ``pending.jsonl`` in that directory
+(one fsync'd JSON line each), and a flusher later moves the file aside and
+inserts its rows with ``bulk_create`` in one transaction. Under a spike, the
+database then sees a few large write transactions instead of one per
+submission.
+
+The flusher runs as a daemon thread in each web process (``start_flusher``)
+and can also run as its own process with ``manage.py drain_submission_queue``.
+A file lock keeps concurrent writers and flushers apart. Because the queue is
+a local directory, every flusher must run on the same host as the web
+processes.
+
+Each line keeps the submission's ``created_at`` and ``submission_key``. If
+the flusher dies after committing a batch but before deleting its file, the
+batch is inserted again on the next run: rows whose key is already stored
+with the same answers are then skipped, as are repeats within a batch.
+Lines that cannot be read or no longer validate (e.g. a line torn by a
+process killed mid-write) are moved to ``dead-letter.jsonl`` for a person to
+look at, so they never hold up the rest of the queue.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+
+from .idempotency import answers_digest, new_key
+from .ingest import ANSWER_FIELDS, bulk_insert, clean_row
+from .models import SleepQuestionnaire
+
+logger = logging.getLogger(__name__)
+
+PENDING_FILE = 'pending.jsonl'
+BATCH_PREFIX = 'batch-'
+DEAD_LETTER_FILE = 'dead-letter.jsonl'
+
+# Keys looked up per query when checking a batch for rows already inserted
+KEY_LOOKUP_SIZE = 500
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def is_enabled():
+    return bool(settings.SUBMISSION_QUEUE_DIR)
+
+
+def enqueue(instance):
+    """Durably append the answers of an unsaved, validated questionnaire"""
+    data = {field.name: getattr(instance, field.attname) for field in ANSWER_FIELDS}
+    data['clinic'] = instance.clinic
+    data['respondent'] = instance.respondent
+    data['submission_key'] = instance.submission_key or new_key()
+    data['created_at'] = instance.created_at
+    line = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+    with _locked() as queue_dir:
+        with open(queue_dir / PENDING_FILE, 'a+b') as pending:
+            # A writer killed mid-line leaves it unterminated: end it, so that
+            # only the torn line is lost and not this one too
+            if pending.seek(0, os.SEEK_END):
+                pending.seek(-1, os.SEEK_END)
+                if pending.read(1) != b'\n':
+                    line = '\n' + line
+            pending.write(line.encode())
+            pending.flush()
+            os.fsync(pending.fileno())
+
+
+def drain(batch_size=None):
+    """
+    Insert everything queued so far. Returns the number of rows inserted.
+
+    The pending file is first renamed to a batch file, so writers can carry
+    on with a new one. Each batch file is inserted in a single transaction
+    and deleted once it has been committed; batch files left behind by an
+    interrupted flusher are picked up on the next run.
+    """
+    with _locked() as queue_dir:
+        pending = queue_dir / PENDING_FILE
+        if pending.exists():
+            pending.rename(queue_dir / f'{BATCH_PREFIX}{time.time_ns()}.jsonl')
+        batches = sorted(queue_dir.glob(f'{BATCH_PREFIX}*.jsonl'))
+
+    inserted = 0
+    for batch in batches:
+        try:
+            inserted += _insert_batch(batch, batch_size or settings.SUBMISSION_QUEUE_BATCH_SIZE)
+        except Exception:
+            # Left in place for the next run; the other batches go ahead
+            logger.exception("Inserting queued batch %s failed", batch.name)
+    return inserted
+
+
+def _insert_batch(batch, batch_size):
+    """Insert one batch file unless another flusher is already on it"""
+    try:
+        rows = batch.open(encoding='utf-8')
+    except FileNotFoundError:
+        return 0
+
+    with rows:
+        try:
+            fcntl.flock(rows, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+        if os.fstat(rows.fileno()).st_nlink == 0:
+            return 0  # Inserted and deleted by another flusher meanwhile
+
+        instances = []
+        dead = []
+        for line_number, line in enumerate(rows, start=1):
+            if not line.strip():
+                continue
+            instance, errors = _read_line(line)
+            if errors:
+                logger.error("Dead-lettering queued submission %s:%s: %s", batch.name, line_number, errors)
+                dead.append(line)
+                continue
+            instances.append(instance)
+
+        instances = _skip_inserted(instances)
+        if dead:
+            _dead_letter(batch.parent, dead)
+        if instances:
+            bulk_insert(instances, batch_size=batch_size)
+        batch.unlink()
+    return len(instances)
+
+
+def _read_line(line):
+    """``(instance, errors)`` for one queued line, like ``clean_row``"""
+    try:
+        row = json.loads(line)
+    except ValueError as e:
+        return None, {'__all__': [f"JSON inválido: {e}"]}
+    if not isinstance(row, dict):
+        return None, {'__all__': ["Esperado um objeto com as respostas."]}
+    instance, errors = clean_row(row)
+    if instance is not None:
+        # Queued by the form, which stores the pseudonym rather than the code
+        instance.clinic = row.get('clinic')
+        instance.respondent = row.get('respondent')
+        try:
+            instance.submission_key = uuid.UUID(row['submission_key'])
+        except (KeyError, TypeError, ValueError):
+            instance.submission_key = None
+    return instance, errors
+
+
+def _skip_inserted(instances):
+    """
+    Leave out rows already in the table (a batch inserted again after a
+    crash) or earlier in the batch, i.e. the same key with the same answers.
+    The same key with other answers gets a new key, as in idempotency.save_once.
+    """
+    keys = [instance.submission_key for instance in instances if instance.submission_key]
+    known = {}
+    for start in range(0, len(keys), KEY_LOOKUP_SIZE):
+        for row in SleepQuestionnaire.objects.filter(submission_key__in=keys[start:start + KEY_LOOKUP_SIZE]):
+            known[row.submission_key] = answers_digest(row)
+    new = []
+    for instance in instances:
+        key = instance.submission_key
+        if key is not None:
+            digest = answers_digest(instance)
+            if known.get(key) == digest:
+                continue
+            if key in known:
+                instance.submission_key = key = new_key()
+            known[key] = digest
+        new.append(instance)
+    return new
+
+
+def _dead_letter(queue_dir, lines):
+    """Durably append unreadable queued lines to the dead-letter file"""
+    with open(queue_dir / DEAD_LETTER_FILE, 'a', encoding='utf-8') as dead_letter:
+        for line in lines:
+            dead_letter.write(line if line.endswith('\n') else line + '\n')
+        dead_letter.flush()
+        os.fsync(dead_letter.fileno())
+
+
+def start_flusher():
+    """Start this process's background flusher thread, once"""
+    global _flusher
+    with _flusher_lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_flush_forever, name='submission-queue-flusher', daemon=True)
+        _flusher.start()
+
+
+def _flush_forever():
+    while True:
+        time.sleep(settings.SUBMISSION_QUEUE_FLUSH_INTERVAL)
+        try:
+            drain()
+        except Exception:
+            logger.exception("Flushing the submission queue failed, will retry")
+        finally:
+            close_old_connections()
+
+
+@contextmanager
+def _locked():
+    """Hold the queue directory's lock file exclusively"""
+    queue_dir = Path(settings.SUBMISSION_QUEUE_DIR)
+    queue_dir.mkdir(parents=True, exist_ok=True)
+    with open(queue_dir / 'queue.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield queue_dir
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
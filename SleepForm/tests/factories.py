@@ -0,0 +1,63 @@
+from datetime import time
+
+from SleepForm.models import SleepQuestionnaire
+
+# A valid set of answers, as the form posts them
+FORM_DATA = {
+    'bedtime': '23:00',
+    'time_to_sleep': 20,
+    'wakeup_time': '07:00',
+    'sleep_hours': 6.5,
+    'difficulty_falling_asleep': 1,
+    'difficulty_staying_asleep': 1,
+    'bathroom_visits': 2,
+    'breathing_difficulty': 0,
+    'coughing_snoring': 0,
+    'felt_cold': 1,
+    'felt_hot': 0,
+    'bad_dreams': 1,
+    'pain': 0,
+    'other_reason': '',
+    'other_reason_frequency': '',
+    'sleep_quality': 3,
+    'medication_use': 0,
+    'daytime_sleepiness': 1,
+    'enthusiasm_difficulty': 1,
+    'has_partner': 0,
+}
+
+
+def form_data(**overrides):
+    return {**FORM_DATA, **overrides}
+
+
+def questionnaire(**overrides):
+    """An unsaved SleepQuestionnaire with the answers in FORM_DATA"""
+    answers = {
+        **FORM_DATA,
+        'bedtime': time(23, 0),
+        'wakeup_time': time(7, 0),
+        'other_reason': None,
+        'other_reason_frequency': None,
+    }
+    answers.update(overrides)
+    return SleepQuestionnaire(**answers)
+
+
+def random_questionnaire(rng):
+    """An unsaved SleepQuestionnaire with random answers, bedtime never equal to wakeup time"""
+    bedtime = time(rng.randrange(24), rng.choice([0, 10, 15, 30, 45]))
+    wakeup_time = time(rng.randrange(24), rng.choice([5, 20, 40]))
+    instance = questionnaire(
+        bedtime=bedtime,
+        wakeup_time=wakeup_time,
+        time_to_sleep=rng.choice([0, 1, 5, 14, 15, 16, 29, 30, 31, 59, 60, 61, 120]),
+        sleep_hours=rng.choice([0, 3, 4.5, 5, 5.5, 6, 6.5, 7, 7.5, 9, round(rng.uniform(0, 12), 2)]),
+        sleep_quality=rng.randint(1, 4),
+        medication_use=rng.randint(0, 3),
+    )
+    for field in SleepQuestionnaire.DIFFICULTY_FIELDS + SleepQuestionnaire.DAYTIME_FIELDS:
+        setattr(instance, field, rng.randint(0, 3))
+    if rng.random() < 0.5:
+        instance.other_reason_frequency = None
+    return instance
@@ -0,0 +1,110 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from SleepForm.admin import CURSOR_VAR, SleepQuestionnaireAdmin
+from SleepForm.models import SleepQuestionnaire
+
+from .factories import questionnaire
+
+URL = '/admin/SleepForm/sleepquestionnaire/'
+
+
+@mock.patch.object(SleepQuestionnaireAdmin, 'list_per_page', 3)
+class QuestionnaireAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        start = timezone.now() - timedelta(days=10)
+        cls.ids = []
+        for day in range(7):
+            instance = questionnaire(sleep_hours=4 if day % 2 else 8)
+            instance.save()
+            # Two questionnaires share a timestamp, so the id breaks the tie
+            created_at = start + timedelta(days=min(day, 5))
+            SleepQuestionnaire.objects.filter(pk=instance.pk).update(created_at=created_at)
+            cls.ids.append(instance.pk)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def listed_ids(self, response):
+        return [row.pk for row in response.context['cl'].result_list]
+
+    def test_keyset_pages(self):
+        newest_first = sorted(
+            SleepQuestionnaire.objects.values_list('created_at', 'id'), reverse=True,
+        )
+        expected = [pk for _, pk in newest_first]
+
+        seen = []
+        url = URL
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += self.listed_ids(response)
+            next_page = response.context['cl'].next_page_url
+            url = next_page and URL + next_page
+        self.assertEqual(seen, expected)
+
+    def test_page_queries_do_not_count_rows(self):
+        response = self.client.get(URL)
+        cursor = response.context['cl'].next_page_url
+        with self.assertNumQueries(6) as queries:
+            self.client.get(URL + cursor)
+        statements = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('OFFSET', statements)
+        self.assertNotIn('COUNT(', statements.replace('COUNT("SleepForm_dailysubmissioncount', ''))
+
+    def test_estimated_count(self):
+        response = self.client.get(URL)
+        self.assertEqual(response.context['cl'].result_count, 7)
+        self.assertContains(response, 'Cerca de 7')
+
+    def test_score_filter(self):
+        low = SleepQuestionnaire.objects.get(pk=self.ids[0]).total_score
+        response = self.client.get(URL, {'total': '0-5' if low <= 5 else '6-10'})
+        listed = SleepQuestionnaire.objects.filter(pk__in=self.listed_ids(response))
+        self.assertTrue(listed)
+        self.assertEqual({row.total_score for row in listed}, {low})
+
+    def test_unscored_rows_are_scored_in_sql(self):
+        SleepQuestionnaire.objects.filter(pk=self.ids[-1]).update(total_score=None, duration_score=None)
+        response = self.client.get(URL, {'total': 'none'})
+        [row] = response.context['cl'].result_list
+        expected = questionnaire(sleep_hours=8)
+        self.assertEqual(row.listed_total, expected.calculate_total_score())
+        self.assertEqual(row.listed_duration, 0)
+
+    def test_sorting_by_score_uses_numbered_pages(self):
+        # Column 9 is the total (read-only, so no action checkbox column)
+        response = self.client.get(URL, {'o': '-9'})
+        self.assertEqual(response.status_code, 200)
+        cl = response.context['cl']
+        self.assertFalse(cl.keyset)
+        totals = [row.listed_total for row in cl.result_list]
+        self.assertEqual(totals, sorted(totals, reverse=True))
+        self.assertEqual(cl.result_count, 7)
+
+    def test_questionnaires_are_read_only(self):
+        # Editing or deleting would leave the dashboard counters behind
+        pk = self.ids[0]
+        hours = SleepQuestionnaire.objects.get(pk=pk).sleep_hours
+        self.assertEqual(self.client.get(f'{URL}{pk}/change/').status_code, 200)
+        self.client.post(f'{URL}{pk}/change/', {'sleep_hours': 2})
+        self.assertEqual(self.client.post(f'{URL}{pk}/delete/', {'post': 'yes'}).status_code, 403)
+        self.assertEqual(self.client.get(f'{URL}add/').status_code, 403)
+        self.assertEqual(SleepQuestionnaire.objects.get(pk=pk).sleep_hours, hours)
+
+        response = self.client.get(URL)
+        self.assertEqual(response.context['cl'].model_admin.get_actions(response.wsgi_request), {})
+
+    def test_date_hierarchy_and_bad_cursor(self):
+        year = timezone.localtime(SleepQuestionnaire.objects.get(pk=self.ids[0]).created_at).year
+        response = self.client.get(URL, {'created_at__year': year, CURSOR_VAR: 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.listed_ids(response)), 3)
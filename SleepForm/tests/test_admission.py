@@ -0,0 +1,108 @@
+import threading
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from SleepForm.admission import AdmissionControlMiddleware, client_ip, take_token
+from SleepForm.checks import check_rate_limit_cache
+
+from .factories import form_data
+
+
+@override_settings(SUBMISSION_RATE_PER_MINUTE=60, SUBMISSION_RATE_BURST=3)
+class RateWindowTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_burst_per_window(self):
+        # 3 per 3 second window, the one from 99 to 102 here
+        self.assertEqual([take_token('a', now=100) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(take_token('a', now=100), 2)
+        self.assertAlmostEqual(take_token('a', now=101.5), 0.5)
+        self.assertEqual(take_token('a', now=102), 0)
+        # Other clients have their own count
+        self.assertEqual(take_token('b', now=100), 0)
+
+    def test_concurrent_posts_are_all_counted(self):
+        waits = []
+        threads = [threading.Thread(target=lambda: waits.append(take_token('a', now=100))) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(waits.count(0), 3)
+
+    @override_settings(SUBMISSION_PROXY_COUNT=1)
+    def test_client_ip_behind_proxy(self):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.1.1.1, 2.2.2.2')
+        self.assertEqual(client_ip(request), '2.2.2.2')
+        with self.settings(SUBMISSION_PROXY_COUNT=0):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+
+
+@override_settings(SUBMISSION_RATE_PER_MINUTE=1, SUBMISSION_RATE_BURST=2)
+class RateLimitTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_posts_beyond_the_burst_get_429(self):
+        statuses = [self.client.post('/', form_data()).status_code for _ in range(3)]
+        self.assertEqual(statuses, [302, 302, 429])
+        response = self.client.post('/', form_data())
+        # Until the end of the 2 minute window
+        self.assertLessEqual(1, int(response['Retry-After']))
+        self.assertLessEqual(int(response['Retry-After']), 120)
+
+    def test_pages_are_not_limited(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/').status_code, 200)
+
+
+@override_settings(SUBMISSION_MAX_CONCURRENCY=1, SUBMISSION_ADMISSION_TIMEOUT=0.05,
+                   SUBMISSION_RETRY_AFTER=7, SUBMISSION_RATE_PER_MINUTE=0)
+class ConcurrencyLimitTests(SimpleTestCase):
+
+    def test_overload_is_refused_fast(self):
+        entered, release = threading.Event(), threading.Event()
+
+        def view(request):
+            if request.method == 'POST':
+                entered.set()
+                release.wait(5)
+            return HttpResponse()
+
+        middleware = AdmissionControlMiddleware(view)
+        factory = RequestFactory()
+        first = threading.Thread(target=middleware, args=[factory.post('/')])
+        first.start()
+        try:
+            self.assertTrue(entered.wait(5))
+            refused = middleware(factory.post('/'))
+            self.assertEqual(refused.status_code, 503)
+            self.assertEqual(refused['Retry-After'], '7')
+            # Reads are never held back
+            self.assertEqual(middleware(factory.get('/')).status_code, 200)
+        finally:
+            release.set()
+            first.join()
+        self.assertEqual(middleware(factory.post('/')).status_code, 200)
+
+
+class RateLimitCacheCheckTests(SimpleTestCase):
+
+    def backend(self, name):
+        return self.settings(CACHES={'default': {'BACKEND': f'django.core.cache.backends.{name}'}})
+
+    def test_needs_a_shared_cache(self):
+        with self.settings(SUBMISSION_RATE_PER_MINUTE=10):
+            with self.backend('locmem.LocMemCache'):
+                self.assertEqual([error.id for error in check_rate_limit_cache(None)], ['SleepForm.E001'])
+            with self.backend('db.DatabaseCache'):
+                self.assertEqual([error.id for error in check_rate_limit_cache(None)], ['SleepForm.W001'])
+            with self.backend('redis.RedisCache'):
+                self.assertEqual(check_rate_limit_cache(None), [])
+        with self.settings(SUBMISSION_RATE_PER_MINUTE=0), self.backend('locmem.LocMemCache'):
+            self.assertEqual(check_rate_limit_cache(None), [])
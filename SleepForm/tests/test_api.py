@@ -0,0 +1,101 @@
+import gzip
+import json
+from datetime import date, datetime
+
+from django.test import TestCase, override_settings
+
+from SleepForm.models import DailySubmissionCount, ScoreSummary, SleepQuestionnaire
+
+from .factories import form_data, questionnaire
+
+URL = '/api/questionnaires/'
+AUTHORIZATION = {'HTTP_AUTHORIZATION': 'Bearer clinic-key'}
+
+
+@override_settings(CLINIC_API_KEYS={'other-key': 'other', 'clinic-key': 'clinic'}, API_MAX_ITEMS=5, API_MAX_BODY_SIZE=10000)
+class BulkSubmissionTests(TestCase):
+
+    def post(self, body, **headers):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        return self.client.post(URL, body, content_type='application/json', **{**AUTHORIZATION, **headers})
+
+    def test_requires_key(self):
+        response = self.client.post(URL, '[]', content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        response = self.post([], HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 401)
+
+    def test_valid_and_invalid_items(self):
+        items = [
+            form_data(),
+            form_data(sleep_quality=9),
+            'not an object',
+            form_data(medication_use='1 ou 2 vezes/semana', sleep_hours=8),
+        ]
+        response = self.post(items)
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+
+        self.assertEqual((payload['created'], payload['rejected']), (2, 2))
+        self.assertEqual([result['index'] for result in payload['results']], [0, 1, 2, 3])
+        self.assertIn('sleep_quality', payload['results'][1]['errors'])
+        self.assertIn('__all__', payload['results'][2]['errors'])
+
+        expected = questionnaire()
+        first = payload['results'][0]
+        self.assertEqual(first['scores'], expected.calculate_component_scores())
+        self.assertEqual(first['total'], expected.calculate_total_score())
+        self.assertEqual(SleepQuestionnaire.objects.get(pk=first['id']).total_score, first['total'])
+        self.assertEqual(SleepQuestionnaire.objects.get(pk=payload['results'][3]['id']).medication_use, 2)
+        self.assertEqual(sum(summary.count for summary in ScoreSummary.objects.all()), 2)
+
+    def test_offline_collection_times(self):
+        items = [
+            form_data(created_at='2026-02-10T08:15:00-03:00'),
+            form_data(created_at='2026-01-10T08:15:00-03:00'),
+            form_data(created_at='next week'),
+        ]
+        results = self.post(items).json()['results']
+        self.assertEqual(
+            datetime.fromisoformat(results[0]['created_at']),
+            datetime.fromisoformat('2026-02-10T11:15:00+00:00'),
+        )
+        self.assertIn('created_at', results[2]['errors'])
+        stored = SleepQuestionnaire.objects.order_by('created_at').values_list('pk', flat=True)
+        self.assertEqual(list(stored), [results[1]['id'], results[0]['id']])
+        self.assertEqual(
+            sorted(DailySubmissionCount.objects.values_list('day', flat=True)),
+            [date(2026, 1, 10), date(2026, 2, 10)],
+        )
+
+    def test_gzip_body(self):
+        body = gzip.compress(json.dumps([form_data()] * 3).encode())
+        response = self.post(body, HTTP_CONTENT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 3)
+
+    def test_gzip_bomb(self):
+        body = gzip.compress(b'[' + b' ' * 20000 + b']')
+        response = self.post(body, HTTP_CONTENT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 413)
+
+    def test_corrupt_gzip(self):
+        response = self.post(b'not gzip', HTTP_CONTENT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 400)
+
+    def test_unsupported_encoding(self):
+        response = self.post([], HTTP_CONTENT_ENCODING='br')
+        self.assertEqual(response.status_code, 415)
+
+    def test_not_a_list(self):
+        self.assertEqual(self.post({'bedtime': '23:00'}).status_code, 400)
+        self.assertEqual(self.post(b'{').status_code, 400)
+
+    def test_too_many_items(self):
+        response = self.post([form_data()] * 6)
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(SleepQuestionnaire.objects.exists())
+
+    def test_get_not_allowed(self):
+        self.assertEqual(self.client.get(URL, **AUTHORIZATION).status_code, 405)
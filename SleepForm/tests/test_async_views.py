@@ -0,0 +1,55 @@
+import uuid
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import path
+
+from SleepForm import views
+from SleepForm.models import SleepQuestionnaire
+
+from .factories import form_data
+
+# The URLs as SleepForm/urls.py maps them with ASYNC_VIEWS on
+urlpatterns = [
+    path('', views.sleep_questionnaire_async, name='sleep_questionnaire'),
+    path('success/', views.questionnaire_success_async, name='questionnaire_success'),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_page(self):
+        response = await self.async_client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(response.resolver_match.func, views.sleep_questionnaire_async)
+        self.assertContains(response, 'name="submission_key"')
+        self.assertContains(response, 'name="sleep_hours"')
+
+    async def test_submission_and_success_page(self):
+        data = form_data(submission_key=str(uuid.uuid4()))
+        response = await self.async_client.post('/', data)
+        self.assertEqual(response.status_code, 302)
+        stored = await SleepQuestionnaire.objects.aget()
+        self.assertEqual(stored.total_score, 10)
+
+        success = await self.async_client.get(response['Location'])
+        self.assertContains(success, "Sua pontuação: 10")
+
+        # The same page sent again is not stored twice
+        again = await self.async_client.post('/', data)
+        self.assertEqual(again['Location'], response['Location'])
+        self.assertEqual(await SleepQuestionnaire.objects.acount(), 1)
+
+    async def test_invalid_answers(self):
+        response = await self.async_client.post('/', form_data(sleep_quality=9))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('sleep_quality', response.context['form'].errors)
+        self.assertFalse(await SleepQuestionnaire.objects.aexists())
+
+    async def test_success_without_token(self):
+        response = await self.async_client.get('/success/')
+        self.assertEqual(response.status_code, 302)
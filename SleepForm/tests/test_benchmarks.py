@@ -0,0 +1,75 @@
+"""
+Micro-benchmarks for scoring and form validation.
+
+Skipped by default. Run them with
+
+    SLEEPFORM_BENCHMARKS=1 python manage.py test SleepForm.tests.test_benchmarks
+
+Each benchmark prints the best per-call time over a few ``timeit`` repeats,
+so numbers from before and after a change can be compared directly.
+"""
+import os
+import random
+import timeit
+import unittest
+
+from django.test import SimpleTestCase
+
+from SleepForm.forms import SleepQuestionnaireForm
+from SleepForm.scoring import SCORE_FIELDS, score_rows
+
+from .factories import form_data, questionnaire, random_questionnaire
+
+REPEAT = 5
+
+
+def best_time(function, number):
+    """Best seconds per call over REPEAT runs of ``number`` calls"""
+    return min(timeit.repeat(function, number=number, repeat=REPEAT)) / number
+
+
+@unittest.skipUnless(os.environ.get('SLEEPFORM_BENCHMARKS'), "set SLEEPFORM_BENCHMARKS=1 to run benchmarks")
+class Benchmark(SimpleTestCase):
+
+    def report(self, name, seconds):
+        print(f"\n{name:<40} {seconds * 1e6:10.2f} µs")
+
+
+class ScoringBenchmarks(Benchmark):
+
+    def test_calculate_total_score(self):
+        instance = questionnaire()
+        self.report('calculate_total_score', best_time(instance.calculate_total_score, 20000))
+
+    def test_component_helpers(self):
+        instance = questionnaire()
+        for name in (
+            '_get_duration_score',
+            '_get_difficulty_score',
+            '_get_new_latent_score',
+            '_get_latent_score',
+            '_get_daytime_score',
+            '_get_sleep_efficiency_score',
+        ):
+            self.report(name, best_time(getattr(instance, name), 50000))
+
+    def test_batch_scoring(self):
+        rng = random.Random(1)
+        rows = [
+            [getattr(instance, field) for field in SCORE_FIELDS]
+            for instance in (random_questionnaire(rng) for _ in range(10000))
+        ]
+        seconds = best_time(lambda: score_rows(rows), 3)
+        self.report('score_rows, per row of 10000', seconds / len(rows))
+
+
+class FormBenchmarks(Benchmark):
+
+    def test_is_valid(self):
+        data = form_data()
+        self.report('SleepQuestionnaireForm.is_valid', best_time(lambda: SleepQuestionnaireForm(data=data).is_valid(), 1000))
+
+    def test_is_valid_with_partner_answers(self):
+        data = form_data(has_partner=3, partner_snoring=2, partner_breathing_pauses=1,
+                         partner_leg_movements=0, partner_confusion=1)
+        self.report('is_valid, partner answers', best_time(lambda: SleepQuestionnaireForm(data=data).is_valid(), 1000))
@@ -0,0 +1,110 @@
+import csv
+import io
+import unittest
+import uuid
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from SleepForm.export import EXPORT_FIELDS, _arrow_field, stream_parquet
+from SleepForm.models import SleepQuestionnaire
+
+from .factories import form_data, questionnaire
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def download(self, **params):
+        response = self.client.get('/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def stored_on(self, *days):
+        """One questionnaire per local date in ``days`` (YYYY-MM-DD), created at noon"""
+        ids = []
+        for day in days:
+            instance = questionnaire()
+            instance.save()
+            noon = timezone.make_aware(datetime.fromisoformat(f'{day}T12:00'))
+            SleepQuestionnaire.objects.filter(pk=instance.pk).update(created_at=noon)
+            ids.append(instance.pk)
+        return ids
+
+    def csv_rows(self, **params):
+        return list(csv.reader(io.StringIO(self.download(**params).decode())))
+
+    def test_csv(self):
+        ids = self.stored_on('2026-01-01', '2026-01-02')
+        header, *rows = self.csv_rows()
+        self.assertEqual(header, EXPORT_FIELDS)
+        self.assertEqual([int(row[0]) for row in rows], ids)
+        stored = SleepQuestionnaire.objects.get(pk=ids[0])
+        row = dict(zip(header, rows[0]))
+        self.assertEqual(row['bedtime'], '23:00:00')
+        self.assertEqual(row['other_reason'], '')
+        self.assertEqual(int(row['total_score']), stored.total_score)
+
+    def test_date_filters_are_inclusive(self):
+        ids = self.stored_on('2026-01-01', '2026-01-02', '2026-01-03', '2026-01-04')
+        _, *rows = self.csv_rows(start='2026-01-02', end='2026-01-03')
+        self.assertEqual([int(row[0]) for row in rows], ids[1:3])
+        _, *rows = self.csv_rows(start='2026-01-04')
+        self.assertEqual([int(row[0]) for row in rows], ids[3:])
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get('/export/', {'start': '2026-01-03', 'end': '2026-01-02'}).status_code, 400)
+        self.assertEqual(self.client.get('/export/', {'start': 'ontem'}).status_code, 400)
+        self.assertEqual(self.client.get('/export/', {'format': 'xlsx'}).status_code, 400)
+
+    def test_staff_only(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/export/').status_code, 302)
+        self.client.force_login(User.objects.create_user('respondent'))
+        self.assertEqual(self.client.get('/export/').status_code, 302)
+
+    @unittest.skipIf(pq is None, "pyarrow is not installed")
+    def test_parquet_row_groups(self):
+        ids = self.stored_on(*(f'2026-01-0{day}' for day in range(1, 6)))
+        data = b''.join(stream_parquet(SleepQuestionnaire.objects.all(), chunk_size=2))
+        parquet = pq.ParquetFile(io.BytesIO(data))
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        self.assertEqual(parquet.read().column('id').to_pylist(), ids)
+
+    @unittest.skipIf(pq is None, "pyarrow is not installed")
+    def test_parquet_round_trip(self):
+        # Sent through a clinic's form, so the row has a submission key and a respondent
+        with self.settings(CLINIC_API_KEYS={'clinic-key': 'clinic'}):
+            self.client.post('/clinica/clinic/', form_data(respondent_code='P-001', submission_key=str(uuid.uuid4())))
+        stored = SleepQuestionnaire.objects.get()
+        self.assertIsNotNone(stored.submission_key)
+
+        table = pq.read_table(io.BytesIO(self.download(format='parquet')))
+        self.assertEqual(table.column_names, EXPORT_FIELDS)
+        self.assertNotIn('submission_key', table.column_names)
+        [row] = table.to_pylist()
+        self.assertEqual(row['id'], stored.pk)
+        self.assertEqual((row['clinic'], row['respondent']), ('clinic', stored.respondent))
+        self.assertEqual(row['bedtime'], stored.bedtime)
+        self.assertEqual(row['total_score'], stored.total_score)
+
+    @unittest.skipIf(pq is None, "pyarrow is not installed")
+    def test_unknown_field_types_are_refused(self):
+        with self.assertRaises(TypeError):
+            _arrow_field(pa, SleepQuestionnaire._meta.get_field('submission_key'))
@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase
+
+from SleepForm.forms import ExportForm, SleepQuestionnaireForm
+
+from .factories import form_data
+
+
+class SleepQuestionnaireFormTests(SimpleTestCase):
+
+    def test_valid_answers(self):
+        form = SleepQuestionnaireForm(data=form_data())
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_partner_questions_are_optional(self):
+        form = SleepQuestionnaireForm(data=form_data(has_partner=0))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIsNone(form.cleaned_data['partner_snoring'])
+
+    def test_partner_answers(self):
+        form = SleepQuestionnaireForm(data=form_data(has_partner=3, partner_snoring=2, partner_confusion=0))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['partner_snoring'], 2)
+
+    def test_after_midnight_times(self):
+        form = SleepQuestionnaireForm(data=form_data(bedtime='00:30', wakeup_time='06:45'))
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_unknown_choice(self):
+        form = SleepQuestionnaireForm(data=form_data(sleep_quality=7))
+        self.assertFalse(form.is_valid())
+        self.assertIn('sleep_quality', form.errors)
+
+    def test_missing_required_answer(self):
+        data = form_data()
+        del data['wakeup_time']
+        form = SleepQuestionnaireForm(data=data)
+        self.assertFalse(form.is_valid())
+        self.assertIn('wakeup_time', form.errors)
+
+    def test_difficulty_fields_leave_out_other_reason_frequency(self):
+        names = [field.name for field in SleepQuestionnaireForm().sleep_difficulty_fields()]
+        self.assertEqual(len(names), 9)
+        self.assertNotIn('other_reason_frequency', names)
+
+
+class ExportFormTests(SimpleTestCase):
+
+    def test_start_after_end(self):
+        form = ExportForm(data={'start': '2024-02-01', 'end': '2024-01-01', 'format': 'csv'})
+        self.assertFalse(form.is_valid())
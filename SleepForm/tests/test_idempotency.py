@@ -0,0 +1,90 @@
+import re
+import uuid
+from datetime import timedelta
+from urllib.parse import parse_qs, urlsplit
+
+from django.core import signing
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from SleepForm.models import SleepQuestionnaire
+from SleepForm.results import SALT
+
+from .factories import form_data
+
+KEY_INPUT = re.compile(r'<input type="hidden" name="submission_key" value="([0-9a-f-]{36})"')
+
+
+def result_id(response):
+    token = parse_qs(urlsplit(response['Location']).query)['r'][0]
+    return signing.loads(token, salt=SALT)['id']
+
+
+class DuplicateSubmissionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def page_key(self):
+        response = self.client.get('/')
+        return KEY_INPUT.search(response.content.decode()).group(1)
+
+    def test_every_page_gets_a_new_key(self):
+        self.assertNotEqual(self.page_key(), self.page_key())
+
+    def test_repeated_post_is_stored_once(self):
+        data = form_data(submission_key=self.page_key())
+        first = self.client.post('/', data)
+        second = self.client.post('/', data)
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(second['Location'], first['Location'])
+        self.assertEqual(SleepQuestionnaire.objects.count(), 1)
+        self.assertEqual(str(SleepQuestionnaire.objects.get().submission_key), data['submission_key'])
+
+    def test_replay_found_in_table(self):
+        # e.g. the retry reached another worker, with its own cache
+        data = form_data(submission_key=self.page_key())
+        first = self.client.post('/', data)
+        cache.clear()
+        # The key lookup and the percentile, no insert
+        with self.assertNumQueries(2):
+            second = self.client.post('/', data)
+        self.assertEqual(result_id(second), result_id(first))
+        self.assertEqual(SleepQuestionnaire.objects.count(), 1)
+
+    def test_old_key_with_new_answers_is_a_new_questionnaire(self):
+        key = self.page_key()
+        self.client.post('/', form_data(submission_key=key))
+        for clear_cache in (False, True):
+            if clear_cache:
+                cache.clear()
+            response = self.client.post('/', form_data(submission_key=key, sleep_hours=4 + clear_cache))
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(SleepQuestionnaire.objects.count(), 3)
+        self.assertEqual(SleepQuestionnaire.objects.filter(submission_key=key).count(), 1)
+
+    @override_settings(RESULT_TOKEN_MAX_AGE=60)
+    def test_key_kept_past_the_replay_window(self):
+        # A cached page revalidated with a 304 keeps its key for as long as
+        # the browser likes; the same answers later are a new questionnaire
+        data = form_data(submission_key=self.page_key())
+        self.client.post('/', data)
+        SleepQuestionnaire.objects.update(created_at=timezone.now() - timedelta(minutes=2))
+        cache.clear()
+        response = self.client.post('/', data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(SleepQuestionnaire.objects.count(), 2)
+
+    def test_missing_or_mangled_key(self):
+        for key in ('', 'not-a-uuid'):
+            response = self.client.post('/', form_data(submission_key=key))
+            self.assertEqual(response.status_code, 302)
+        self.client.post('/', form_data())
+        self.assertEqual(SleepQuestionnaire.objects.filter(submission_key__isnull=True).count(), 3)
+
+    def test_invalid_post_keeps_its_key(self):
+        key = str(uuid.uuid4())
+        response = self.client.post('/', form_data(submission_key=key, sleep_quality=9))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(KEY_INPUT.search(response.content.decode()).group(1), key)
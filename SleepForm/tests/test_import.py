@@ -0,0 +1,92 @@
+import csv
+import json
+import tempfile
+from datetime import date, datetime
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from SleepForm.ingest import clean_row
+from SleepForm.models import DailySubmissionCount, SleepQuestionnaire
+from SleepForm.respondents import pseudonym
+
+from .factories import form_data
+
+
+class ImportCommandTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write_csv(self, rows):
+        path = self.directory / 'questionnaires.csv'
+        fields = list(dict.fromkeys(name for row in rows for name in row))
+        with path.open('w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def run_import(self, path, *args):
+        out = StringIO()
+        call_command('import_questionnaires', str(path), *args, stdout=out)
+        return out.getvalue()
+
+    def rejects(self, path):
+        with open(f'{path}.rejects.csv', newline='', encoding='utf-8') as file:
+            return list(csv.DictReader(file))
+
+    def test_csv_with_labels_dates_and_rejects(self):
+        path = self.write_csv([
+            form_data(created_at='2020-03-01T09:30:00-03:00'),
+            form_data(medication_use='1 ou 2 vezes/semana', created_at=''),
+            form_data(sleep_quality=9),
+            form_data(created_at='2999-01-01'),
+        ])
+        output = self.run_import(path, '--chunk-size', '2')
+        self.assertIn("Done: 2 rows imported, 2 rejected.", output)
+
+        historical, recent = SleepQuestionnaire.objects.order_by('pk')
+        self.assertEqual(historical.created_at, datetime.fromisoformat('2020-03-01T09:30:00-03:00'))
+        self.assertEqual(timezone.localdate(recent.created_at), timezone.localdate())
+        self.assertEqual(recent.medication_use, 2)
+        self.assertEqual(DailySubmissionCount.objects.get(day=date(2020, 3, 1)).count, 1)
+
+        rejects = self.rejects(path)
+        self.assertEqual([reject['line'] for reject in rejects], ['4', '5'])
+        self.assertIn('sleep_quality', json.loads(rejects[0]['errors']))
+        self.assertIn('created_at', json.loads(rejects[1]['errors']))
+
+    def test_jsonl_and_dry_run(self):
+        path = self.directory / 'questionnaires.jsonl'
+        path.write_text(f'{json.dumps(form_data())}\n\nnot json\n[1]\n', encoding='utf-8')
+        output = self.run_import(path, '--dry-run')
+        self.assertIn("Done: 1 rows validated, 2 rejected.", output)
+        self.assertFalse(SleepQuestionnaire.objects.exists())
+        self.assertEqual([reject['line'] for reject in self.rejects(path)], ['3', '4'])
+
+    def test_clinic(self):
+        path = self.write_csv([form_data(respondent_code='P-001', respondent='f' * 64)])
+        self.run_import(path, '--clinic', 'clinic')
+        stored = SleepQuestionnaire.objects.get()
+        self.assertEqual((stored.clinic, stored.respondent), ('clinic', pseudonym('P-001', 'clinic')))
+
+
+class CreatedAtTests(TestCase):
+
+    def test_local_time_without_offset(self):
+        instance, _ = clean_row(form_data(created_at='2024-07-01 08:00'))
+        self.assertEqual(timezone.localtime(instance.created_at).replace(tzinfo=None), datetime(2024, 7, 1, 8))
+        instance, _ = clean_row(form_data(created_at='2024-07-01'))
+        self.assertEqual(timezone.localdate(instance.created_at), date(2024, 7, 1))
+
+    def test_invalid(self):
+        _, errors = clean_row(form_data(created_at='ontem'))
+        self.assertIn('created_at', errors)
+        _, errors = clean_row(form_data(created_at='2024-13-01'))
+        self.assertIn('created_at', errors)
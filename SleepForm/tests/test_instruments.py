@@ -0,0 +1,101 @@
+from datetime import time
+
+from django.test import SimpleTestCase
+
+from SleepForm.instruments import ESS, ESS_ITEMS, ISI, ISI_ITEMS, PSQI
+from SleepForm.models import SleepQuestionnaire
+from SleepForm.rules import Answer, Bands, HoursBetween, Instrument, Lookup, Node, Ratio, Score, Sum
+
+from .factories import FORM_DATA, questionnaire
+
+
+class InstrumentTests(SimpleTestCase):
+
+    def test_mapping_and_instance_agree(self):
+        instance = questionnaire()
+        answers = {**FORM_DATA, 'bedtime': time(23), 'wakeup_time': time(7), 'other_reason_frequency': None}
+        self.assertEqual(PSQI.score(answers), PSQI.score(instance))
+
+    def test_fields_in_order_of_use(self):
+        self.assertEqual(PSQI.fields[:2], ('time_to_sleep', 'sleep_hours'))
+        self.assertEqual(len(PSQI.fields), len(set(PSQI.fields)))
+
+    def test_intermediate_scores_are_shared(self):
+        calls = []
+        instrument = Instrument(
+            'test',
+            scores={
+                'base': Bands(Answer('a'), [('>', 0, 1)], default=0),
+                'twice': Sum(Score('base'), Score('base')),
+                'again': Lookup(Score('base'), {1: 5}, default=0),
+            },
+            components=('twice', 'again'),
+        )
+        original = instrument.row_functions['base']
+        instrument.row_functions['base'] = lambda answers, cache: calls.append(1) or original(answers, cache)
+        self.assertEqual(instrument.score({'a': 3}), {'twice': 2, 'again': 5})
+        self.assertEqual(len(calls), 1)
+
+    def test_zero_denominator(self):
+        instrument = Instrument(
+            'test',
+            scores={
+                'ratio': Bands(
+                    Ratio(Answer('hours'), HoursBetween('start', 'end'), scale=100),
+                    [('>=', 85, 0)],
+                    default=3,
+                ),
+            },
+            components=('ratio',),
+        )
+        columns = {'hours': [6, 0], 'start': [time(7), time(7)], 'end': [time(7), time(7)]}
+        self.assertEqual(instrument.score_columns(columns)['ratio'].tolist(), [0, 3])
+        self.assertEqual(instrument.score({'hours': 6, 'start': time(7), 'end': time(7)}), {'ratio': 0})
+        self.assertEqual(instrument.score({'hours': 0, 'start': time(7), 'end': time(7)}), {'ratio': 3})
+
+    def test_max_total(self):
+        # SLPQUAL is the 1-4 answer, see instruments.py
+        self.assertEqual(PSQI.max_total, 22)
+        for name, field in [('quality', 'sleep_quality'), ('meds', 'medication_use')]:
+            choices = SleepQuestionnaire._meta.get_field(field).choices
+            self.assertEqual(PSQI.scores[name].highest(PSQI), max(value for value, _ in choices))
+        self.assertEqual((ESS.max_total, ISI.max_total), (ESS.categories[-1][0], ISI.categories[-1][0]))
+        ratio = Instrument('test', scores={'ratio': Ratio(Answer('a'), Answer('b'))}, components=('ratio',))
+        self.assertIsNone(ratio.max_total)
+
+    def test_node_must_compile_everywhere(self):
+        class RowOnly(Node):
+            def row(self, instrument):
+                return lambda answers, cache: 0
+
+        with self.assertRaises(TypeError):
+            Instrument('test', scores={'score': RowOnly()}, components=('score',))
+
+
+class EpworthTests(SimpleTestCase):
+
+    def test_total_and_categories(self):
+        cases = [(0, 'Sonolência diurna normal baixa'), (8, 'Sonolência diurna normal alta'),
+                 (12, 'Sonolência diurna excessiva leve'), (24, 'Sonolência diurna excessiva grave')]
+        for total, category in cases:
+            with self.subTest(total=total):
+                points = [3] * (total // 3) + [total % 3] + [0] * 8
+                answers = dict(zip(ESS_ITEMS, points))
+                self.assertEqual(ESS.total(answers), total)
+                self.assertEqual(ESS.category(ESS.total(answers)), category)
+
+    def test_batch(self):
+        columns = {item: [0, 1, 3] for item in ESS_ITEMS}
+        self.assertEqual(ESS.score_columns(columns)['total'].tolist(), [0, 8, 24])
+
+
+class InsomniaSeverityTests(SimpleTestCase):
+
+    def test_categories(self):
+        for total, category in [(7, 'Ausência de insônia clinicamente significativa'), (8, 'Insônia subclínica'),
+                                (21, 'Insônia clínica moderada'), (28, 'Insônia clínica grave')]:
+            with self.subTest(total=total):
+                points = [4] * (total // 4) + [total % 4] + [0] * 7
+                answers = dict(zip(ISI_ITEMS, points))
+                self.assertEqual(ISI.total(answers), total)
+                self.assertEqual(ISI.category(total), category)
@@ -0,0 +1,74 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+
+from SleepForm import metrics
+
+from .factories import form_data
+
+AUTHORIZATION = {'HTTP_AUTHORIZATION': 'Bearer s3cret'}
+
+
+def sample(text, line_start):
+    """Value of the first exposition line starting with ``line_start``, 0 if absent"""
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+
+@override_settings(METRICS_TOKEN='s3cret', METRICS_DIR=None)
+class MetricsEndpointTests(TestCase):
+
+    def scrape(self):
+        response = self.client.get('/metrics/', **AUTHORIZATION)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode()
+
+    def test_requires_token(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+    def test_records_requests_and_templates(self):
+        request_count = 'sleepform_request_duration_seconds_count{view="sleep_questionnaire",method="GET",status="200"}'
+        render_count = 'sleepform_template_render_seconds_count{template="SleepForm/questionnaire.html"}'
+        before = self.scrape()
+        self.client.get('/')
+        after = self.scrape()
+        self.assertEqual(sample(after, request_count), sample(before, request_count) + 1)
+        self.assertEqual(sample(after, render_count), sample(before, render_count) + 1)
+
+    def test_records_queries_and_phases(self):
+        query_sum = 'sleepform_request_db_queries_sum{view="sleep_questionnaire"}'
+        save_count = 'sleepform_phase_duration_seconds_count{phase="save"}'
+        before = self.scrape()
+        response = self.client.post('/', form_data())
+        self.assertEqual(response.status_code, 302)
+        after = self.scrape()
+        self.assertGreater(sample(after, query_sum), sample(before, query_sum))
+        self.assertEqual(sample(after, save_count), sample(before, save_count) + 1)
+
+    def test_buckets_are_cumulative(self):
+        metrics.observe('sleepform_phase_duration_seconds', ('test-buckets',), 0.003)
+        metrics.observe('sleepform_phase_duration_seconds', ('test-buckets',), 0.2)
+        text = self.scrape()
+        prefix = 'sleepform_phase_duration_seconds_bucket{phase="test-buckets",'
+        self.assertEqual(sample(text, prefix + 'le="0.0025"}'), 0)
+        self.assertEqual(sample(text, prefix + 'le="0.005"}'), 1)
+        self.assertEqual(sample(text, prefix + 'le="0.25"}'), 2)
+        self.assertEqual(sample(text, prefix + 'le="+Inf"}'), 2)
+
+    def test_adds_up_other_processes(self):
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            buckets = len(metrics.HISTOGRAMS['sleepform_phase_duration_seconds'][2])
+            other_worker = {'sleepform_phase_duration_seconds': [[['test-merge'], [0] * buckets + [3, 30.0]]]}
+            Path(metrics_dir, '12345-1.json').write_text(json.dumps(other_worker))
+            metrics.observe('sleepform_phase_duration_seconds', ('test-merge',), 20.0)
+
+            with self.settings(METRICS_DIR=metrics_dir):
+                text = self.scrape()
+        self.assertEqual(sample(text, 'sleepform_phase_duration_seconds_count{phase="test-merge"}'), 4)
+        self.assertEqual(sample(text, 'sleepform_phase_duration_seconds_sum{phase="test-merge"}'), 50.0)
@@ -0,0 +1,75 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from SleepForm.models import SleepQuestionnaire
+
+from .factories import questionnaire
+
+
+class AnswerConstraintTests(TestCase):
+
+    def test_every_choice_field_is_checked(self):
+        constraints = {constraint.name for constraint in SleepQuestionnaire._meta.constraints}
+        for field in SleepQuestionnaire._meta.concrete_fields:
+            if field.choices:
+                with self.subTest(field=field.name):
+                    self.assertEqual(field.get_internal_type(), 'PositiveSmallIntegerField')
+                    self.assertIn(f'sleepform_{field.name}_range', constraints)
+                    values = [value for value, _ in field.choices]
+                    condition = dict(next(
+                        constraint for constraint in SleepQuestionnaire._meta.constraints
+                        if constraint.name == f'sleepform_{field.name}_range'
+                    ).condition.children)
+                    self.assertEqual(condition[f'{field.name}__gte'], min(values))
+                    self.assertEqual(condition[f'{field.name}__lte'], max(values))
+
+    def test_database_rejects_out_of_range_answers(self):
+        for field, value in [('pain', 4), ('sleep_quality', 0), ('has_partner', 7)]:
+            with self.subTest(field=field), self.assertRaises(IntegrityError), transaction.atomic():
+                # bulk_create skips model validation, like a raw insert would
+                SleepQuestionnaire.objects.bulk_create([questionnaire(**{field: value})])
+
+    def test_optional_answers_may_be_blank(self):
+        SleepQuestionnaire.objects.bulk_create([questionnaire(other_reason_frequency=None, partner_snoring=None)])
+
+
+class CompactAnswersMigrationTests(TransactionTestCase):
+
+    before = [('SleepForm', '0005_score_summary')]
+    after = [('SleepForm', '0006_compact_answers')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        with CaptureQueriesContext(connection) as queries:
+            executor.migrate(targets)
+        return [query['sql'] for query in queries if query['sql'].startswith('CREATE TABLE "new__')]
+
+    def tearDown(self):
+        MigrationExecutor(connection).migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_one_rebuild_keeps_the_answers(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Table rebuilds are SQLite's")
+        self.migrate(self.before)
+        old_model = MigrationExecutor(connection).loader.project_state(self.before[0]).apps.get_model(
+            'SleepForm', 'SleepQuestionnaire',
+        )
+        instance = questionnaire()
+        old_model.objects.create(**{
+            field.attname: getattr(instance, field.attname)
+            for field in old_model._meta.concrete_fields if not field.primary_key
+        })
+
+        self.assertEqual(len(self.migrate(self.after)), 1)
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, SleepQuestionnaire._meta.db_table)
+        self.assertIn('sleepform_sleep_quality_range', constraints)
+        self.assertEqual(
+            SleepQuestionnaire.objects.values_list('sleep_quality', 'medication_use').get(),
+            (instance.sleep_quality, instance.medication_use),
+        )
+
+        self.assertEqual(len(self.migrate(self.before)), 1)
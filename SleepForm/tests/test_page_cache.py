@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import TestCase
+
+from SleepForm.forms import SleepQuestionnaireForm
+from SleepForm.page_cache import templates_modified, unbound_form_markup
+
+from .factories import form_data
+
+
+class QuestionnairePageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_visit_gets_a_full_page(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_revalidation(self):
+        self.client.get('/')
+        response = self.client.get('/')
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            self.client.get('/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304,
+        )
+
+        # The cached copy holds the old CSRF token: a new cookie needs a new page
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'x' * 32
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_posts_are_never_answered_from_cache(self):
+        self.client.get('/')
+        etag = self.client.get('/')['ETag']
+        response = self.client.post('/', form_data(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 302)
+
+    def test_form_markup_is_rendered_once(self):
+        expected = render_to_string('SleepForm/_questionnaire_fields.html', {'form': SleepQuestionnaireForm()})
+        self.assertEqual(unbound_form_markup(), expected)
+        key = f'sleepform:questionnaire-fields:{templates_modified().timestamp():.0f}'
+        cache.set(key, 'cached')
+        self.assertEqual(unbound_form_markup(), 'cached')
+        self.assertIn('name="respondent_code"', unbound_form_markup('clinic'))
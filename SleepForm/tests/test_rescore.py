@@ -0,0 +1,58 @@
+import random
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from SleepForm.instruments import PSQI
+from SleepForm.models import ScoreSummary, SleepQuestionnaire
+from SleepForm.scoring import outdated_scores
+
+from .factories import random_questionnaire
+
+
+def rescore(**options):
+    out = StringIO()
+    call_command('rescore', workers=1, chunk_size=7, stdout=out, **options)
+    return out.getvalue()
+
+
+class RescoreTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(20)
+        for _ in range(30):
+            random_questionnaire(rng).save()
+
+    def test_new_rows_are_current(self):
+        self.assertFalse(outdated_scores().exists())
+        self.assertEqual(set(SleepQuestionnaire.objects.values_list('scoring_version', flat=True)), {PSQI.version})
+        self.assertIn("Nothing to do", rescore())
+
+    def test_recomputes_only_outdated_rows(self):
+        stale = list(SleepQuestionnaire.objects.order_by('pk').values_list('pk', flat=True)[::3])
+        SleepQuestionnaire.objects.filter(pk__in=stale[1:]).update(total_score=99, scoring_version=PSQI.version - 1)
+        SleepQuestionnaire.objects.filter(pk=stale[0]).update(total_score=None, scoring_version=None)
+        # A current row with a wrong score shows which rows were touched
+        current = SleepQuestionnaire.objects.exclude(pk__in=stale).first()
+        SleepQuestionnaire.objects.filter(pk=current.pk).update(total_score=98)
+
+        self.assertIn(f"Done: {len(stale)} rows rescored, {len(stale)} with new scores.", rescore())
+
+        for questionnaire in SleepQuestionnaire.objects.filter(pk__in=stale):
+            self.assertEqual(questionnaire.scoring_version, PSQI.version)
+            self.assertEqual(questionnaire.total_score, questionnaire.calculate_total_score())
+        self.assertEqual(SleepQuestionnaire.objects.get(pk=current.pk).total_score, 98)
+        self.assertFalse(ScoreSummary.objects.filter(total_score=99).exists())
+
+        # Resuming after completion is a no-op
+        self.assertIn("Nothing to do", rescore())
+
+    def test_version_bump_rescores_everything(self):
+        with mock.patch.object(PSQI, 'version', PSQI.version + 1):
+            self.assertEqual(outdated_scores().count(), 30)
+            # The rules did not really change, so no score is rewritten
+            self.assertIn("Done: 30 rows rescored, 0 with new scores.", rescore())
+            self.assertFalse(outdated_scores().exists())
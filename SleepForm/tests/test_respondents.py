@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from SleepForm.ingest import clean_row
+from SleepForm.models import SleepQuestionnaire
+from SleepForm.respondents import history, pseudonym
+
+from .factories import form_data, questionnaire
+
+URL = '/api/respondents/history/'
+AUTHORIZATION = {'HTTP_AUTHORIZATION': 'Bearer clinic-key'}
+START = datetime(2026, 1, 5, 9, 0, tzinfo=timezone.utc)
+# pseudonym('P-001') under RESPONDENT_SECRET='respondent-secret'. Changing how
+# pseudonyms are derived would split every stored history in two.
+PSEUDONYM = 'f7b657ce5d3adde1c6f41e4623cc673c63712864744fabc2e3da57318bb3f5a0'
+
+
+def administer(respondent, months, clinic=None, **answers):
+    """Save a questionnaire for ``respondent`` ``months`` after START"""
+    instance = questionnaire(**answers)
+    instance.respondent = respondent
+    instance.clinic = clinic
+    instance.save()
+    SleepQuestionnaire.objects.filter(pk=instance.pk).update(created_at=START + timedelta(days=30 * months))
+    instance.refresh_from_db()
+    return instance
+
+
+@override_settings(RESPONDENT_SECRET='respondent-secret')
+class PseudonymTests(TestCase):
+
+    def test_stable_keyed_and_blank(self):
+        self.assertEqual(pseudonym('P-001'), PSEUDONYM)
+        self.assertEqual(pseudonym(' P-001 '), PSEUDONYM)
+        self.assertNotEqual(pseudonym('P-001'), pseudonym('P-002'))
+        with self.settings(RESPONDENT_SECRET='another-secret'):
+            self.assertNotEqual(pseudonym('P-001'), PSEUDONYM)
+        # Each clinic has its own
+        self.assertEqual(len({pseudonym('P-001'), pseudonym('P-001', 'a'), pseudonym('P-001', 'b')}), 3)
+        self.assertIsNone(pseudonym('  '))
+        self.assertIsNone(pseudonym(None))
+
+    @override_settings(CLINIC_API_KEYS={'clinic-key': 'clinic'})
+    def test_form_stores_only_the_pseudonym(self):
+        cache.clear()
+        self.client.post('/clinica/clinic/', form_data(respondent_code='P-001'))
+        stored = SleepQuestionnaire.objects.get()
+        self.assertEqual((stored.clinic, stored.respondent), ('clinic', pseudonym('P-001', 'clinic')))
+        self.assertNotIn('P-001', str(SleepQuestionnaire.objects.values().get()))
+
+    @override_settings(CLINIC_API_KEYS={'clinic-key': 'clinic'})
+    def test_only_clinic_pages_ask_for_a_code(self):
+        cache.clear()
+        self.assertContains(self.client.get('/clinica/clinic/'), 'name="respondent_code"')
+        self.assertNotContains(self.client.get('/'), 'name="respondent_code"')
+        self.assertEqual(self.client.get('/clinica/unknown/').status_code, 404)
+
+        # A code sent to the public form anyway is not stored
+        self.client.post('/', form_data(respondent_code='P-001'))
+        stored = SleepQuestionnaire.objects.get()
+        self.assertEqual((stored.clinic, stored.respondent), (None, None))
+
+    def test_rows(self):
+        instance, errors = clean_row(form_data(respondent_code='P-001'), 'clinic')
+        self.assertEqual((instance.clinic, instance.respondent), ('clinic', pseudonym('P-001', 'clinic')))
+        # Pseudonyms are derived here, never taken from the row
+        instance, errors = clean_row(form_data(respondent=pseudonym('P-001')), 'clinic')
+        self.assertIsNone(instance.respondent)
+        self.assertIsNone(clean_row(form_data())[0].respondent)
+        _, errors = clean_row(form_data(respondent_code='x' * 101))
+        self.assertIn('respondent_code', errors)
+
+
+class HistoryTests(TestCase):
+
+    def test_series_and_deltas_per_respondent(self):
+        # Totals 10, 12 then 11 for "a"; the rows are saved out of order
+        administer('a', 2, sleep_quality=1, medication_use=3)
+        administer('a', 0)
+        administer('b', 1)
+        administer('a', 1, sleep_hours=4)
+        administer(None, 1)
+        administer('a', 1, clinic='other')
+
+        rows = list(history(['a', 'b'], None))
+        self.assertEqual([row['respondent'] for row in rows], ['a', 'a', 'a', 'b'])
+        a = rows[:3]
+        self.assertEqual([row['visit'] for row in a], [1, 2, 3])
+        self.assertEqual([row['total_score'] for row in a], [10, 12, 11])
+        self.assertEqual([row['delta'] for row in a], [None, 2, -1])
+        self.assertEqual([row['change'] for row in a], [0, 2, 1])
+        self.assertEqual((rows[3]['visit'], rows[3]['delta']), (1, None))
+
+    def test_one_query(self):
+        administer('a', 0)
+        with self.assertNumQueries(1):
+            list(history(['a', 'b'], None))
+
+
+@override_settings(CLINIC_API_KEYS={'clinic-key': 'clinic', 'other-key': 'other'}, API_MAX_ITEMS=2, RESPONDENT_SECRET='respondent-secret')
+class HistoryApiTests(TestCase):
+
+    def test_requires_key(self):
+        self.assertEqual(self.client.get(URL, {'respondent': 'a'}).status_code, 401)
+
+    def test_history(self):
+        response = self.client.post(
+            '/api/questionnaires/', [form_data(respondent_code='P-001')],
+            content_type='application/json', **AUTHORIZATION,
+        )
+        respondent = response.json()['results'][0]['respondent']
+        self.assertEqual(respondent, pseudonym('P-001', 'clinic'))
+
+        response = self.client.get(URL, {'respondent': [respondent, 'unknown']}, **AUTHORIZATION)
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()['respondents']
+        self.assertEqual([entry['respondent'] for entry in payload], [respondent, 'unknown'])
+        [first] = payload[0]['questionnaires']
+        self.assertEqual((first['visit'], first['delta'], first['change']), (1, None, 0))
+        self.assertEqual(first['total'], sum(first['scores'].values()))
+        self.assertEqual(payload[1]['questionnaires'], [])
+
+    def test_history_of_the_clinic_page(self):
+        cache.clear()
+        self.client.post('/clinica/clinic/', form_data(respondent_code='P-001'))
+        self.client.post('/clinica/other/', form_data(respondent_code='P-001'))
+        respondent = pseudonym('P-001', 'clinic')
+
+        response = self.client.get(URL, {'respondent': respondent}, **AUTHORIZATION)
+        [entry] = response.json()['respondents']
+        [answered] = entry['questionnaires']
+        self.assertEqual(answered['id'], SleepQuestionnaire.objects.get(clinic='clinic').pk)
+        self.assertEqual(answered['total'], 10)
+
+    def test_only_own_respondents(self):
+        administer(pseudonym('P-001'), 0)
+        mine = administer(pseudonym('P-001', 'clinic'), 0, clinic='clinic')
+        administer(mine.respondent, 1, clinic='other')
+
+        respondents = [pseudonym('P-001'), mine.respondent]
+        response = self.client.get(URL, {'respondent': respondents}, **AUTHORIZATION)
+        payload = response.json()['respondents']
+        self.assertEqual(payload[0]['questionnaires'], [])
+        self.assertEqual([row['id'] for row in payload[1]['questionnaires']], [mine.pk])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(URL, **AUTHORIZATION).status_code, 400)
+        response = self.client.get(URL, {'respondent': ['a', 'b', 'c']}, **AUTHORIZATION)
+        self.assertEqual(response.status_code, 413)
+
+
+class AdminSearchTests(TestCase):
+
+    def test_search_by_code(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        mine = [administer(pseudonym('P-001'), 0), administer(pseudonym('P-001', 'clinic'), 1, clinic='clinic')]
+        administer(pseudonym('P-002'), 0)
+
+        with self.settings(CLINIC_API_KEYS={'clinic-key': 'clinic'}):
+            response = self.client.get('/admin/SleepForm/sleepquestionnaire/', {'q': 'P-001'})
+        self.assertEqual(
+            sorted(obj.pk for obj in response.context['cl'].result_list), [instance.pk for instance in mine],
+        )
@@ -0,0 +1,43 @@
+import time
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from django.core import signing
+from django.test import TestCase, override_settings
+
+from SleepForm.results import make_result, success_url
+
+from .factories import questionnaire
+
+
+@override_settings(RESULT_TOKEN_MAX_AGE=3600)
+class ResultTokenTests(TestCase):
+
+    def setUp(self):
+        instance = questionnaire()
+        instance.update_scores()
+        instance.pk = 7
+        self.url = success_url(make_result(instance, 42.0))
+
+    def token(self):
+        return parse_qs(urlsplit(self.url).query)['r'][0]
+
+    def test_success_page_renders_from_the_token_alone(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, "Sua pontuação: 10")
+        self.assertContains(response, "pior que 42% dos respondentes")
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_tampered_token(self):
+        token = self.token()
+        payload, signature = token.rsplit(':', 1)
+        for forged in (f'{payload}:{signature[::-1]}', signing.dumps({'total': 0}, salt='other'), ''):
+            response = self.client.get('/success/', {'r': forged})
+            self.assertRedirects(response, '/', fetch_redirect_response=False)
+
+    def test_expired_token(self):
+        later = time.time() + 3601
+        with mock.patch('time.time', return_value=later):
+            response = self.client.get(self.url)
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
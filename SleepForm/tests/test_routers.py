@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import router
+from django.test import TestCase
+
+from SleepForm.models import ScoreSummary, SleepQuestionnaire
+from SleepForm.routers import PIN_COOKIE, REPLICA, read_database, replica_reads
+
+from .factories import form_data
+
+# Routing decisions only: no query is sent to this alias
+with_replica = mock.patch.dict(settings.DATABASES, {REPLICA: dict(settings.DATABASES['default'])})
+
+
+class ReplicaRouterTests(TestCase):
+
+    def test_without_replica_everything_uses_default(self):
+        with replica_reads():
+            self.assertEqual(router.db_for_read(SleepQuestionnaire), 'default')
+        self.assertEqual(read_database(), 'default')
+
+    @with_replica
+    def test_reporting_reads_use_replica(self):
+        self.assertEqual(router.db_for_read(SleepQuestionnaire), 'default')
+        with replica_reads():
+            self.assertEqual(router.db_for_read(SleepQuestionnaire), REPLICA)
+            self.assertEqual(router.db_for_read(ScoreSummary), REPLICA)
+            self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_write(SleepQuestionnaire), 'default')
+        self.assertEqual(read_database(), REPLICA)
+
+    def test_replica_is_not_migrated(self):
+        self.assertFalse(router.allow_migrate(REPLICA, 'SleepForm'))
+        self.assertTrue(router.allow_migrate('default', 'SleepForm'))
+
+
+@with_replica
+class ReadYourWritesTests(TestCase):
+
+    def test_submission_pins_client_to_primary(self):
+        response = self.client.post('/', form_data())
+        self.assertEqual(response.status_code, 302)
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+        self.assertTrue(cookie['httponly'])
+
+    def test_reads_do_not_pin(self):
+        response = self.client.get('/')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_pinned_client_reads_primary(self):
+        staff = User.objects.create_user('staff', password='password', is_staff=True)
+        self.client.force_login(staff)
+        self.client.cookies[PIN_COOKIE] = '1'
+        reads_from = lambda: {'database': router.db_for_read(ScoreSummary)}
+        with mock.patch('SleepForm.views.dashboard_summary', side_effect=reads_from) as summary:
+            response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(summary.call_count, 1)
+        self.assertEqual(response.context['database'], 'default')
@@ -0,0 +1,279 @@
+"""
+Scoring rules checked against a reference table, plus differential checks
+that the per-instance methods, the NumPy batch scorer (``scoring``), the SQL
+annotations (``with_psqi``) and the stored score columns all agree.
+
+The reference below is written from the PSQI scoring sheet as this project
+applies it, including its known departures from the original sheet, so that
+any rewrite of the scoring code has to reproduce today's results exactly.
+"""
+import random
+from datetime import time
+from fractions import Fraction
+from itertools import product
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from SleepForm.models import COMPONENTS, SleepQuestionnaire
+from SleepForm.scoring import SCORE_FIELDS, score_rows
+
+from .factories import form_data, questionnaire, random_questionnaire
+
+# Q5COM (sum of Q5a-Q5j, 0-30) -> DISTB
+DISTURBANCE_BY_SUM = [0] + [1] * 8 + [2] * 9 + [3] * 13
+
+# Q5a + Q2new (0-6) -> LATEN
+LATENCY_BY_SUM = [0, 1, 1, 2, 2, 3, 3]
+
+# Q8 + Q9 (0-6) -> DAYDYS
+DAYTIME_BY_SUM = [0, 1, 1, 2, 2, 3, 3]
+
+
+def reference_duration(sleep_hours):
+    hours = Fraction(str(sleep_hours))
+    if hours >= 7:
+        return 0
+    if hours > 6:
+        return 1
+    if hours > 5:
+        return 2
+    return 3
+
+
+def reference_new_latency(minutes):
+    # Falling asleep in "0 minutes" is scored like more than an hour
+    if minutes == 0 or minutes >= 60:
+        return 3
+    if minutes >= 30:
+        return 2
+    if minutes >= 15:
+        return 1
+    return 0
+
+
+def reference_efficiency(bedtime, wakeup_time, sleep_hours):
+    """Exact-arithmetic HSE; time in bed is the same-day distance between the two times"""
+    seconds = lambda t: t.hour * 3600 + t.minute * 60 + t.second
+    time_in_bed = Fraction(abs(seconds(wakeup_time) - seconds(bedtime)), 3600)
+    efficiency = Fraction(str(sleep_hours)) / time_in_bed * 100
+    if efficiency >= 85:
+        return 0
+    if efficiency >= 75:
+        return 1
+    if efficiency >= 65:
+        return 2
+    return 3
+
+
+def reference_scores(instance):
+    difficulty = sum(getattr(instance, field) or 0 for field in SleepQuestionnaire.DIFFICULTY_FIELDS)
+    daytime = sum(getattr(instance, field) for field in SleepQuestionnaire.DAYTIME_FIELDS)
+    latency = instance.difficulty_falling_asleep + reference_new_latency(instance.time_to_sleep)
+    return {
+        'duration': reference_duration(instance.sleep_hours),
+        'disturbance': DISTURBANCE_BY_SUM[difficulty],
+        'latency': LATENCY_BY_SUM[latency],
+        'daytime': DAYTIME_BY_SUM[daytime],
+        'efficiency': reference_efficiency(instance.bedtime, instance.wakeup_time, instance.sleep_hours),
+        'quality': instance.sleep_quality,
+        'meds': instance.medication_use,
+    }
+
+
+def batch_scores(instances):
+    """Per-instance component dicts from the NumPy scorer"""
+    scores = score_rows([getattr(instance, field) for field in SCORE_FIELDS] for instance in instances)
+    return [
+        {name: int(scores[name][i]) for name in COMPONENTS} for i in range(len(instances))
+    ]
+
+
+class ComponentBoundaryTests(SimpleTestCase):
+    """Each ``_get_*_score`` helper on both sides of every cut-off"""
+
+    def test_duration(self):
+        cases = [(0, 3), (4.5, 3), (5, 3), (5.25, 2), (6, 2), (6.5, 1), (6.99, 1), (7, 0), (9, 0)]
+        for hours, expected in cases:
+            with self.subTest(sleep_hours=hours):
+                self.assertEqual(questionnaire(sleep_hours=hours)._get_duration_score(), expected)
+
+    def test_new_latency(self):
+        cases = [(0, 3), (1, 0), (14, 0), (15, 1), (29, 1), (30, 2), (59, 2), (60, 3), (240, 3)]
+        for minutes, expected in cases:
+            with self.subTest(time_to_sleep=minutes):
+                self.assertEqual(questionnaire(time_to_sleep=minutes)._get_new_latent_score(), expected)
+
+    def test_latency_grid(self):
+        for falling, minutes in product(range(4), range(0, 121)):
+            with self.subTest(difficulty_falling_asleep=falling, time_to_sleep=minutes):
+                instance = questionnaire(difficulty_falling_asleep=falling, time_to_sleep=minutes)
+                expected = LATENCY_BY_SUM[falling + reference_new_latency(minutes)]
+                self.assertEqual(instance._get_latent_score(), expected)
+
+    def test_disturbance(self):
+        for total in range(31):
+            with self.subTest(sum=total):
+                # Spread the sum over Q5a-Q5j, three points at most per answer
+                points = [3] * (total // 3) + [total % 3] + [0] * 10
+                instance = questionnaire(**dict(zip(SleepQuestionnaire.DIFFICULTY_FIELDS, points)))
+                self.assertEqual(instance._get_difficulty_score(), DISTURBANCE_BY_SUM[total])
+
+    def test_disturbance_ignores_unanswered_other_reason(self):
+        answered = questionnaire(other_reason_frequency=0)
+        unanswered = questionnaire(other_reason_frequency=None)
+        self.assertEqual(answered._get_difficulty_score(), unanswered._get_difficulty_score())
+
+    def test_daytime_grid(self):
+        for sleepiness, enthusiasm in product(range(4), repeat=2):
+            with self.subTest(daytime_sleepiness=sleepiness, enthusiasm_difficulty=enthusiasm):
+                instance = questionnaire(daytime_sleepiness=sleepiness, enthusiasm_difficulty=enthusiasm)
+                self.assertEqual(instance._get_daytime_score(), DAYTIME_BY_SUM[sleepiness + enthusiasm])
+
+    def test_efficiency(self):
+        cases = [
+            (time(0), time(8), 8, 0),
+            (time(0), time(8), 6.8, 0),  # exactly 85%
+            (time(0), time(8), 6.75, 1),
+            (time(0), time(8), 6, 1),  # exactly 75%
+            (time(0), time(8), 5.2, 2),  # exactly 65%
+            (time(0), time(8), 5, 3),
+            (time(1, 30), time(9, 15), 6, 1),  # 77.4%
+        ]
+        for bedtime, wakeup_time, hours, expected in cases:
+            with self.subTest(bedtime=bedtime, wakeup_time=wakeup_time, sleep_hours=hours):
+                instance = questionnaire(bedtime=bedtime, wakeup_time=wakeup_time, sleep_hours=hours)
+                self.assertEqual(instance._get_sleep_efficiency_score(), expected)
+
+    def test_efficiency_grid(self):
+        """Every quarter-hour bedtime and wakeup time against a spread of sleep durations"""
+        quarter_hours = [time(n // 4, n % 4 * 15) for n in range(96)]
+        for bedtime, wakeup_time in product(quarter_hours, quarter_hours[::3]):
+            if bedtime == wakeup_time:
+                continue
+            for hours in (0, 2.5, 5.2, 6, 6.8, 7.25, 9):
+                instance = questionnaire(bedtime=bedtime, wakeup_time=wakeup_time, sleep_hours=hours)
+                self.assertEqual(
+                    instance._get_sleep_efficiency_score(),
+                    reference_efficiency(bedtime, wakeup_time, hours),
+                    (bedtime, wakeup_time, hours),
+                )
+
+    def test_quality_and_meds_are_the_answers(self):
+        for answer in range(1, 5):
+            self.assertEqual(questionnaire(sleep_quality=answer).calculate_component_scores()['quality'], answer)
+        for answer in range(4):
+            self.assertEqual(questionnaire(medication_use=answer).calculate_component_scores()['meds'], answer)
+
+
+class EdgeCaseTests(SimpleTestCase):
+
+    def test_zero_minutes_to_fall_asleep(self):
+        instance = questionnaire(time_to_sleep=0, difficulty_falling_asleep=0)
+        self.assertEqual(instance._get_new_latent_score(), 3)
+        self.assertEqual(instance._get_latent_score(), 2)
+
+    def test_bedtime_after_midnight(self):
+        instance = questionnaire(bedtime=time(1), wakeup_time=time(7), sleep_hours=5.5)
+        # 6h in bed, 5.5h asleep: 91.7%
+        self.assertEqual(instance._get_sleep_efficiency_score(), 0)
+        self.assertEqual(instance.calculate_component_scores(), reference_scores(instance))
+
+    def test_bedtime_before_midnight_uses_same_day_difference(self):
+        # 23:00 -> 07:00 counts 16h in bed, not 8h: 7h asleep is 43.75%
+        instance = questionnaire(bedtime=time(23), wakeup_time=time(7), sleep_hours=7)
+        self.assertEqual(instance._get_sleep_efficiency_score(), 3)
+
+    def test_more_sleep_than_time_in_bed(self):
+        instance = questionnaire(bedtime=time(1), wakeup_time=time(7), sleep_hours=10)
+        self.assertEqual(instance._get_sleep_efficiency_score(), 0)
+
+    def test_bedtime_equal_to_wakeup_time(self):
+        # No time in bed: any sleep counts as fully efficient, none as the worst
+        instance = questionnaire(bedtime=time(7), wakeup_time=time(7))
+        self.assertEqual(instance._get_sleep_efficiency_score(), 0)
+        instance.sleep_hours = 0
+        self.assertEqual(instance._get_sleep_efficiency_score(), 3)
+
+    def test_total_range(self):
+        best = questionnaire(
+            bedtime=time(1), wakeup_time=time(9), sleep_hours=8, time_to_sleep=10, sleep_quality=1,
+            medication_use=0, daytime_sleepiness=0, enthusiasm_difficulty=0,
+            other_reason_frequency=None, **{field: 0 for field in SleepQuestionnaire.DIFFICULTY_FIELDS[:-1]},
+        )
+        worst = questionnaire(
+            bedtime=time(0), wakeup_time=time(12), sleep_hours=1, time_to_sleep=90, sleep_quality=4,
+            medication_use=3, daytime_sleepiness=3, enthusiasm_difficulty=3,
+            **{field: 3 for field in SleepQuestionnaire.DIFFICULTY_FIELDS},
+        )
+        self.assertEqual(best.calculate_total_score(), 1)
+        self.assertEqual(worst.calculate_total_score(), 22)
+
+
+class RandomizedDifferentialTests(SimpleTestCase):
+    """Random questionnaires scored by the model, the reference and the batch scorer"""
+
+    ROUNDS = 5000
+
+    def test_model_matches_reference(self):
+        rng = random.Random(20240601)
+        for _ in range(self.ROUNDS):
+            instance = random_questionnaire(rng)
+            components = instance.calculate_component_scores()
+            self.assertEqual(components, reference_scores(instance), vars(instance))
+            self.assertEqual(instance.calculate_total_score(), sum(components.values()))
+
+    def test_batch_matches_model(self):
+        rng = random.Random(20240602)
+        instances = [random_questionnaire(rng) for _ in range(self.ROUNDS)]
+        for instance, batch in zip(instances, batch_scores(instances)):
+            self.assertEqual(batch, instance.calculate_component_scores(), vars(instance))
+
+    def test_batch_of_nothing(self):
+        scores = score_rows([])
+        self.assertEqual(set(scores), {*COMPONENTS, 'total'})
+        self.assertEqual(len(scores['total']), 0)
+
+
+class StoredScoreTests(TestCase):
+    """Scores written on save and computed in SQL agree with the model"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_save_stores_scores(self):
+        instance = questionnaire()
+        instance.save()
+        instance.refresh_from_db()
+        for name, score in instance.calculate_component_scores().items():
+            self.assertEqual(getattr(instance, f'{name}_score'), score)
+        self.assertEqual(instance.total_score, instance.calculate_total_score())
+
+    def test_sql_annotations_match_model(self):
+        rng = random.Random(20240603)
+        instances = [random_questionnaire(rng) for _ in range(500)]
+        for instance in instances:
+            instance.save()
+
+        annotated = SleepQuestionnaire.objects.with_psqi().in_bulk([instance.pk for instance in instances])
+        for instance in instances:
+            row = annotated[instance.pk]
+            for name, score in instance.calculate_component_scores().items():
+                self.assertEqual(getattr(row, f'psqi_{name}'), score, (name, vars(instance)))
+                self.assertEqual(getattr(row, f'{name}_score'), score, (name, vars(instance)))
+            self.assertEqual(row.psqi_total, instance.calculate_total_score())
+
+    def test_zero_time_in_bed_scores_alike_everywhere(self):
+        answers = [questionnaire(bedtime=time(7), wakeup_time=time(7), sleep_hours=hours) for hours in (6.5, 0)]
+        batch = score_rows([getattr(instance, field) for field in SCORE_FIELDS] for instance in answers)
+        for i, instance in enumerate(answers):
+            instance.save()
+            row = SleepQuestionnaire.objects.with_psqi().get(pk=instance.pk)
+            self.assertEqual(instance.efficiency_score, batch['efficiency'][i])
+            self.assertEqual(row.psqi_efficiency, instance.efficiency_score)
+            self.assertEqual(row.psqi_total, instance.total_score)
+
+    def test_form_stores_zero_time_in_bed(self):
+        response = self.client.post('/', form_data(bedtime='07:00', wakeup_time='07:00'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(SleepQuestionnaire.objects.get().efficiency_score, 0)
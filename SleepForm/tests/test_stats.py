@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from SleepForm.models import DailySubmissionCount, ScoreSummary, SleepQuestionnaire
+from SleepForm.stats import apercentile_rank, dashboard_summary, percentile_rank, rebuild_score_summary
+
+from .factories import questionnaire
+
+
+def stored(**answers):
+    instance = questionnaire(**answers)
+    instance.save()
+    return instance
+
+
+class DashboardSummaryTests(TestCase):
+
+    def test_empty(self):
+        summary = dashboard_summary()
+        self.assertEqual(summary['respondents'], 0)
+        self.assertIsNone(summary['poor_sleeper_share'])
+        self.assertEqual({mean for _, mean in summary['component_means']}, {None})
+        self.assertEqual(len(summary['distribution']), 23)
+        self.assertEqual(len(summary['daily_submissions']), 30)
+
+    def test_summary(self):
+        # Totals 10, 12 and 11
+        instances = [stored(), stored(sleep_hours=4), stored(sleep_quality=1, medication_use=3)]
+        yesterday = timezone.now() - timedelta(days=1)
+        SleepQuestionnaire.objects.filter(pk=instances[0].pk).update(created_at=yesterday)
+        rebuild_score_summary()
+
+        summary = dashboard_summary(days=3)
+        self.assertEqual(summary['respondents'], 3)
+        distribution = dict(summary['distribution'])
+        self.assertEqual((distribution[10], distribution[11], distribution[12], distribution[0]), (1, 1, 1, 0))
+        self.assertEqual((summary['poor_sleepers'], summary['poor_sleeper_share']), (3, 1))
+
+        means = dict(summary['component_means'])
+        duration = SleepQuestionnaire._meta.get_field('duration_score').verbose_name
+        self.assertAlmostEqual(means[duration], sum(instance.duration_score for instance in instances) / 3)
+
+        today = timezone.localdate()
+        self.assertEqual(summary['daily_submissions'], [
+            (today - timedelta(days=2), 0), (today - timedelta(days=1), 1), (today, 2),
+        ])
+
+    def test_rebuild_matches_the_running_totals(self):
+        for hours in (4, 6.5, 8, 8):
+            stored(sleep_hours=hours)
+
+        def counters():
+            return (
+                sorted(ScoreSummary.objects.values_list()),
+                sorted(DailySubmissionCount.objects.values_list()),
+            )
+
+        running = counters()
+        rebuild_score_summary()
+        self.assertEqual(counters(), running)
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get('/dashboard/').status_code, 302)
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        stored()
+        response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Total de respondentes: 1")
+
+
+class PercentileRankTests(TestCase):
+
+    def test_no_respondents(self):
+        self.assertIsNone(percentile_rank(10))
+
+    def test_share_of_better_totals(self):
+        # Totals 10, 10, 11 and 12
+        for answers in ({}, {}, {'sleep_quality': 1, 'medication_use': 3}, {'sleep_hours': 4}):
+            stored(**answers)
+        self.assertEqual(percentile_rank(10), 0)
+        self.assertEqual(percentile_rank(11), 50)
+        self.assertEqual(percentile_rank(12), 75)
+        self.assertEqual(percentile_rank(21), 100)
+        # Reads the per-total counters, not the questionnaires
+        with self.assertNumQueries(1):
+            percentile_rank(12)
+
+    async def test_async_version(self):
+        self.assertIsNone(await apercentile_rank(10))
+        await sync_to_async(stored)()
+        await sync_to_async(stored)(sleep_hours=4)
+        self.assertEqual(await apercentile_rank(12), 50)
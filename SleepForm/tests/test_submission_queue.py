@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+
+from SleepForm import submission_queue
+from SleepForm.models import ScoreSummary, SleepQuestionnaire
+
+from .factories import questionnaire
+
+SUBMITTED_AT = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+
+
+def queued(**answers):
+    """Enqueue a scored questionnaire, as the view does; returns it"""
+    instance = questionnaire(**answers)
+    instance.submission_key = uuid.uuid4()
+    instance.created_at = SUBMITTED_AT
+    instance.update_scores()
+    submission_queue.enqueue(instance)
+    return instance
+
+
+class SubmissionQueueTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.queue_dir = Path(directory)
+        settings = override_settings(SUBMISSION_QUEUE_DIR=directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def files(self):
+        return sorted(path.name for path in self.queue_dir.glob('*.jsonl'))
+
+    def test_drain_inserts_with_key_and_submission_time(self):
+        first, second = queued(clinic='clinic', respondent='f' * 64), queued(sleep_hours=4)
+        self.assertFalse(SleepQuestionnaire.objects.exists())
+
+        self.assertEqual(submission_queue.drain(), 2)
+        stored = SleepQuestionnaire.objects.order_by('pk')
+        self.assertEqual([row.submission_key for row in stored], [first.submission_key, second.submission_key])
+        self.assertEqual({row.created_at for row in stored}, {SUBMITTED_AT})
+        self.assertEqual([(row.clinic, row.respondent) for row in stored], [('clinic', first.respondent), (None, None)])
+        self.assertEqual(self.files(), [])
+        self.assertEqual(submission_queue.drain(), 0)
+
+    def test_torn_line_is_dead_lettered(self):
+        queued()
+        with open(self.queue_dir / submission_queue.PENDING_FILE, 'a', encoding='utf-8') as pending:
+            pending.write('{"bedtime": "23:0')
+        queued(sleep_hours=4)
+        (self.queue_dir / f'{submission_queue.BATCH_PREFIX}0.jsonl').write_text('[1]\n', encoding='utf-8')
+
+        with self.assertLogs('SleepForm.submission_queue', 'ERROR') as logs:
+            self.assertEqual(submission_queue.drain(), 2)
+        self.assertEqual(len(logs.output), 2)
+        self.assertEqual(SleepQuestionnaire.objects.count(), 2)
+        self.assertEqual(self.files(), [submission_queue.DEAD_LETTER_FILE])
+        dead = (self.queue_dir / submission_queue.DEAD_LETTER_FILE).read_text(encoding='utf-8').splitlines()
+        self.assertEqual(dead, ['[1]', '{"bedtime": "23:0'])
+
+    def test_batch_inserted_again_after_a_crash(self):
+        queued()
+        queued(sleep_hours=4)
+        lines = (self.queue_dir / submission_queue.PENDING_FILE).read_text(encoding='utf-8')
+        submission_queue.drain()
+
+        # As if the flusher died between the commit and deleting the file
+        (self.queue_dir / f'{submission_queue.BATCH_PREFIX}1.jsonl').write_text(lines, encoding='utf-8')
+        self.assertEqual(submission_queue.drain(), 0)
+        self.assertEqual(SleepQuestionnaire.objects.count(), 2)
+        self.assertEqual(sum(summary.count for summary in ScoreSummary.objects.all()), 2)
+
+    def test_repeats_within_a_batch(self):
+        original = queued()
+        submission_queue.enqueue(original)
+        changed = questionnaire(sleep_hours=4, submission_key=original.submission_key)
+        changed.update_scores()
+        submission_queue.enqueue(changed)
+
+        self.assertEqual(submission_queue.drain(), 2)
+        keys = set(SleepQuestionnaire.objects.values_list('submission_key', flat=True))
+        self.assertEqual(len(keys), 2)
+        self.assertIn(original.submission_key, keys)
@@ -0,0 +1,39 @@
+from django.template import engines
+from django.test import TestCase
+
+from SleepForm import metrics
+from SleepForm.management.commands.startup_report import parse_importtime
+from SleepForm.warmup import warm_templates, warm_up
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        900 | encodings
+import time:      2000 |      88000 |     numpy.core
+import time:      5000 |      93000 |   numpy
+import time:      1000 |     120000 | SleepForm.instruments
+{"settings": 0.1}
+"""
+
+
+class WarmUpTests(TestCase):
+
+    def test_templates_end_up_in_the_cached_loader(self):
+        self.assertGreater(warm_templates(), 0)
+        loader = engines.all()[0].engine.template_loaders[0]
+        self.assertIn('SleepForm/questionnaire.html', loader.get_template_cache)
+
+    def test_warm_up_times_every_step_and_resets_metrics(self):
+        metrics.observe('sleepform_phase_duration_seconds', ('render',), 0.1)
+        timings = warm_up()
+        self.assertEqual(list(timings), ['urls', 'templates', 'questionnaire'])
+        self.assertEqual(metrics.snapshot()['sleepform_phase_duration_seconds'], [])
+
+
+class ParseImporttimeTests(TestCase):
+
+    def test_only_outermost_imports(self):
+        self.assertEqual(parse_importtime(IMPORTTIME), [
+            ('encodings', 0.0009),
+            ('SleepForm.instruments', 0.12),
+        ])
@@ -1,7 +1,19 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_VIEWS:
+    questionnaire_views = views.sleep_questionnaire_async, views.questionnaire_success_async
+else:
+    questionnaire_views = views.sleep_questionnaire, views.questionnaire_success
+
 urlpatterns = [
-    path('', views.sleep_questionnaire, name='sleep_questionnaire'),
-    path('success/', views.questionnaire_success, name='questionnaire_success'),
-]
\ No newline at end of file
+    path('', questionnaire_views[0], name='sleep_questionnaire'),
+    path('clinica/<str:clinic>/', questionnaire_views[0], name='clinic_questionnaire'),
+    path('success/', questionnaire_views[1], name='questionnaire_success'),
+    path('dashboard/', views.results_dashboard, name='results_dashboard'),
+    path('export/', views.export_questionnaires, name='export_questionnaires'),
+    path('metrics/', views.metrics_endpoint, name='metrics'),
+    path('api/questionnaires/', views.api_submit_questionnaires, name='api_submit_questionnaires'),
+    path('api/respondents/history/', views.api_respondent_history, name='api_respondent_history'),
+]
@@ -1,25 +1,204 @@
-from django.shortcuts import get_object_or_404, render, redirect
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render, redirect
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_GET, require_POST
+from django.views.decorators.vary import vary_on_cookie
 from SleepForm.models import SleepQuestionnaire
-from .forms import SleepQuestionnaireForm
+from . import api, idempotency, metrics, submission_queue
+from .export import stream_csv, stream_parquet
+from .forms import ExportForm, SleepQuestionnaireForm
+from .page_cache import questionnaire_etag, questionnaire_last_modified, unbound_form_markup
+from .respondents import clinics
+from .results import make_result, read_result, success_url
+from .routers import read_database, use_replica
+from .stats import apercentile_rank, dashboard_summary, percentile_rank
 
-def sleep_questionnaire(request):
+def _questionnaire_form(request, clinic):
+    """The bound or empty questionnaire form of the public page or of a clinic's"""
+    if clinic is not None and clinic not in clinics():
+        raise Http404
     if request.method == 'POST':
-        form = SleepQuestionnaireForm(request.POST)
-        if form.is_valid():
-            instance = form.save()
-            request.session['latest_questionnaire_id'] = instance.pk  # Store the ID of the latest questionnaire in the session
-            return redirect('questionnaire_success') 
-    else:
-        form = SleepQuestionnaireForm()
+        return SleepQuestionnaireForm(request.POST, clinic=clinic)
+    return SleepQuestionnaireForm(initial={'submission_key': idempotency.new_key()}, clinic=clinic)
+
+def _questionnaire_page(request, form):
+    # The submission key goes outside the cached markup: it is new on every page
+    context = {'form': form, 'submission_key': form['submission_key']}
+    if not form.is_bound:
+        context['form_markup'] = unbound_form_markup(form.clinic)
+    return render(request, 'SleepForm/questionnaire.html', context)
+
+# The page embeds a CSRF token: browsers may keep it, but must revalidate
+# (ETag/Last-Modified, see page_cache) and shared caches must not store it
+@cache_control(private=True, no_cache=True)
+@vary_on_cookie
+@condition(etag_func=questionnaire_etag, last_modified_func=questionnaire_last_modified)
+def sleep_questionnaire(request, clinic=None):
+    form = _questionnaire_form(request, clinic)
+    if form.is_bound:
+        with metrics.timed('validate'):
+            is_valid = form.is_valid()
+        if is_valid:
+            instance = form.save(commit=False)
+            # A repeated POST of the same page gets the original's redirect
+            with metrics.timed('replay_check'):
+                replayed = idempotency.replayed_url(instance)
+            if replayed:
+                return redirect(replayed)
+            if submission_queue.is_enabled():
+                # Write-behind: queue the answers, the result is already known
+                with metrics.timed('score'):
+                    instance.update_scores()
+                with metrics.timed('enqueue'):
+                    submission_queue.enqueue(instance)
+                submission_queue.start_flusher()
+            else:
+                with metrics.timed('save'):
+                    replayed = idempotency.save_once(instance)
+                if replayed:
+                    return redirect(replayed)
+            with metrics.timed('percentile'):
+                result = make_result(instance, percentile_rank(instance.total_score))
+            url = success_url(result)
+            idempotency.remember(instance, url)
+            return redirect(url)
     
-    return render(request, 'SleepForm/questionnaire.html', {'form': form})
+    return _questionnaire_page(request, form)
 
 def questionnaire_success(request):
-    # return render(request, 'SleepForm/success.html')
+    # Everything shown comes from the signed token, see results.py
+    result = read_result(request)
+    if result is None:
+        return redirect('sleep_questionnaire')
+    return render(request, 'SleepForm/success.html', {
+        'scores': result['total'],
+        'percentile': result['percentile'],
+    })
 
-    pk = request.session.get('latest_questionnaire_id')
-    if not pk:
-        return redirect('sleep_questionnaire')  # Fallback if no session
-    
-    record = get_object_or_404(SleepQuestionnaire, pk=pk)
-    return render(request, 'SleepForm/success.html', {'scores': record.calculate_total_score()})
\ No newline at end of file
+# Async versions of the two views above, served instead of them when
+# settings.ASYNC_VIEWS is on (SERVER_MODE=asgi, see gunicorn.conf.py)
+
+@cache_control(private=True, no_cache=True)
+@vary_on_cookie
+@condition(etag_func=questionnaire_etag, last_modified_func=questionnaire_last_modified)
+async def sleep_questionnaire_async(request, clinic=None):
+    form = _questionnaire_form(request, clinic)
+    if form.is_bound:
+        with metrics.timed('validate'):
+            is_valid = form.is_valid()
+        if is_valid:
+            instance = form.save(commit=False)
+            with metrics.timed('replay_check'):
+                replayed = await sync_to_async(idempotency.replayed_url)(instance)
+            if replayed:
+                return redirect(replayed)
+            if submission_queue.is_enabled():
+                with metrics.timed('score'):
+                    instance.update_scores()
+                with metrics.timed('enqueue'):
+                    await sync_to_async(submission_queue.enqueue)(instance)
+                submission_queue.start_flusher()
+            else:
+                with metrics.timed('save'):
+                    replayed = await sync_to_async(idempotency.save_once)(instance)
+                if replayed:
+                    return redirect(replayed)
+            with metrics.timed('percentile'):
+                result = make_result(instance, await apercentile_rank(instance.total_score))
+            url = success_url(result)
+            await sync_to_async(idempotency.remember)(instance, url)
+            return redirect(url)
+
+    return _questionnaire_page(request, form)
+
+async def questionnaire_success_async(request):
+    # Nothing to await: the page renders from the signed token alone
+    return questionnaire_success(request)
+
+@staff_member_required
+@use_replica
+def results_dashboard(request):
+    return render(request, 'SleepForm/dashboard.html', dashboard_summary())
+
+
+@staff_member_required
+def export_questionnaires(request):
+    """
+    Stream every questionnaire with its scores as CSV (default) or Parquet.
+    ``start`` and ``end`` (YYYY-MM-DD, inclusive) filter on ``created_at``.
+    """
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+
+    # The rows are streamed after the view returns, so the replica is
+    # chosen here rather than by @use_replica
+    queryset = SleepQuestionnaire.objects.using(read_database())
+    if form.cleaned_data['start']:
+        start = timezone.make_aware(datetime.combine(form.cleaned_data['start'], time.min))
+        queryset = queryset.filter(created_at__gte=start)
+    if form.cleaned_data['end']:
+        end = timezone.make_aware(datetime.combine(form.cleaned_data['end'] + timedelta(days=1), time.min))
+        queryset = queryset.filter(created_at__lt=end)
+
+    if form.cleaned_data['format'] == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return HttpResponse("Parquet export needs the pyarrow package.", status=501)
+        response = StreamingHttpResponse(stream_parquet(queryset), content_type='application/vnd.apache.parquet')
+        filename = 'questionnaires.parquet'
+    else:
+        response = StreamingHttpResponse(stream_csv(queryset), content_type='text/csv; charset=utf-8')
+        filename = 'questionnaires.csv'
+
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@never_cache
+def metrics_endpoint(request):
+    """Request, query, template and phase timings in Prometheus text format"""
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not (request.user.is_staff or (token and constant_time_compare(authorization, f'Bearer {token}'))):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render(metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+# Token-authenticated JSON API, so no CSRF cookie: see api.py
+@csrf_exempt
+@require_POST
+def api_submit_questionnaires(request):
+    clinic = api.clinic(request)
+    if clinic is None:
+        return JsonResponse({'error': "Chave de API ausente ou inválida."}, status=401)
+    try:
+        items = api.read_items(request)
+    except api.BadPayload as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse(api.submit(items, clinic))
+
+
+@require_GET
+@use_replica
+def api_respondent_history(request):
+    clinic = api.clinic(request)
+    if clinic is None:
+        return JsonResponse({'error': "Chave de API ausente ou inválida."}, status=401)
+    try:
+        respondents = api.read_respondents(request)
+    except api.BadPayload as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse(api.history(respondents, clinic))
@@ -0,0 +1,72 @@
+"""
+Work done once at boot instead of on the first requests.
+
+With gunicorn's ``preload_app`` (see gunicorn.conf.py) the master process
+imports the app and runs ``warm_up()`` before forking, so every worker
+starts with the URL resolver populated, every template compiled into the
+cached loaders and the questionnaire's form markup in the local cache.
+Without preloading, each worker runs it when it starts.
+
+``manage.py startup_report`` times these steps and the first request.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver
+
+from . import metrics
+from .page_cache import templates_modified, unbound_form_markup
+
+logger = logging.getLogger(__name__)
+
+
+def warm_urls():
+    """Import every view and build the resolver's reverse lookup tables"""
+    return len(get_resolver().reverse_dict)
+
+
+def warm_templates():
+    """Compile every template the Django engines can find. Returns how many."""
+    compiled = 0
+    for engine in engines.all():
+        for directory in _template_dirs(engine):
+            directory = Path(directory)
+            for path in sorted(directory.rglob('*.html')):
+                name = path.relative_to(directory).as_posix()
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError:
+                    # Fragments meant to be included somewhere specific
+                    logger.debug("Could not precompile template %s", name)
+                    continue
+                compiled += 1
+    return compiled
+
+
+def _template_dirs(engine):
+    """The directories searched by an engine's loaders, inside the cached loader too"""
+    for loader in engine.engine.template_loaders:
+        for inner in getattr(loader, 'loaders', [loader]):
+            yield from inner.get_dirs()
+
+
+def warm_up():
+    """Run every warm-up step; returns the seconds each one took"""
+    timings = {}
+    for step, function in (
+        ('urls', warm_urls),
+        ('templates', warm_templates),
+        ('questionnaire', lambda: (templates_modified(), unbound_form_markup())),
+    ):
+        started = time.perf_counter()
+        function()
+        timings[step] = time.perf_counter() - started
+
+    # Workers forked from this process must open their own connections, and
+    # the render above is not a request to report
+    connections.close_all()
+    metrics.reset()
+    return timings
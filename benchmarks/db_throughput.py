@@ -0,0 +1,109 @@
+"""
+Submission throughput with and without the production database settings.
+
+Starts several worker processes (like gunicorn workers) that each save
+questionnaires through the ORM, one transaction per submission, and reports
+submissions per second for two configurations:
+
+* baseline: a new connection per request and, on SQLite, the default
+  rollback journal with synchronous=FULL
+* tuned:    persistent connections and, on SQLite, the WAL / synchronous=NORMAL
+            / busy_timeout / BEGIN IMMEDIATE options from settings.py
+
+SQLite runs use a throwaway database file. Set DATABASE_URL to benchmark
+another database instead (it must already be migrated, and rows are left
+behind).
+
+    python benchmarks/db_throughput.py --workers 4 --submissions 200
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import time as clock
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SleepScale.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+
+def submit(args):
+    """Worker process: save ``count`` questionnaires and return the elapsed time"""
+    count, tuned = args
+
+    import django
+    django.setup()
+    from django.db import connection
+    from SleepForm.models import SleepQuestionnaire
+
+    if connection.vendor == 'sqlite' and not tuned:
+        connection.settings_dict['OPTIONS'] = {}
+
+    answers = dict(
+        bedtime=clock(23), wakeup_time=clock(7), time_to_sleep=20, sleep_hours=6.5,
+        sleep_quality=3, medication_use=0, daytime_sleepiness=1, enthusiasm_difficulty=1, has_partner=0,
+        **{field: 1 for field in SleepQuestionnaire.DIFFICULTY_FIELDS},
+    )
+
+    started = time.perf_counter()
+    for _ in range(count):
+        SleepQuestionnaire(**answers).save()
+        if not tuned:
+            connection.close()  # CONN_MAX_AGE=0 closes at the end of each request
+    return time.perf_counter() - started
+
+
+def run(workers, submissions, tuned):
+    with multiprocessing.get_context('spawn').Pool(workers) as pool:
+        elapsed = pool.map(submit, [(submissions, tuned)] * workers)
+    # Workers time only their submissions, not their Django start-up
+    return workers * submissions / max(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--submissions', type=int, default=200, help="Per worker.")
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' in os.environ:
+        databases = {'baseline': os.environ['DATABASE_URL'], 'tuned': os.environ['DATABASE_URL']}
+    else:
+        scratch = tempfile.TemporaryDirectory()
+        databases = _sqlite_databases(Path(scratch.name))
+
+    print(f"{args.workers} workers x {args.submissions} submissions")
+    for label, tuned in (('baseline', False), ('tuned', True)):
+        os.environ['DATABASE_URL'] = databases[label]
+        print(f"{label:>9}: {run(args.workers, args.submissions, tuned):8.1f} submissions/s")
+
+
+def _sqlite_databases(directory):
+    """A freshly migrated SQLite file per configuration, both starting in rollback-journal mode"""
+    template = directory / 'template.sqlite3'
+    os.environ['DATABASE_URL'] = f"sqlite:///{template}"
+
+    import django
+    from django.core.management import call_command
+    from django.db import connections
+    django.setup()
+    call_command('migrate', verbosity=0)
+    connections.close_all()
+
+    with sqlite3.connect(template) as connection:
+        connection.execute('PRAGMA journal_mode=DELETE')
+
+    databases = {}
+    for label in ('baseline', 'tuned'):
+        shutil.copy(template, directory / f'{label}.sqlite3')
+        databases[label] = f"sqlite:///{directory / f'{label}.sqlite3'}"
+    return databases
+
+
+if __name__ == '__main__':
+    main()
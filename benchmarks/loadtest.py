@@ -0,0 +1,234 @@
+"""
+HTTP load test of the submission flow.
+
+Each simulated respondent runs the real flow against a server: GET the
+questionnaire, POST a valid randomized answer set with the CSRF token from
+that page, and follow the redirect to the success page. The flow runs at
+each concurrency level in turn. For each level, the report gives the
+p50/p95/p99 latency of every step and of the whole flow, plus completed
+flows per second.
+
+Against a server that is already running:
+
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --concurrency 1,8,32
+
+(with the per-IP rate limit off on that server, SUBMISSION_RATE_PER_MINUTE=0,
+as every simulated respondent comes from the same address).
+
+Or let the script start gunicorn with gunicorn.conf.py (sync WSGI workers, or
+uvicorn workers with --serve asgi) on a database given as a DATABASE_URL,
+migrating it first:
+
+    python benchmarks/loadtest.py --serve asgi --workers 4 \\
+        --database-url sqlite:////tmp/loadtest.sqlite3
+    python benchmarks/loadtest.py --serve wsgi --database-url postgres://localhost/sleepscale
+"""
+import argparse
+import http.client
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as clock
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SleepScale.settings')
+os.environ.setdefault('SECRET_KEY', 'loadtest')
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+STEPS = ('form', 'submit', 'success', 'flow')
+
+
+def answer_generator():
+    """A function returning random valid POST data, built from the model's fields and choices"""
+    import django
+    django.setup()
+    from SleepForm.ingest import ANSWER_FIELDS
+
+    choices = {field.name: [value for value, _ in field.choices] for field in ANSWER_FIELDS if field.choices}
+    optional = {field.name for field in ANSWER_FIELDS if field.blank}
+
+    def answers(rng):
+        data = {
+            'bedtime': clock(rng.choice([21, 22, 23, 0, 1]), rng.choice([0, 15, 30, 45])).strftime('%H:%M'),
+            'wakeup_time': clock(rng.randint(5, 9), rng.choice([0, 15, 30, 45])).strftime('%H:%M'),
+            'time_to_sleep': rng.choice([0, 5, 10, 15, 20, 30, 45, 60, 90]),
+            'sleep_hours': rng.randint(6, 20) / 2,
+        }
+        for name, values in choices.items():
+            if name in optional and rng.random() < 0.5:
+                data[name] = ''
+            else:
+                data[name] = rng.choice(values)
+        return data
+
+    return answers
+
+
+class Respondent:
+    """One keep-alive connection with its own cookies, running the flow"""
+
+    def __init__(self, base_url, answers, seed):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=60)
+        self.origin = f'{parts.scheme}://{parts.netloc}'
+        self.prefix = parts.path.rstrip('/')
+        self.cookies = {}
+        self.answers = answers
+        self.rng = random.Random(seed)
+
+    def request(self, method, path, body=None):
+        headers = {'Referer': f'{self.origin}{self.prefix}/'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        started = time.perf_counter()
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        elapsed = time.perf_counter() - started
+
+        for header in response.headers.get_all('Set-Cookie') or []:
+            name, _, rest = header.partition('=')
+            self.cookies[name.strip()] = rest.split(';', 1)[0]
+        return response, content, elapsed
+
+    def run_flow(self):
+        """Returns ``{step: seconds}``; raises if any step does not behave like a real submission"""
+        timings = {}
+        response, content, timings['form'] = self.request('GET', f'{self.prefix}/')
+        if response.status != 200:
+            raise RuntimeError(f"GET form answered {response.status}")
+        token = CSRF_INPUT.search(content.decode()).group(1)
+
+        body = urlencode({'csrfmiddlewaretoken': token, **self.answers(self.rng)})
+        response, content, timings['submit'] = self.request('POST', f'{self.prefix}/', body)
+        if response.status != 302:
+            raise RuntimeError(f"POST answered {response.status}")
+
+        location = urlsplit(response.headers['Location'])
+        path = f'{location.path}?{location.query}' if location.query else location.path
+        response, content, timings['success'] = self.request('GET', path)
+        if response.status != 200:
+            raise RuntimeError(f"GET success answered {response.status}")
+
+        timings['flow'] = timings['form'] + timings['submit'] + timings['success']
+        return timings
+
+
+def run_level(base_url, answers, concurrency, flows):
+    """Run ``flows`` flows spread over ``concurrency`` respondents"""
+    timings = {step: [] for step in STEPS}
+    errors = []
+    lock = threading.Lock()
+    remaining = iter(range(flows))
+
+    def respondent(seed):
+        client = Respondent(base_url, answers, seed)
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            try:
+                result = client.run_flow()
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                client = Respondent(base_url, answers, seed + flows)
+                continue
+            with lock:
+                for step, seconds in result.items():
+                    timings[step].append(seconds)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(respondent, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return timings, errors, elapsed
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return float('nan')
+    rank = max(1, round(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def report(concurrency, timings, errors, elapsed):
+    completed = len(timings['flow'])
+    print(f"\nconcurrency {concurrency}: {completed} flows in {elapsed:.1f}s "
+          f"= {completed / elapsed:.1f} flows/s, {len(errors)} errors")
+    print(f"  {'step':<8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for step in STEPS:
+        values = sorted(timings[step])
+        print(f"  {step:<8} " + ' '.join(f"{percentile(values, p) * 1000:9.1f}" for p in (50, 95, 99)))
+    for error in sorted(set(errors))[:5]:
+        print(f"  error: {error}")
+
+
+def start_server(mode, workers, port, database_url):
+    # Every simulated respondent comes from 127.0.0.1: no per-IP rate limit
+    env = dict(os.environ, SERVER_MODE=mode, SUBMISSION_RATE_PER_MINUTE='0')
+    if database_url:
+        env['DATABASE_URL'] = database_url
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'], cwd=BASE_DIR, env=env, check=True)
+
+    server = subprocess.Popen(
+        ['gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', '--workers', str(workers)],
+        cwd=BASE_DIR, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("The server did not come up within 30 seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help="Base URL of a running deployment.")
+    target.add_argument('--serve', choices=['wsgi', 'asgi'], help="Start gunicorn locally in this mode.")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn workers when using --serve.")
+    parser.add_argument('--port', type=int, default=8765, help="Port for --serve.")
+    parser.add_argument('--database-url', help="DATABASE_URL for the server started by --serve.")
+    parser.add_argument('--concurrency', default='1,4,16', help="Comma separated concurrency levels.")
+    parser.add_argument('--flows', type=int, default=200, help="Flows per concurrency level.")
+    args = parser.parse_args()
+
+    answers = answer_generator()
+    server = None
+    base_url = args.url
+    if args.serve:
+        server = start_server(args.serve, args.workers, args.port, args.database_url)
+        base_url = f'http://127.0.0.1:{args.port}'
+
+    try:
+        print(f"Target: {base_url}" + (f" ({args.serve}, {args.workers} workers)" if server else ""))
+        for concurrency in (int(level) for level in args.concurrency.split(',')):
+            report(concurrency, *run_level(base_url, answers, concurrency, args.flows))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
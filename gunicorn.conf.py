@@ -0,0 +1,63 @@
+"""
+gunicorn settings for the Procfile deployment.
+
+By default the app is served by sync workers through SleepScale.wsgi. With
+SERVER_MODE=asgi it is served through SleepScale.asgi by uvicorn workers, and
+the questionnaire views switch to their async versions (settings.ASYNC_VIEWS),
+so one process can keep many submissions in flight while they wait on the
+database.
+
+The app is preloaded: the master imports it (settings, .env, Django setup,
+admin autodiscovery) and warms it up (SleepForm/warmup.py) once, then forks
+the workers, which start serving straight away and share the master's
+memory pages. Set PRELOAD_APP=0 to load the app in each worker instead, e.g.
+to pick up code changes with a HUP. Sizing comes from WEB_CONCURRENCY
+(workers, set by the platform), GUNICORN_THREADS (threads per sync worker)
+and GUNICORN_TIMEOUT.
+"""
+import os
+import time
+
+_started = time.monotonic()
+
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'SleepScale.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'SleepScale.wsgi:application'
+    # More than one thread switches the sync workers to gthread
+    threads = int(os.getenv('GUNICORN_THREADS', 2))
+
+preload_app = os.getenv('PRELOAD_APP', '1') == '1'
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+# Idle keep-alive connections from the platform router
+keepalive = 5
+
+
+def on_starting(server):
+    """Start the shared metrics directory afresh (see SleepForm/metrics.py)"""
+    metrics_dir = os.getenv('METRICS_DIR')
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for name in os.listdir(metrics_dir):
+            if name.endswith('.json'):
+                os.remove(os.path.join(metrics_dir, name))
+
+
+def when_ready(server):
+    """Warm the preloaded app up in the master, before the workers are forked"""
+    if preload_app:
+        from SleepForm.warmup import warm_up
+        timings = warm_up()
+        server.log.info(
+            "App loaded and warmed up in %.2fs (%s)",
+            time.monotonic() - _started,
+            ', '.join(f'{step} {seconds * 1000:.0f}ms' for step, seconds in timings.items()),
+        )
+
+
+def post_worker_init(worker):
+    """Without preloading, each worker warms up its own copy of the app"""
+    if not preload_app:
+        from SleepForm.warmup import warm_up
+        warm_up()